@@ -2,99 +2,18 @@ import pandas as pd
 from pathlib import Path
 import argparse
 
+from diferencias import cargar, comparar, exportar_ids, imprimir_top_columnas
+from linea_base import abrir
+
 
 def load_excel(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        raise FileNotFoundError(f"No existe el archivo: {path}")
-    df = pd.read_excel(path)
     # Forzar ID a string si existe
-    if 'ID' in df.columns:
-        df['ID'] = df['ID'].astype(str)
-    return df
+    return cargar(path, id_texto=True)
 
 
 def diff_by_id(ref: pd.DataFrame, new: pd.DataFrame):
-    if 'ID' not in ref.columns or 'ID' not in new.columns:
-        # fallback posicional
-        min_rows = min(len(ref), len(new))
-        ids = list(range(min_rows))
-        ref_use = ref.iloc[:min_rows].copy()
-        new_use = new.iloc[:min_rows].copy()
-        ref_use['__ID__'] = ids
-        new_use['__ID__'] = ids
-        id_col = '__ID__'
-    else:
-        id_col = 'ID'
-        ref_use = ref.copy()
-        new_use = new.copy()
-
-    # Columnas comunes
-    common_cols = [c for c in ref_use.columns if c in new_use.columns]
-    # Excluir ID col auxiliar
-    if id_col in common_cols:
-        pass
-    else:
-        common_cols.append(id_col)
-
-    # Alinear por ID
-    if id_col == 'ID':
-        # Ver duplicados
-        if ref_use[id_col].duplicated().any() or new_use[id_col].duplicated().any():
-            # Expand by cumcount to create unique composite index
-            ref_use['__dup__'] = ref_use.groupby(id_col).cumcount()
-            new_use['__dup__'] = new_use.groupby(id_col).cumcount()
-            ref_use.set_index([id_col, '__dup__'], inplace=True)
-            new_use.set_index([id_col, '__dup__'], inplace=True)
-        else:
-            ref_use.set_index(id_col, inplace=True)
-            new_use.set_index(id_col, inplace=True)
-    else:
-        ref_use.set_index(id_col, inplace=True)
-        new_use.set_index(id_col, inplace=True)
-
-    # Unir índices
-    all_index = ref_use.index.union(new_use.index)
-    ref_al = ref_use.reindex(all_index)
-    new_al = new_use.reindex(all_index)
-
-    diffs = []
-
-    # IDs faltantes / sobrantes
-    missing_in_new = ref_al.index.difference(new_al.dropna(how='all').index)
-    missing_in_ref = new_al.index.difference(ref_al.dropna(how='all').index)
-
-    # Comparar celdas
-    for col in common_cols:
-        if col == id_col or col == '__dup__':
-            continue
-        if col not in ref_al.columns or col not in new_al.columns:
-            continue
-        ref_col = ref_al[col]
-        new_col = new_al[col]
-        # Diferencias lógicas
-        mask = (ref_col != new_col) & ~(ref_col.isna() & new_col.isna())
-        if not mask.any():
-            continue
-        for idx in ref_al.index[mask]:
-            id_value = idx if isinstance(idx, tuple) else (idx,)
-            # Primer elemento del índice es el ID real
-            real_id = id_value[0]
-            diffs.append({
-                'ID': real_id,
-                'COLUMN': col,
-                'EXPECTED': ref_col.loc[idx],
-                'ACTUAL': new_col.loc[idx]
-            })
-
-    # Añadir registros de filas enteras ausentes
-    for idx in missing_in_new:
-        real_id = idx[0] if isinstance(idx, tuple) else idx
-        diffs.append({'ID': real_id, 'COLUMN': '__ROW__', 'EXPECTED': 'ROW_PRESENT_IN_REF', 'ACTUAL': 'MISSING_IN_NEW'})
-    for idx in missing_in_ref:
-        real_id = idx[0] if isinstance(idx, tuple) else idx
-        diffs.append({'ID': real_id, 'COLUMN': '__ROW__', 'EXPECTED': 'MISSING_IN_REF', 'ACTUAL': 'ROW_PRESENT_IN_NEW'})
-
-    return pd.DataFrame(diffs)
+    # Sin columna ID se compara por posición sólo hasta el largo del más corto
+    return comparar(ref, new, recortar=True).difs
 
 
 def main():
@@ -103,24 +22,28 @@ def main():
     parser.add_argument('--new', default='output.xlsx', help='Archivo generado (actual)')
     parser.add_argument('--out', default='diff_ids.csv', help='Archivo CSV de salida')
     parser.add_argument('--limit', type=int, default=0, help='Si >0, limitar filas exportadas')
+    parser.add_argument('--en-disco', action='store_true',
+                        help='Comparación por particiones en disco con memoria acotada (libros muy grandes)')
     args = parser.parse_args()
 
-    ref = load_excel(Path(args.ref))
-    new = load_excel(Path(args.new))
+    if args.en_disco:
+        from diferencias_bloques import comparar_en_disco, formato_por_extension, imprimir_resumen
 
-    df_diffs = diff_by_id(ref, new)
-    if args.limit > 0:
-        df_diffs = df_diffs.head(args.limit)
+        if args.limit:
+            print('[AVISO] --limit no aplica con --en-disco: se exportan todas las diferencias')
+        imprimir_resumen(comparar_en_disco(args.ref, args.new, args.out, formato_por_extension(args.out)))
+        return
 
-    df_diffs.to_csv(args.out, index=False)
-    print(f"Diferencias: {len(df_diffs)} filas exportadas a {args.out}")
-    # Resumen rápido
-    if not df_diffs.empty:
-        top_cols = df_diffs['COLUMN'].value_counts().head(10)
-        print('Top columnas con diferencias:')
-        print(top_cols.to_string())
+    # Referencia desde la línea base bendecida (python linea_base.py bendecir) si está vigente
+    base = abrir(args.ref)
+    new = load_excel(Path(args.new))
+    if base is not None:
+        res = base.comparar(new, recortar=True, id_texto=True)
     else:
-        print('No se encontraron diferencias.')
+        res = comparar(load_excel(Path(args.ref)), new, recortar=True)
+    exportar_ids(res, args.out, args.limit)
+    # Resumen rápido
+    imprimir_top_columnas(res)
 
 
 if __name__ == '__main__':
@@ -1,32 +1,159 @@
+"""Auditoría focalizada de un grupo de columnas (por defecto DEPRESIÓN/ANSIEDAD) entre referencia y nuevo.
+
+Sólo se cargan las columnas cuyo nombre contiene alguno de los patrones (más ID) y, como la lectura pasa por
+la caché columnar de ingesta.py, auditar un grupo en libros grandes no cuesta la carga del libro completo.
+Las filas se alinean por ID normalizado (con repetidos vía cumcount, como en diferencias.py) y, además del
+resumen por columna, se buscan columnas desplazadas: valores de la referencia que en el nuevo aparecen en
+otra columna del grupo (p.ej. el corrimiento de una columna de MAPPING_DIRECTO en DEPRESION/ANSIEDAD).
+
+Uso: python analysis_dep.py --patron DEPRES --patron ANSIED [--out auditoria.csv]
+"""
+import argparse
+import time
+
 import pandas as pd
 
-ref = pd.read_excel('backup_data/output_expect.xlsx',
-                    usecols=lambda c: 'DEPRES' in c or 'ANSIED' in c)
-new = pd.read_excel(
-    'output.xlsx', usecols=lambda c: 'DEPRES' in c or 'ANSIED' in c)
-cols = ref.columns.tolist()
-print('Columnas:', cols)
-report = []
-for c in cols:
-    if c not in new:
-        continue
-    diff = (ref[c] != new[c]) & ~(ref[c].isna() & new[c].isna())
-    report.append((c, diff.sum(), ref[c].nunique(
-        dropna=True), new[c].nunique(dropna=True)))
-print('Resumen difs (col, dif_count, nunique_ref, nunique_new):')
-for r in report:
-    print(r)
-# Extras en AMIGO
-if 'DEPRESION AMIGO' in ref and 'DEPRESION AMIGO' in new:
-    mask_extra = ref['DEPRESION AMIGO'].isna() & new['DEPRESION AMIGO'].notna()
-    print('DEPRESION AMIGO valores extras:', mask_extra.sum())
-    print(new.loc[mask_extra, 'DEPRESION AMIGO'].value_counts().head())
-# Swaps USTED/FAMILIAR
-if {'DEPRESION USTED', 'DEPRESION FAMILIAR'} <= set(ref.columns):
-    swap_mask = (ref['DEPRESION USTED'] != new['DEPRESION USTED']) & (
-        ref['DEPRESION FAMILIAR'] != new['DEPRESION FAMILIAR'])
-    print('Posibles swaps depresion USTED/FAMILIAR:', swap_mask.sum())
-    print('Ejemplo ref:', ref.loc[swap_mask, [
-          'DEPRESION USTED', 'DEPRESION FAMILIAR']].head().to_dict('records'))
-    print('Ejemplo new:', new.loc[swap_mask, [
-          'DEPRESION USTED', 'DEPRESION FAMILIAR']].head().to_dict('records'))
+from derivados import normalizar_id_serie
+from diferencias import COERCIONES, alinear, coercionar
+from ingesta import encabezados, leer_excel
+from linea_base import abrir
+
+PATRONES_DEFECTO = ['DEPRES', 'ANSIED']
+UMBRAL_DESPLAZAMIENTO = 0.9
+
+
+def selector(patrones, id_col: str = 'ID'):
+    """Función tipo usecols: la columna de ID y las que contienen algún patrón (sin distinguir mayúsculas)."""
+    patrones = [p.upper() for p in patrones]
+    return lambda c: c == id_col or any(p in str(c).upper() for p in patrones)
+
+
+def cargar_grupo(path, patrones, id_col: str = 'ID', base=None) -> pd.DataFrame:
+    """Columnas del grupo (más ID normalizado a sólo dígitos; si no queda ninguno se conserva el texto).
+    Con `base` (linea_base.LineaBase de path) las columnas se leen del artefacto bendecido."""
+    if base is not None:
+        df = base.leer(selector(patrones, id_col))
+    else:
+        df = leer_excel(path, columnas=selector(patrones, id_col))
+    if id_col in df.columns:
+        df[id_col] = normalizar_id_serie(df[id_col]).fillna(df[id_col].astype(str)).astype(object)
+    return df
+
+
+def _distinto(a: pd.Series, b: pd.Series) -> pd.Series:
+    return (a != b) & ~(a.isna() & b.isna())
+
+
+def reporte_columnas(ref_al: pd.DataFrame, new_al: pd.DataFrame, columnas, coercion: str = 'estricta') -> pd.DataFrame:
+    """Por columna: diferencias, valores sólo en el nuevo (EXTRAS), sólo en la referencia (FALTANTES) y únicos."""
+    filas = []
+    for col in columnas:
+        ref, new = ref_al[col], new_al[col]
+        filas.append({
+            'COLUMNA': col,
+            'DIFERENCIAS': int(_distinto(coercionar(ref, coercion), coercionar(new, coercion)).sum()),
+            'EXTRAS': int((ref.isna() & new.notna()).sum()),
+            'FALTANTES': int((ref.notna() & new.isna()).sum()),
+            'NUNIQUE_REF': ref.nunique(dropna=True),
+            'NUNIQUE_NEW': new.nunique(dropna=True),
+        })
+    return pd.DataFrame(filas, columns=['COLUMNA', 'DIFERENCIAS', 'EXTRAS', 'FALTANTES', 'NUNIQUE_REF', 'NUNIQUE_NEW'])
+
+
+def coincidencias(ref_al: pd.DataFrame, new_al: pd.DataFrame, columnas_ref, columnas_new,
+                  coercion: str = 'estricta') -> pd.DataFrame:
+    """Matriz [columna ref, columna nuevo]: fracción de filas con valor en la referencia cuyo valor aparece
+    igual en esa columna del nuevo. La diagonal alta es lo esperado; fuera de ella indica desplazamiento."""
+    nuevos = {c: coercionar(new_al[c], coercion) for c in columnas_new}
+    matriz = pd.DataFrame(float('nan'), index=list(columnas_ref), columns=list(columnas_new))
+    for a in columnas_ref:
+        ref = coercionar(ref_al[a], coercion)
+        con_valor = ref.notna()
+        n = int(con_valor.sum())
+        if not n:
+            continue
+        ref = ref[con_valor]
+        for b, new in nuevos.items():
+            matriz.loc[a, b] = float((ref == new[con_valor]).sum()) / n
+    return matriz
+
+
+def desplazamientos(matriz: pd.DataFrame, posiciones_new: dict, umbral: float = UMBRAL_DESPLAZAMIENTO) -> pd.DataFrame:
+    """Columnas de la referencia cuyos valores están en otra columna del nuevo (coincidencia >= umbral) y no en
+    la propia. DESPLAZAMIENTO es la distancia entre ambas en el orden de columnas del nuevo (+1 = una a la derecha)."""
+    filas = []
+    for a, fila in matriz.iterrows():
+        fila = fila.dropna()
+        if fila.empty:
+            continue
+        misma = fila.get(a, float('nan'))
+        if misma >= umbral:
+            continue
+        b = fila.idxmax()
+        if b == a or fila[b] < umbral:
+            continue
+        salto = posiciones_new[b] - posiciones_new[a] if a in posiciones_new else None
+        filas.append({'COLUMNA_REF': a, 'COLUMNA_NEW': b, 'COINCIDENCIA': fila[b], 'COINCIDENCIA_MISMA': misma,
+                      'DESPLAZAMIENTO': salto})
+    df = pd.DataFrame(filas, columns=['COLUMNA_REF', 'COLUMNA_NEW', 'COINCIDENCIA', 'COINCIDENCIA_MISMA',
+                                      'DESPLAZAMIENTO'])
+    pares = set(zip(df['COLUMNA_REF'], df['COLUMNA_NEW']))
+    df['INTERCAMBIO'] = [(b, a) in pares for a, b in zip(df['COLUMNA_REF'], df['COLUMNA_NEW'])]
+    return df
+
+
+def imprimir_desplazamientos(desp: pd.DataFrame):
+    if desp.empty:
+        print('Sin columnas desplazadas.')
+        return
+    for salto, grupo in desp.groupby('DESPLAZAMIENTO', dropna=False, sort=False):
+        texto = 'posición desconocida' if pd.isna(salto) else f'{int(salto):+d} columna(s)'
+        print(f'Desplazamiento de {texto} en {len(grupo)} columna(s):')
+        for r in grupo.itertuples(index=False):
+            extra = ' (intercambio)' if r.INTERCAMBIO else ''
+            print(f"  ref '{r.COLUMNA_REF}' -> nuevo '{r.COLUMNA_NEW}': {r.COINCIDENCIA:.1%} coincide "
+                  f"(en su propia columna {r.COINCIDENCIA_MISMA:.1%}){extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Auditoría focalizada de un grupo de columnas por ID normalizado')
+    parser.add_argument('--ref', default='backup_data/output_expect.xlsx', help='Archivo referencia (expected)')
+    parser.add_argument('--new', default='output.xlsx', help='Archivo generado (actual)')
+    parser.add_argument('--patron', action='append', metavar='TEXTO',
+                        help=f'Parte del nombre de columna a auditar (repetible; por defecto {PATRONES_DEFECTO})')
+    parser.add_argument('--coercion', choices=COERCIONES, default='estricta')
+    parser.add_argument('--umbral', type=float, default=UMBRAL_DESPLAZAMIENTO,
+                        help='Coincidencia mínima para reportar una columna como desplazada')
+    parser.add_argument('--out', help='CSV con el resumen por columna')
+    args = parser.parse_args()
+    patrones = args.patron or PATRONES_DEFECTO
+
+    t0 = time.perf_counter()
+    ref = cargar_grupo(args.ref, patrones, base=abrir(args.ref))
+    new = cargar_grupo(args.new, patrones)
+    t1 = time.perf_counter()
+    ref_al, new_al, comunes, index_name = alinear(ref, new, recortar=True)
+    grupo_ref = [c for c in ref.columns if c != 'ID']
+    grupo_new = [c for c in new.columns if c != 'ID']
+    print(f"Columnas ({len(grupo_ref)}): {grupo_ref}")
+    if index_name != 'ID':
+        print('[AVISO] Algún archivo no tiene columna ID: se alinea por posición')
+    faltantes = [c for c in grupo_ref if c not in grupo_new]
+    if faltantes:
+        print(f'Columnas del grupo sin par en el nuevo: {faltantes}')
+    print(f'Filas alineadas: {len(ref_al)} (referencia {len(ref)}, nuevo {len(new)})')
+
+    reporte = reporte_columnas(ref_al, new_al, comunes, args.coercion)
+    print(reporte.to_string(index=False))
+    if args.out:
+        reporte.to_csv(args.out, index=False)
+        print(f'Resumen exportado a {args.out}')
+
+    matriz = coincidencias(ref_al, new_al, grupo_ref, grupo_new, args.coercion)
+    posiciones = {c: i for i, c in enumerate(encabezados(args.new))}
+    imprimir_desplazamientos(desplazamientos(matriz, posiciones, args.umbral))
+    print(f'Tiempos: lectura {t1 - t0:.2f}s, auditoría {time.perf_counter() - t1:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
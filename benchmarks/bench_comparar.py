@@ -0,0 +1,192 @@
+"""Paridad y benchmark del motor de diferencias de compare.py: bucle por celda histórico vs. matriz apilada
+(y el modo en disco de diferencias_bloques.py contra el modo en memoria).
+
+Se generan dos salidas sintéticas con celdas alteradas (incluidos 9 vs '9', nulos, IDs duplicados y filas
+presentes sólo en un lado) y se verifica que comparar_por_id devuelve exactamente los mismos registros,
+en el mismo orden, que la implementación anterior.
+
+Uso: python benchmarks/bench_comparar.py --filas 20000 --cambios 0.05
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from compare import comparar_por_id  # noqa: E402
+from diferencias import COERCIONES, cargar, comparar  # noqa: E402
+from diferencias_bloques import comparar_en_disco  # noqa: E402
+
+
+def comparar_legacy(df_ref: pd.DataFrame, df_new: pd.DataFrame, id_col: str = 'ID'):
+    """Copia de la versión con bucle por celda (ref_col.loc[idx] por cada diferencia)."""
+    ref_use, new_use = df_ref.copy(), df_new.copy()
+    if ref_use[id_col].duplicated().any() or new_use[id_col].duplicated().any():
+        ref_use['__dup__'] = ref_use.groupby(id_col).cumcount()
+        new_use['__dup__'] = new_use.groupby(id_col).cumcount()
+        ref_use.set_index([id_col, '__dup__'], inplace=True)
+        new_use.set_index([id_col, '__dup__'], inplace=True)
+    else:
+        ref_use.set_index(id_col, inplace=True)
+        new_use.set_index(id_col, inplace=True)
+    all_index = ref_use.index.union(new_use.index)
+    ref_al = ref_use.reindex(all_index)
+    new_al = new_use.reindex(all_index)
+    common_cols = [c for c in df_ref.columns if c in df_new.columns and c != id_col]
+    difs = []
+    for col in common_cols:
+        ref_col = ref_al[col]
+        new_col = new_al[col]
+        mask = (ref_col != new_col) & ~(ref_col.isna() & new_col.isna())
+        if not mask.any():
+            continue
+        for idx in ref_al.index[mask]:
+            real_id = idx[0] if isinstance(idx, tuple) else idx
+            difs.append({'ID': real_id, 'COLUMN': col, 'EXPECTED': ref_col.loc[idx], 'ACTUAL': new_col.loc[idx]})
+    missing_in_new = ref_al.index.difference(new_al.dropna(how='all').index)
+    missing_in_ref = new_al.index.difference(ref_al.dropna(how='all').index)
+    for idx in missing_in_new:
+        real_id = idx[0] if isinstance(idx, tuple) else idx
+        difs.append({'ID': real_id, 'COLUMN': '__ROW__', 'EXPECTED': 'ROW_PRESENT_IN_REF', 'ACTUAL': 'MISSING_IN_NEW'})
+    for idx in missing_in_ref:
+        real_id = idx[0] if isinstance(idx, tuple) else idx
+        difs.append({'ID': real_id, 'COLUMN': '__ROW__', 'EXPECTED': 'MISSING_IN_REF', 'ACTUAL': 'ROW_PRESENT_IN_NEW'})
+    return difs
+
+
+def generar_par(filas: int, columnas: int = 40, cambios: float = 0.05, seed: int = 0):
+    """(referencia, nuevo) con una fracción `cambios` de celdas alteradas."""
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(10**6, 10**6 + filas, filas).astype(str).astype(object)  # con repetidos
+    ref = pd.DataFrame({'ID': ids})
+    for j in range(columnas):
+        if j % 3 == 0:
+            ref[f'C{j}'] = rng.integers(0, 11, filas).astype(float)
+        elif j % 3 == 1:
+            ref[f'C{j}'] = pd.Series(rng.choice(['Sí', 'No', None, 'Tal vez'], filas), dtype=object)
+        else:
+            ref[f'C{j}'] = pd.Series(rng.integers(0, 5, filas), dtype=object)
+    new = ref.copy()
+    for j in range(columnas):
+        col = f'C{j}'
+        tocadas = rng.random(filas) < cambios
+        if j % 3 == 0:
+            new.loc[tocadas, col] = np.where(rng.random(tocadas.sum()) < 0.5, np.nan, 99.0)
+        elif j % 3 == 1:
+            new.loc[tocadas, col] = 'Otro'
+        else:
+            new[col] = new[col].astype(object)
+            new.loc[tocadas, col] = new.loc[tocadas, col].map(str)  # 9 vs '9'
+    new = new.drop(index=range(0, filas, 97)).reset_index(drop=True)
+    extra = ref.iloc[:filas // 100].assign(ID=lambda d: 'X' + d['ID'])
+    return ref, pd.concat([new, extra], ignore_index=True)
+
+
+def generar_casi_iguales(filas: int, columnas: int = 40, filas_cambiadas: int = 50, seed: int = 0):
+    """Caso típico de regresión: IDs únicos, mismas filas salvo unas pocas celdas y dos filas faltantes."""
+    rng = np.random.default_rng(seed)
+    ref = pd.DataFrame({'ID': pd.Series(np.arange(filas) + 10**6).astype(str).astype(object)})
+    for j in range(columnas):
+        if j % 4 == 0:
+            ref[f'C{j}'] = rng.integers(0, 11, filas).astype(float)
+        else:
+            ref[f'C{j}'] = pd.Series(rng.choice(['Sí', 'No', None, 'Tal vez'], filas), dtype=object)
+    new = ref.copy()
+    new.loc[rng.integers(0, filas, filas_cambiadas), 'C1'] = 'Otro'
+    return ref, new.drop(index=[0, filas // 2]).reset_index(drop=True)
+
+
+def _escalar(v):
+    """El bucle histórico devolvía escalares NumPy (np.float64); el vectorizado, los nativos equivalentes."""
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _iguales(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if a.shape != b.shape or list(a.columns) != list(b.columns):
+        return False
+    for col in a.columns:
+        for x, y in zip(map(_escalar, a[col]), map(_escalar, b[col])):
+            if pd.isna(x) and pd.isna(y):
+                continue
+            if type(x) is not type(y) or x != y:
+                return False
+    return True
+
+
+def verificar_paridad(filas: int = 3000):
+    ref, new = generar_par(filas, seed=1)
+    esperado = pd.DataFrame(comparar_legacy(ref, new), columns=['ID', 'COLUMN', 'EXPECTED', 'ACTUAL'])
+    obtenido, _ = comparar_por_id(ref, new)
+    if not _iguales(esperado, obtenido):
+        raise AssertionError('comparar_por_id difiere de la implementación con bucle por celda')
+    numerica, _ = comparar_por_id(ref, new, coercion='numerica')
+    if len(numerica) >= len(obtenido):
+        raise AssertionError("la coerción 'numerica' debería ignorar las diferencias 9 vs '9'")
+    for coercion in COERCIONES:
+        completo = comparar(ref, new, coercion=coercion, huellas=False).difs
+        if not _iguales(completo, comparar(ref, new, coercion=coercion).difs):
+            raise AssertionError(f'el pre-paso por huellas cambia el resultado (coerción {coercion})')
+    print(f'Paridad bucle/vectorizado/huellas verificada ({len(obtenido)} diferencias)')
+
+
+def verificar_paridad_disco(filas: int = 2000):
+    """El modo en disco (bloques y particiones pequeñas) debe exportar exactamente el mismo CSV que en memoria."""
+    ref, new = generar_par(filas, columnas=12, seed=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        ref.to_excel(tmp / 'ref.xlsx', index=False)
+        new.to_excel(tmp / 'new.xlsx', index=False)
+        for coercion in COERCIONES:
+            esperado = comparar(cargar(tmp / 'ref.xlsx', id_texto=True), cargar(tmp / 'new.xlsx', id_texto=True),
+                                coercion=coercion).difs
+            esperado.to_csv(tmp / 'memoria.csv', index=False)
+            comparar_en_disco(tmp / 'ref.xlsx', tmp / 'new.xlsx', tmp / 'disco.csv', 'csv', coercion,
+                              filas_por_particion=300, tam_bloque=250, dir_trabajo=tmp)
+            if (tmp / 'memoria.csv').read_bytes() != (tmp / 'disco.csv').read_bytes():
+                raise AssertionError(f'el modo en disco difiere del modo en memoria (coerción {coercion})')
+    print(f'Paridad memoria/disco verificada ({len(esperado)} diferencias)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de comparar_por_id (bucle por celda vs. vectorizado)')
+    parser.add_argument('--filas', type=int, default=20_000)
+    parser.add_argument('--columnas', type=int, default=40)
+    parser.add_argument('--cambios', type=float, default=0.05, help='Fracción de celdas alteradas')
+    args = parser.parse_args()
+
+    verificar_paridad()
+    verificar_paridad_disco()
+    ref, new = generar_par(args.filas, args.columnas, args.cambios)
+    t0 = time.perf_counter()
+    difs = comparar_legacy(ref, new)
+    t_legacy = time.perf_counter() - t0
+    for coercion in COERCIONES:
+        t0 = time.perf_counter()
+        completo = comparar(ref, new, coercion=coercion, huellas=False)
+        t_vec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        res = comparar(ref, new, coercion=coercion)
+        t_huellas = time.perf_counter() - t0
+        print(f'{coercion:<9} {len(completo.difs):>9} diferencias: vectorizado {t_vec:6.2f}s, con huellas '
+              f'{t_huellas:6.2f}s ({res.filas_comparadas} filas / {res.columnas_comparadas} columnas comparadas)')
+    print(f'bucle por celda: {len(difs)} diferencias en {t_legacy:.2f}s')
+
+    ref, new = generar_casi_iguales(args.filas * 5, args.columnas)
+    t0 = time.perf_counter()
+    completo = comparar(ref, new, huellas=False)
+    t_vec = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    res = comparar(ref, new)
+    t_huellas = time.perf_counter() - t0
+    if not _iguales(completo.difs, res.difs):
+        raise AssertionError('el pre-paso por huellas cambia el resultado (casi iguales)')
+    print(f'casi iguales ({len(ref)} filas, {len(res.difs)} diferencias): vectorizado {t_vec:.2f}s, con huellas '
+          f'{t_huellas:.2f}s ({res.filas_comparadas} filas / {res.columnas_comparadas} columnas comparadas)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark y verificación del cubo de resultados (cubo.py) contra los group-by directos sobre la salida.
+
+Para cada tamaño se construye df_out con las etapas de creadordf.py sobre los datos sintéticos de
+benchmarks/generador.py y se mide:
+    construccion   Cubo.desde_salida sobre df_out (lo que agrega --cubo a la corrida)
+    directo        los mismos indicadores con group-by de pandas sobre df_out completo (lo que hace cada
+                   actualización de los tableros tras recargar la salida; sin contar la recarga)
+    cubo           las mismas consultas respondidas desde el cubo
+    combinacion    cubo del 90% de los participantes + cubo del 10% restante (llegada de participantes nuevos)
+
+Cada consulta del cubo se compara con su group-by directo (NPS, promedios de bloque, tasas de interés) y el
+cubo combinado con el construido de una vez; si algo difiere el script falla.
+
+Uso: python benchmarks/bench_cubo.py --filas 10000 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import creadordf  # noqa: E402
+from cubo import PARTICIPANTES, Cubo, _etiquetas  # noqa: E402
+from generador import DIR_DATOS, preparar  # noqa: E402
+from ingesta import leer_excel  # noqa: E402
+from maestro import cargar_indice  # noqa: E402
+
+CONSULTAS = [
+    ((), {}),
+    (('VARIABLE 1',), {}),
+    (('VARIABLE 1', 'GENERO'), {}),
+    (('EMPRESA', 'VARIABLE 2', 'VARIABLE 3'), {}),
+    (('Generación',), {'GENERO': ['Femenino']}),
+]
+
+
+def construir_salida(n: int, seed: int, dir_datos) -> pd.DataFrame:
+    input1, input2 = preparar(n, seed, dir_datos, avisar=False)
+    df_in = creadordf.filtrar_y_cruzar(leer_excel(input1, columnas=creadordf.columnas_usadas(input1)),
+                                       cargar_indice(input2))
+    return creadordf.proyectar(df_in, creadordf.resolver_columnas(df_in.columns))
+
+
+def directo(df_out: pd.DataFrame, definicion, por, donde) -> pd.DataFrame:
+    """Indicadores calculados directamente sobre las filas, como en los tableros."""
+    for dim, valores in donde.items():
+        df_out = df_out[_etiquetas(df_out[dim]).isin(valores).to_numpy()]
+    df_out = df_out.reset_index(drop=True)
+    claves = [_etiquetas(df_out[d]).rename(d) for d in por] or [pd.Series(0, index=df_out.index)]
+
+    def por_grupo(serie):
+        return serie.groupby(claves, dropna=False, sort=True).sum()
+
+    def numerica(col):
+        return pd.to_numeric(df_out[col].astype(object), errors='coerce')
+
+    res = {PARTICIPANTES: por_grupo(pd.Series(1, index=df_out.index))}
+    col, promotores, detractores = definicion.nps
+    tipo = df_out[col].astype(object)
+    res['NPS'] = 100 * (por_grupo(tipo == promotores) - por_grupo(tipo == detractores)) / por_grupo(tipo.notna())
+    for nombre, cols in definicion.bloques:
+        valores = pd.concat([numerica(c) for c in cols], axis=1)
+        res[nombre] = por_grupo(valores.sum(axis=1)) / por_grupo(valores.notna().sum(axis=1))
+    en_bloques = {c for _, cols in definicion.bloques for c in cols}
+    for escala in [c for c in definicion.escalas if c not in en_bloques]:
+        valores = numerica(escala)
+        res[escala] = por_grupo(valores.fillna(0)) / por_grupo(valores.notna())
+    for marca in definicion.marcas:
+        res[f'{marca} %'] = 100 * por_grupo(df_out[marca].notna()) / por_grupo(pd.Series(1, index=df_out.index))
+    return pd.DataFrame(res)
+
+
+def comparar(cubo: pd.DataFrame, ref: pd.DataFrame, etiqueta: str):
+    cubo = cubo[ref.columns]
+    if len(cubo) != len(ref) or not np.allclose(cubo.to_numpy(dtype=float), ref.to_numpy(dtype=float),
+                                                rtol=1e-9, atol=1e-9, equal_nan=True):
+        raise AssertionError(f'El cubo difiere del group-by directo en la consulta {etiqueta}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del cubo de resultados contra group-by directos')
+    parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dir-datos', default=str(DIR_DATOS))
+    args = parser.parse_args()
+
+    definicion = creadordf.ESPEC.cubo
+    print(f"{'filas':>9} {'combinaciones':>13} {'construccion (s)':>16} {'directo (ms)':>13} {'cubo (ms)':>10} "
+          f"{'combinacion (ms)':>17}")
+    for n in args.filas:
+        df_out = construir_salida(n, args.seed, Path(args.dir_datos).resolve())
+
+        t0 = time.perf_counter()
+        cubo = Cubo.desde_salida(df_out, definicion)
+        t_construccion = time.perf_counter() - t0
+
+        t_directo = t_cubo = 0.0
+        for por, donde in CONSULTAS:
+            t0 = time.perf_counter()
+            ref = directo(df_out, definicion, por, donde)
+            t1 = time.perf_counter()
+            res = cubo.resultados(por, donde)
+            t_directo, t_cubo = t_directo + t1 - t0, t_cubo + time.perf_counter() - t1
+            comparar(res, ref, f'por={list(por)} donde={donde} (n={n})')
+
+        corte = int(len(df_out) * 0.9)
+        previo = Cubo.desde_salida(df_out.iloc[:corte], definicion)
+        nuevos = Cubo.desde_salida(df_out.iloc[corte:], definicion)
+        t0 = time.perf_counter()
+        combinado = previo.sumar(nuevos).datos
+        t_combinacion = time.perf_counter() - t0
+        dims = list(definicion.dimensiones)
+        pd.testing.assert_frame_equal(combinado.sort_values(dims, ignore_index=True),
+                                      cubo.datos.sort_values(dims, ignore_index=True), check_dtype=False)
+
+        print(f'{n:>9} {len(cubo):>13} {t_construccion:>16.3f} {1000 * t_directo:>13.1f} {1000 * t_cubo:>10.1f} '
+              f'{1000 * t_combinacion:>17.1f}')
+
+
+if __name__ == '__main__':
+    main()
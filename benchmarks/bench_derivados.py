@@ -0,0 +1,66 @@
+"""Microbenchmark de los campos derivados: funciones escalares vs. versiones por Serie.
+
+La paridad elemento a elemento (pd.NA, tipos mezclados, años y notas en los límites) se prueba en
+tests/test_derivados.py; aquí sólo se mide.
+
+Uso: python benchmarks/bench_derivados.py --valores 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from escalares import calcular_tipo_nps, limpiar_area, map_generacion, normalizar_id  # noqa: E402
+from derivados import generacion_serie, limpiar_area_serie, normalizar_id_serie, tipo_nps_serie  # noqa: E402
+
+PARES = [
+    ('normalizar_id', normalizar_id, normalizar_id_serie),
+    ('limpiar_area', limpiar_area, limpiar_area_serie),
+    ('map_generacion', map_generacion, generacion_serie),
+    ('calcular_tipo_nps', calcular_tipo_nps, tipo_nps_serie),
+]
+
+
+def muestras(n: int, seed: int = 0) -> dict:
+    """Series de prueba con los tipos del caso real."""
+    rng = np.random.default_rng(seed)
+    notas = rng.integers(-2, 12, n).astype(float)
+    notas[rng.random(n) < 0.1] = np.nan
+    anios = pd.Series(rng.integers(1930, 2020, n)).astype(str)
+    anios[rng.random(n) < 0.05] = 'No responde'
+    cedulas = pd.Series(rng.integers(10**6, 10**10, n)).map('{:,}'.format).str.replace(',', '.')
+    return {
+        'float64': pd.Series(notas),
+        'cedulas': cedulas.astype(object),
+        'int64': pd.Series(rng.integers(-2, 12, n)),
+        'texto': anios.astype(object),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark de campos derivados (escalar vs. vectorizado)')
+    parser.add_argument('--valores', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    datos = muestras(args.valores)
+    entradas = {'normalizar_id': datos['cedulas'], 'limpiar_area': datos['texto'],
+                'map_generacion': datos['texto'], 'calcular_tipo_nps': datos['float64']}
+    factor = 1_000_000 / args.valores
+    print(f"{'función':<20} {'escalar (s/M)':>14} {'vectorizado (s/M)':>18} {'speedup':>9}")
+    for nombre, escalar, vectorizada in PARES:
+        serie = entradas[nombre]
+        t0 = time.perf_counter()
+        serie.map(escalar)
+        t_esc = (time.perf_counter() - t0) * factor
+        t0 = time.perf_counter()
+        vectorizada(serie)
+        t_vec = (time.perf_counter() - t0) * factor
+        print(f'{nombre:<20} {t_esc:>14.3f} {t_vec:>18.3f} {t_esc / t_vec:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
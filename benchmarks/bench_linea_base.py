@@ -0,0 +1,121 @@
+"""Paridad y benchmark de la línea base bendecida (linea_base.py) contra la comparación con el Excel de referencia.
+
+Paridad: con salidas sintéticas (IDs repetidos, nulos, 9 vs '9', filas presentes en un solo lado, IDs texto y
+enteros, nuevo idéntico) LineaBase.comparar debe devolver exactamente el mismo ResultadoDiff que
+diferencias.comparar sobre la referencia leída del Excel, para todas las coerciones y con/sin id_texto.
+
+Benchmark (--ref/--new, p.ej. una salida de 100k filas y una copia alterada): carga de la referencia y
+comparación por ambos caminos, con la caché columnar del nuevo ya convertida. La lectura del Excel de referencia
+sin caché se mide aparte con --en-frio (lento: es lo que pagaba cada ejecución en un checkout limpio).
+
+Uso: python benchmarks/bench_linea_base.py --ref /tmp/ref.xlsx --new /tmp/new.xlsx [--en-frio]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_comparar import _iguales, generar_casi_iguales, generar_par  # noqa: E402
+from diferencias import COERCIONES, cargar, comparar  # noqa: E402
+from linea_base import abrir, bendecir  # noqa: E402
+
+_CAMPOS = ('filas_ref', 'filas_new', 'columnas_ref', 'faltan', 'sobrantes', 'orden_difiere', 'index_name')
+
+
+def _casos(filas: int) -> dict:
+    ref, new = generar_casi_iguales(filas, 12, seed=4)
+    enteros = ref.assign(ID=ref['ID'].astype(int)), new.assign(ID=new['ID'].astype(int))
+    con_nulos = ref.copy(), new.copy()
+    for df in con_nulos:
+        df.loc[3, 'ID'] = None  # un solo nulo: con varios, alinear no puede indexar (ID, __dup__)
+    return {
+        'repetidos': generar_par(filas, columnas=12, seed=3),
+        'casi iguales': (ref, new),
+        'IDs enteros': enteros,
+        'IDs nulos': con_nulos,
+        'idénticos': (ref, ref.copy()),
+        'sin ID': (ref.drop(columns='ID'), new.drop(columns='ID')),
+    }
+
+
+def verificar_paridad(filas: int = 2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for nombre, (ref, new) in _casos(filas).items():
+            ref.to_excel(tmp / 'ref.xlsx', index=False)
+            new.to_excel(tmp / 'new.xlsx', index=False)
+            bendecir(tmp / 'ref.xlsx')
+            base = abrir(tmp / 'ref.xlsx')
+            problemas = base.verificar()
+            if problemas:
+                raise AssertionError(f'{nombre}: la línea base no coincide con sus huellas: {problemas}')
+            pd.testing.assert_frame_equal(base.leer(), cargar(tmp / 'ref.xlsx'))
+            for id_texto in (False, True):
+                df_ref = cargar(tmp / 'ref.xlsx', id_texto=id_texto)
+                df_new = cargar(tmp / 'new.xlsx', id_texto=id_texto)
+                for coercion in COERCIONES:
+                    for recortar in (False, True):
+                        esperado = comparar(df_ref, df_new, coercion=coercion, recortar=recortar)
+                        obtenido = base.comparar(df_new, coercion=coercion, recortar=recortar, id_texto=id_texto)
+                        if (any(getattr(esperado, c) != getattr(obtenido, c) for c in _CAMPOS)
+                                or not _iguales(esperado.difs, obtenido.difs)):
+                            raise AssertionError(f'{nombre}: la línea base difiere del Excel (coerción {coercion}, '
+                                                 f'id_texto={id_texto}, recortar={recortar})')
+            print(f'Paridad línea base/Excel verificada: {nombre} ({len(esperado.difs)} diferencias)')
+
+
+def medir(ref, new, en_frio: bool):
+    t0 = time.perf_counter()
+    df_new = cargar(new, id_texto=True)
+    t_new = time.perf_counter() - t0
+    print(f'nuevo: {len(df_new)} filas x {df_new.shape[1]} columnas, carga {t_new:.2f}s (caché columnar)')
+
+    if en_frio:
+        t0 = time.perf_counter()
+        pd.read_excel(ref)
+        print(f'referencia desde Excel sin caché: {time.perf_counter() - t0:.2f}s')
+
+    t0 = time.perf_counter()
+    df_ref = cargar(ref, id_texto=True)
+    t_carga = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    esperado = comparar(df_ref, df_new)
+    t_diff = time.perf_counter() - t0
+    print(f'referencia vía caché columnar: carga {t_carga:.2f}s + diff {t_diff:.2f}s = {t_carga + t_diff:.2f}s')
+
+    t0 = time.perf_counter()
+    meta = bendecir(ref)
+    print(f"bendecir ({meta['filas']} filas, una sola vez): {time.perf_counter() - t0:.2f}s")
+    t0 = time.perf_counter()
+    base = abrir(ref)
+    t_carga = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    obtenido = base.comparar(df_new, id_texto=True)
+    t_diff = time.perf_counter() - t0
+    print(f'línea base bendecida: apertura {t_carga:.2f}s + diff {t_diff:.2f}s = {t_carga + t_diff:.2f}s '
+          f'({obtenido.filas_comparadas} filas comparadas)')
+    if not _iguales(esperado.difs, obtenido.difs):
+        raise AssertionError('la línea base difiere de la comparación con el Excel')
+    print(f'{len(obtenido.difs)} diferencias, idénticas por ambos caminos')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Paridad y benchmark de la línea base bendecida')
+    parser.add_argument('--ref', help='Excel de referencia para medir (se bendice una copia de su línea base)')
+    parser.add_argument('--new', help='Excel nuevo para medir')
+    parser.add_argument('--filas', type=int, default=2000, help='Filas de los casos sintéticos de paridad')
+    parser.add_argument('--en-frio', action='store_true', help='Medir también la lectura del Excel sin caché')
+    args = parser.parse_args()
+
+    verificar_paridad(args.filas)
+    if args.ref and args.new:
+        medir(args.ref, args.new, args.en_frio)
+
+
+if __name__ == '__main__':
+    main()
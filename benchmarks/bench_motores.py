@@ -0,0 +1,81 @@
+"""Benchmark de los motores de proceso: pandas (proceso.py) contra Polars (motor_polars.py).
+
+Para cada tamaño de datos sintéticos (benchmarks/generador.py) se construye df_out con ambos motores. Que las
+salidas y la validación sean idénticas se prueba en tests/test_motores.py; aquí sólo se mide.
+
+Polars fija su número de hilos al importarse, así que cada cantidad de --hilos corre en un proceso propio
+(POLARS_MAX_THREADS). Se mide construir_salida con la caché columnar ya convertida (lectura + filtro + cruce +
+proyección + validación; sin escritura), mejor de --repeticiones. pandas usa un solo núcleo en todos los casos.
+
+Uso: python benchmarks/bench_motores.py --filas 10000 100000 --hilos 1 2 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def medir(input1, input2, repeticiones: int) -> dict:
+    """Corre en el proceso hijo: mejores tiempos de cada motor."""
+    import polars as pl
+
+    from maestro import cargar_indice
+    from proceso import construir_salida, especificacion_por_defecto
+    from validacion import Validador
+
+    espec = especificacion_por_defecto()
+    indice = cargar_indice(input2)
+    tiempos, filas = {}, 0
+    for motor in ('pandas', 'polars'):
+        construir_salida(input1, indice, avisos=False, espec=espec, motor=motor)  # caché columnar y plan
+        mejores = []
+        for _ in range(repeticiones):
+            validador = Validador(espec)
+            t0 = time.perf_counter()
+            df_out = construir_salida(input1, indice, avisos=False, espec=espec, validador=validador, motor=motor)
+            mejores.append(time.perf_counter() - t0)
+        tiempos[motor], filas = min(mejores), len(df_out)
+    return {'filas': filas, 'hilos': pl.thread_pool_size(), **tiempos}
+
+
+def en_subproceso(input1, input2, hilos: int, repeticiones: int) -> dict:
+    entorno = {**os.environ, 'POLARS_MAX_THREADS': str(hilos)}
+    salida = subprocess.run([sys.executable, __file__, '--medir', str(input1), str(input2), str(repeticiones)],
+                            env=entorno, cwd=RAIZ, check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los motores pandas y Polars')
+    parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--hilos', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--medir', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        input1, input2, repeticiones = args.medir
+        print(json.dumps(medir(input1, input2, int(repeticiones))))
+        return
+
+    from generador import DIR_DATOS, preparar
+
+    print(f"{'filas':>9} {'hilos':>6} {'pandas (s)':>11} {'polars (s)':>11} {'aceleración':>12}")
+    for n in args.filas:
+        input1, input2 = preparar(n, args.seed, DIR_DATOS, avisar=False)
+        for hilos in args.hilos:
+            r = en_subproceso(input1, input2, hilos, args.repeticiones)
+            print(f"{r['filas']:>9} {r['hilos']:>6} {r['pandas']:>11.3f} {r['polars']:>11.3f} "
+                  f"{r['pandas'] / r['polars']:>11.1f}x")
+
+
+if __name__ == '__main__':
+    main()
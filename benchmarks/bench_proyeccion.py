@@ -0,0 +1,115 @@
+"""Benchmark de la proyección de columnas: recorrido por filas (iterrows) vs. proyección vectorizada.
+También compara la memoria de df_out con todas las columnas object (como la construía el recorrido por
+filas) contra la del esquema de tipos compactos (esquema.py).
+
+Uso: python benchmarks/bench_proyeccion.py --filas 10000 100000 1000000
+El recorrido por filas sólo se mide sobre una muestra (--muestra-legacy) y se extrapola linealmente,
+ya que a 1M de filas tardaría horas."""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import creadordf  # noqa: E402
+from creadordf import MAPPING_DIRECTO, OUTPUT_COLUMNS, SIN_PREFIJO  # noqa: E402
+from escalares import calcular_tipo_nps, map_generacion  # noqa: E402
+from esquema import memoria_mb  # noqa: E402
+
+
+def proyectar_iterrows(df_in: pd.DataFrame) -> pd.DataFrame:
+    """Copia del bucle original de creadordf.py, usada como referencia de paridad y de tiempo."""
+    salida_rows = []
+    for idx, row in df_in.iterrows():
+        out = {col: pd.NA for col in OUTPUT_COLUMNS}
+        out['Unnamed: 0'] = str(len(salida_rows))
+        for col_src, col_dst in MAPPING_DIRECTO.items():
+            match_val = None
+            if col_src in row.index:
+                match_val = row[col_src]
+            else:
+                if col_src not in SIN_PREFIJO:
+                    for candidate in row.index:
+                        if str(candidate).startswith(col_src):
+                            match_val = row[candidate]
+                            break
+            if match_val is not None and col_dst is not None:
+                out[col_dst] = match_val if pd.notna(match_val) else pd.NA
+        out['SATISFACCION COVID'] = pd.NA
+        out['RESULTADO SATISFACCION'] = pd.NA
+        for var in ('VARIABLE 1', 'VARIABLE 2', 'VARIABLE 3'):
+            if var in df_in.columns:
+                out[var] = row.get(var)
+        out['Generación'] = map_generacion(out.get('AÑO NACIMIENTO'))
+        out['Tipo NPS'] = calcular_tipo_nps(out.get('SATISFACCION GENERAL'))
+        if 'EMPRESA' in df_in.columns and pd.notna(row.get('EMPRESA')):
+            out['EMPRESA'] = row.get('EMPRESA')
+        else:
+            out['EMPRESA'] = creadordf.EMPRESA_DEFECTO
+        out['SATISFACCIÓN MODALIDAD DE TRABAJO'] = pd.NA
+        salida_rows.append(out)
+    df_out = pd.DataFrame(salida_rows, columns=OUTPUT_COLUMNS)
+    df_out['DEPRESIÓN'] = df_out['DEPRESION USTED']
+    df_out['ANSIEDAD'] = df_out['ANSIEDAD USTED']
+    return df_out
+
+
+def generar_entrada(n: int, seed: int = 0) -> pd.DataFrame:
+    """Encuesta sintética ya filtrada y unida al maestro, con encabezados que sólo coinciden por prefijo."""
+    rng = np.random.default_rng(seed)
+    datos = {'ID': pd.Series(rng.integers(10**6, 10**10, n)).astype(str)}
+    for i, col_src in enumerate(MAPPING_DIRECTO):
+        header = col_src if col_src in SIN_PREFIJO or i % 2 else f'{col_src} (texto completo de la pregunta)'
+        if 'Año de nacimiento' in col_src:
+            datos[header] = pd.Series(rng.integers(1940, 2015, n)).astype(str)
+        elif col_src == 'Fecha y hora':
+            datos[header] = '02.05.2023 08:13'
+        elif col_src == 'Estado de la participación':
+            datos[header] = 'Participación completa'
+        else:
+            valores = rng.integers(0, 11, n).astype(float)
+            valores[rng.random(n) < 0.1] = np.nan
+            datos[header] = valores
+    datos['VARIABLE 1'] = rng.choice(['HACIENDA', 'EDUCACIÓN', 'DESARROLLO SOCIAL'], n)
+    datos['VARIABLE 2'] = rng.choice(['A', 'B'], n)
+    datos['VARIABLE 3'] = rng.choice(['FUNZA', 'BOGOTA', None], n)
+    datos['EMPRESA'] = rng.choice(['EMPRESA X', None], n)
+    return pd.DataFrame(datos)
+
+
+def _normalizado(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype(object).where(df.notna(), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la proyección de columnas de creadordf.py')
+    parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--muestra-legacy', type=int, default=5_000, help='Filas máximas medidas con iterrows')
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} {'iterrows (s)':>14} {'vectorizado (s)':>16} {'speedup':>9} {'MB object':>10} {'MB esquema':>11}")
+    for n in args.filas:
+        df_in = generar_entrada(n)
+        muestra = min(n, args.muestra_legacy)
+
+        t0 = time.perf_counter()
+        legacy = proyectar_iterrows(df_in.iloc[:muestra])
+        t_legacy = (time.perf_counter() - t0) * n / muestra
+
+        t0 = time.perf_counter()
+        df_out = creadordf.proyectar(df_in)
+        t_vec = time.perf_counter() - t0
+
+        if not _normalizado(legacy).equals(_normalizado(df_out.iloc[:muestra])):
+            raise AssertionError(f'La proyección vectorizada difiere del recorrido por filas (n={n})')
+        mb_object = memoria_mb(df_out.astype(object).where(df_out.notna(), pd.NA))
+        nota = '' if muestra == n else ' (iterrows extrapolado)'
+        print(f'{n:>10} {t_legacy:>14.2f} {t_vec:>16.3f} {t_legacy / t_vec:>8.0f}x {mb_object:>10.1f} '
+              f'{memoria_mb(df_out):>11.1f}{nota}')
+
+
+if __name__ == '__main__':
+    main()
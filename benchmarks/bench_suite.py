@@ -0,0 +1,163 @@
+"""Suite de benchmarks de extremo a extremo sobre datos sintéticos (benchmarks/generador.py), de 1k a 1M.
+
+Por cada tamaño se miden, con instrumentacion.Medidor (tiempo de reloj y CPU, memoria, filas):
+    lectura_fria / lectura      encuesta vía la caché columnar (conversión inicial y lectura ya cacheada)
+    maestro_frio / maestro      índice del maestro (construcción con cédulas sucias y desde caché)
+    filtro, cruce, proyeccion   las etapas de construir_salida
+    validacion                  reglas de calidad de datos (validacion.py) sobre el bloque proyectado
+    escritura_<formato>         cada backend de salida (xlsx sólo hasta --max-xlsx filas)
+    compare, analysis           ambas herramientas de comparación contra una copia alterada de la salida
+    comparacion_disco           diferencias_bloques.py (sólo hasta --max-disco filas)
+
+Aparte, una vez por corrida, el arranque de la línea de comandos en procesos nuevos (sección "arranque"):
+    ayuda                       python creadordf.py --help (no debe importar pandas)
+    comprobar                   python creadordf.py --comprobar sobre el primer tamaño
+    importacion_proceso         import proceso (pandas y todas las etapas; lo que paga cada corrida real)
+
+Cada tamaño corre en una carpeta temporal propia, así las cachés (.cache/...) empiezan vacías y las
+etapas "frías" son comparables entre corridas. Los resultados se escriben en JSON (--out) con el mismo
+formato de etapas que el reporte de creadordf.py --reporte, para seguir regresiones entre versiones.
+
+Uso: python benchmarks/bench_suite.py --filas 1000 10000 100000 [--out benchmarks/resultados.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import creadordf  # noqa: E402
+from analysis import diff_by_id  # noqa: E402
+from compare import comparar_por_id  # noqa: E402
+from generador import DIR_DATOS, VERSION_GENERADOR, escribir_xlsx, perturbar_salida, preparar  # noqa: E402
+from ingesta import leer_excel  # noqa: E402
+from instrumentacion import VERSION_REPORTE, Medidor, entorno  # noqa: E402
+from maestro import cargar_indice  # noqa: E402
+from salida import escribir_salida, ruta_para_formato  # noqa: E402
+from validacion import Validador  # noqa: E402
+
+FORMATOS_BENCH = ['parquet', 'feather', 'csv', 'xlsxwriter', 'xlsx']
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def medir_arranque(input1, input2) -> Medidor:
+    """Cada comando en un intérprete nuevo, como lo paga quien lo invoca."""
+    medidor = Medidor()
+    comandos = {
+        'ayuda': [str(RAIZ / 'creadordf.py'), '--help'],
+        'comprobar': [str(RAIZ / 'creadordf.py'), '--comprobar', '--input1', str(input1), '--input2', str(input2)],
+        'importacion_proceso': ['-c', 'import proceso'],
+    }
+    for nombre, comando in comandos.items():
+        with medidor.etapa(nombre):
+            subprocess.run([sys.executable, *comando], cwd=RAIZ, check=True, stdout=subprocess.DEVNULL)
+    return medidor
+
+
+def medir_tamano(n: int, seed: int, dir_datos, formatos, max_xlsx: int, max_disco: int) -> Medidor:
+    input1, input2 = preparar(n, seed, dir_datos)
+    medidor = Medidor()
+    previo = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f'bench-{n}-') as tmp:
+        os.chdir(tmp)
+        try:
+            _etapas(medidor, input1, input2, Path(tmp), formatos, max_xlsx, n <= max_disco)
+        finally:
+            os.chdir(previo)
+    return medidor
+
+
+def _etapas(medidor: Medidor, input1, input2, tmp: Path, formatos, max_xlsx: int, disco: bool):
+    usadas = creadordf.columnas_usadas(input1)
+    with medidor.etapa('lectura_fria') as e:
+        df_in = leer_excel(input1, columnas=usadas)
+        e.filas_salida = len(df_in)
+    with medidor.etapa('lectura') as e:
+        df_in = leer_excel(input1, columnas=usadas)
+        e.filas_salida = len(df_in)
+    with medidor.etapa('maestro_frio') as e:
+        e.filas_salida = len(cargar_indice(input2))
+    with medidor.etapa('maestro') as e:
+        indice = cargar_indice(input2)
+        e.filas_salida = len(indice)
+
+    with medidor.etapa('filtro', len(df_in)) as e:
+        df_in = creadordf.filtrar_completas(df_in)
+        e.filas_salida = len(df_in)
+    with medidor.etapa('cruce', len(df_in)) as e:
+        df_in = indice.cruzar(df_in, 'ID')
+        e.filas_salida = len(df_in)
+    plan = creadordf.resolver_columnas(df_in.columns)
+    with medidor.etapa('proyeccion', len(df_in)) as e:
+        df_out = creadordf.proyectar(df_in, plan)
+        e.filas_salida = len(df_out)
+    with medidor.etapa('validacion', len(df_out)) as e:
+        Validador(creadordf.ESPEC).validar(df_in, df_out, plan, list(df_in.columns))
+
+    for formato in formatos:
+        if formato == 'xlsx' and len(df_out) > max_xlsx:
+            continue
+        with medidor.etapa(f'escritura_{formato}', len(df_out)) as e:
+            escribir_salida(df_out, ruta_para_formato(tmp / f'salida_{formato}', formato), formato)
+            e.filas_salida = len(df_out)
+
+    ref_path, new_path = tmp / 'ref.xlsx', tmp / 'new.xlsx'
+    escribir_xlsx(df_out, ref_path)
+    escribir_xlsx(perturbar_salida(df_out), new_path)
+    with medidor.etapa('compare', len(df_out)) as e:
+        difs, _ = comparar_por_id(leer_excel(ref_path), leer_excel(new_path))
+        e.filas_salida = len(difs)
+    with medidor.etapa('analysis', len(df_out)) as e:
+        ref, new = leer_excel(ref_path), leer_excel(new_path)
+        ref['ID'], new['ID'] = ref['ID'].astype(str), new['ID'].astype(str)
+        e.filas_salida = len(diff_by_id(ref, new))
+    if disco:
+        from diferencias_bloques import comparar_en_disco
+        with medidor.etapa('comparacion_disco', len(df_out)) as e:
+            e.filas_salida = comparar_en_disco(ref_path, new_path, tmp / 'difs.csv')['diferencias']
+
+
+def imprimir(n: int, medidor: Medidor):
+    print(f'--- {n} participantes ---')
+    medidor.imprimir()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de extremo a extremo sobre encuestas sintéticas')
+    parser.add_argument('--filas', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='Tamaños (participantes); 1000000 es posible pero generar el libro tarda minutos')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dir-datos', default=str(DIR_DATOS), help='Carpeta de los libros generados (se reutilizan)')
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS_BENCH, default=FORMATOS_BENCH)
+    parser.add_argument('--max-xlsx', type=int, default=100_000, help='Tamaño máximo medido con el escritor openpyxl')
+    parser.add_argument('--max-disco', type=int, default=100_000, help='Tamaño máximo para la comparación en disco')
+    parser.add_argument('--out', default='benchmarks/resultados.json', help='Resultados en JSON')
+    args = parser.parse_args()
+
+    dir_datos = Path(args.dir_datos).resolve()
+    out = Path(args.out).resolve()
+    t0 = time.perf_counter()
+    arranque = medir_arranque(*preparar(args.filas[0], args.seed, dir_datos))
+    print('--- arranque ---')
+    arranque.imprimir()
+    resultados = []
+    for n in args.filas:
+        medidor = medir_tamano(n, args.seed, dir_datos, args.formatos, args.max_xlsx, args.max_disco)
+        imprimir(n, medidor)
+        resultados.append({'filas': n, 'etapas': medidor.reporte()['etapas']})
+
+    datos = {'version': VERSION_REPORTE, 'generador': VERSION_GENERADOR, 'seed': args.seed,
+             'entorno': entorno(), 'segundos': round(time.perf_counter() - t0, 2),
+             'arranque': arranque.reporte()['etapas'], 'resultados': resultados}
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(datos, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'Resultados en {out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Funciones escalares originales de creadordf.py (una llamada por valor), copiadas tal cual como referencia:
+bench_derivados.py y bench_proyeccion.py las miden y tests/test_derivados.py las usa como oráculo de paridad
+de derivados.py. El proceso ya no las usa."""
+import re
+
+import pandas as pd
+
+
+def normalizar_id(id_str):
+    if pd.isna(id_str):
+        return pd.NA
+    solo = re.sub(r'\D', '', str(id_str))
+    return solo if solo else pd.NA
+
+
+def calcular_tipo_nps(valor):
+    try:
+        v = int(valor)
+    except (ValueError, TypeError):
+        return pd.NA
+    if v >= 9: return "Entusiastas"
+    if v >= 7: return "Pasivos"
+    if v >= 0: return "Detractores"
+    return pd.NA
+
+
+def map_generacion(anio_str: str):
+    if pd.isna(anio_str):
+        return pd.NA
+    s = str(anio_str)
+    m = re.search(r'\d{4}', s)
+    if not m:
+        return pd.NA
+    y = int(m.group())
+    if 1946 <= y <= 1964: return 'Baby Boomers'
+    if 1965 <= y <= 1980: return 'Generación X'
+    if 1981 <= y <= 1996: return 'Millennials'
+    if 1997 <= y <= 2012: return 'Centennials'
+    return pd.NA
+
+
+def limpiar_area(area: str):
+    if pd.isna(area):
+        return pd.NA
+    a = str(area).strip().upper()
+    a = re.sub(r'^SECRETAR[ÍI]A\s+DE\s+', '', a)
+    a = a.replace('  ', ' ').strip()
+    return a
@@ -0,0 +1,183 @@
+"""Generador de encuestas y maestros sintéticos con la estructura real, de 1k a 1M de participantes.
+
+La encuesta (INPUT1) tiene los encabezados origen de MAPPING_DIRECTO en sus variantes de texto completo de
+la pregunta (sólo coinciden por prefijo, salvo los de SIN_PREFIJO), los encabezados de sección vacíos, la
+columna de estado con participaciones incompletas y la columna ID. El maestro (INPUT2) trae cédulas sucias
+('1.014.192.236', 'CC 80428666', con espacios o numéricas), áreas con prefijo 'SECRETARÍA DE' y dobles
+espacios, EMPRESA vacía en parte de las filas, participantes ausentes e IDs repetidos (iguales o en conflicto).
+
+Los libros se escriben con xlsxwriter (memoria constante) y se guardan en --dir con nombre por tamaño,
+semilla y VERSION_GENERADOR, así que las corridas siguientes del benchmark los reutilizan.
+
+Uso: python benchmarks/generador.py --filas 1000 100000 --dir benchmarks/datos
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from creadordf import MAPPING_DIRECTO, SIN_PREFIJO  # noqa: E402
+from salida import abrir_escritor  # noqa: E402
+
+VERSION_GENERADOR = 1
+DIR_DATOS = Path(__file__).resolve().parent / 'datos'
+TAM_BLOQUE = 20_000
+
+AREAS = ['SECRETARÍA DE HACIENDA', 'Secretaria de  Educación ', 'secretaría de desarrollo social', 'DESPACHO DEL ALCALDE',
+         'SECRETARIA DE  GERENCIA DE BUEN GOBIERNO', 'Oficina Jurídica', None]
+CIUDADES = ['FUNZA', 'BOGOTA', 'SOACHA', 'MOSQUERA', 'MADRID', 'EN BLANCO', None]
+ESTADOS = ['Participación completa', 'ha participado pero todavía no ha concluído']
+SECCIONES = ['4. Por favor elija una opción de respuesta a cada afirmación.',
+             '5. Por favor elija una opción de respuesta a cada afirmación.',
+             '6. Por favor elija una opción de respuesta a cada afirmación.']
+TEXTOS = {
+    'GENERO': ['Femenino', 'Masculino', 'Prefiero no responder'],
+    'ESTADO CIVIL': ['Soltero(a)', 'Casado(a)', 'Unión libre', 'Separado(a)'],
+    'NIVEL ESTUDIOS': ['Bachiller', 'Técnico', 'Profesional', 'Posgrado'],
+    'MODALIDAD DE TRABAJO': ['Presencial', 'Remoto', 'Alternancia'],
+    'TIPO CONTRATO': ['Carrera administrativa', 'Provisional', 'Prestación de servicios'],
+    'ANTIGÜEDAD': ['Menos de 1 año', 'Entre 1 y 3 años', 'Más de 3 años'],
+}
+
+
+def encabezado_variante(col_src: str, i: int) -> str:
+    """Encabezado tal como llega en la encuesta: texto completo de la pregunta, que sólo empieza por col_src."""
+    if col_src in SIN_PREFIJO:
+        return col_src
+    return f'{col_src} de la entidad y su entorno de trabajo (pregunta {i})'
+
+
+def _valores(destino: str, n: int, rng) -> np.ndarray:
+    if destino in ('SATISFACCION GENERAL', 'SATISFACCION CONDICIONES'):
+        valores = rng.integers(1, 11, n).astype(object)
+    elif destino == 'AÑO NACIMIENTO':
+        valores = rng.integers(1950, 2005, n).astype(str).astype(object)
+    elif destino == 'FECHA':
+        valores = np.array([f'{d:02d}.05.2023 {h:02d}:{m:02d}' for d, h, m in
+                            zip(rng.integers(1, 29, n), rng.integers(7, 19, n), rng.integers(0, 60, n))], dtype=object)
+    elif destino == 'COMENTARIOS':
+        valores = np.where(rng.random(n) < 0.1, 'Comentario libre del participante', None).astype(object)
+    elif destino in TEXTOS:
+        valores = rng.choice(np.array(TEXTOS[destino], dtype=object), n)
+    elif destino in ('VARIABLE 1', 'VARIABLE 3'):
+        valores = rng.choice(np.array(AREAS if destino == 'VARIABLE 1' else CIUDADES, dtype=object), n)
+    else:
+        valores = rng.integers(0, 5, n).astype(object)  # escala de acuerdo 0-4 de los bloques de clima
+    nulos = rng.random(n) < 0.03
+    valores[nulos] = None
+    return valores
+
+
+def generar_encuesta(n: int, seed: int = 0, incompletas: float = 0.01) -> pd.DataFrame:
+    """INPUT1 sintético con n participantes (cédulas únicas)."""
+    rng = np.random.default_rng(seed)
+    cedulas = rng.choice(np.arange(10**7, 10**7 + max(n * 20, 10**6)), n, replace=False)
+    datos = {
+        '_ID de respuesta': rng.integers(10**7, 10**8, n),
+        'Resume-Code': np.array([f'x{c:06x}' for c in rng.integers(0, 16**6, n)], dtype=object),
+        'ID': cedulas.astype(str).astype(object),
+    }
+    vistos = set()
+    for i, (col_src, destino) in enumerate(MAPPING_DIRECTO.items()):
+        if destino is not None and destino in vistos:
+            continue  # otra variante de la misma pregunta ('11. Año de nacimiento.')
+        vistos.add(destino)
+        if col_src == 'IDs / TAN del participante':
+            datos[col_src] = cedulas
+        elif col_src == 'Estado de la participación':
+            datos[col_src] = np.where(rng.random(n) < incompletas, ESTADOS[1], ESTADOS[0]).astype(object)
+        else:
+            datos[encabezado_variante(col_src, i)] = _valores(destino, n, rng)
+        if i % 25 == 0:
+            datos[SECCIONES[(i // 25) % len(SECCIONES)] + f' ({i})'] = np.full(n, None, dtype=object)
+    return pd.DataFrame(datos)
+
+
+def _cedula_sucia(cedula: int, k: int) -> object:
+    if k == 0:
+        return f'{cedula:,}'.replace(',', '.')
+    if k == 1:
+        return f'CC {cedula}'
+    if k == 2:
+        return f' {cedula} '
+    return int(cedula)
+
+
+def generar_maestro(encuesta: pd.DataFrame, seed: int = 0, ausentes: float = 0.05, repetidos: float = 0.01) -> pd.DataFrame:
+    """INPUT2 sintético para esa encuesta: faltan `ausentes` participantes y `repetidos` aparecen dos veces
+    (la mitad con los mismos valores y la otra mitad con un área distinta)."""
+    rng = np.random.default_rng(seed + 1)
+    cedulas = encuesta['IDs / TAN del participante'].to_numpy()
+    cedulas = cedulas[rng.random(len(cedulas)) >= ausentes]
+    n = len(cedulas)
+    maestro = pd.DataFrame({
+        'Cédula ': [_cedula_sucia(int(c), k) for c, k in zip(cedulas, rng.integers(0, 4, n))],
+        'VARIABLE 1': rng.choice(np.array(AREAS, dtype=object), n),
+        'VARIABLE 2': np.array([f'CARGO {k}' for k in rng.integers(1, 30, n)], dtype=object),
+        'VARIABLE 3': rng.choice(np.array(CIUDADES, dtype=object), n),
+        'EMPRESA': np.where(rng.random(n) < 0.2, None, 'ALCALDIA FUNZA').astype(object),
+    })
+    dup = maestro.sample(frac=repetidos, random_state=seed).copy()
+    conflicto = np.arange(len(dup)) % 2 == 1
+    dup.loc[dup.index[conflicto], 'VARIABLE 1'] = 'SECRETARÍA DE  OTRA ÁREA'
+    return pd.concat([maestro, dup], ignore_index=True)
+
+
+def perturbar_salida(df_out: pd.DataFrame, cambios: float = 0.01, faltantes: float = 0.005, seed: int = 0) -> pd.DataFrame:
+    """Copia de una salida con una fracción `cambios` de celdas alteradas y `faltantes` filas eliminadas, para
+    medir las herramientas de comparación con diferencias realistas (pocas y dispersas)."""
+    rng = np.random.default_rng(seed + 2)
+    nuevo = df_out.astype(object)
+    columnas = [c for c in nuevo.columns if c not in ('ID', 'Unnamed: 0')]
+    for col in rng.choice(columnas, max(1, int(len(columnas) * 0.2)), replace=False):
+        tocadas = rng.random(len(nuevo)) < cambios * 5
+        nuevo.loc[tocadas, col] = 'Otro valor'
+    return nuevo[rng.random(len(nuevo)) >= faltantes].reset_index(drop=True)
+
+
+def escribir_xlsx(df: pd.DataFrame, path):
+    """Libro xlsx por bloques con xlsxwriter (memoria constante también a 1M de filas)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp.xlsx')
+    with abrir_escritor('xlsxwriter', tmp, df.columns) as escritor:
+        for inicio in range(0, len(df), TAM_BLOQUE):
+            escritor.escribir(df.iloc[inicio:inicio + TAM_BLOQUE])
+    tmp.replace(path)
+
+
+def rutas(n: int, seed: int = 0, dir_datos=DIR_DATOS) -> tuple:
+    base = Path(dir_datos) / f'n{n}-s{seed}-v{VERSION_GENERADOR}'
+    return base / 'input1.xlsx', base / 'input2.xlsx'
+
+
+def preparar(n: int, seed: int = 0, dir_datos=DIR_DATOS, avisar: bool = True) -> tuple:
+    """(input1, input2) para n participantes, generándolos sólo si no existen ya."""
+    encuesta_path, maestro_path = rutas(n, seed, dir_datos)
+    if encuesta_path.exists() and maestro_path.exists():
+        return encuesta_path, maestro_path
+    t0 = time.perf_counter()
+    encuesta = generar_encuesta(n, seed)
+    escribir_xlsx(generar_maestro(encuesta, seed), maestro_path)
+    escribir_xlsx(encuesta, encuesta_path)
+    if avisar:
+        print(f'Generados {encuesta_path.parent} ({n} participantes) en {time.perf_counter() - t0:.1f}s')
+    return encuesta_path, maestro_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera encuestas y maestros sintéticos para los benchmarks')
+    parser.add_argument('--filas', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dir', default=str(DIR_DATOS), help='Carpeta de los libros generados')
+    args = parser.parse_args()
+    for n in args.filas:
+        preparar(n, args.seed, args.dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Lectura de Excel por bloques (openpyxl en modo read-only).
+
+Permite procesar encuestas muy grandes con memoria acotada: nunca se materializa el libro completo,
+sólo un bloque de filas a la vez. La escritura por bloques está en salida.py.
+"""
+import openpyxl
+import pandas as pd
+
+from ingesta import encabezados
+
+
+def leer_bloques(path, columnas=None, tam_bloque: int = 5000):
+    """Genera DataFrames de hasta tam_bloque filas con los valores tal como están en las celdas.
+    Los encabezados son los mismos que da pd.read_excel; `columnas` restringe las columnas cargadas."""
+    nombres = encabezados(path)
+    if columnas is None:
+        posiciones = list(range(len(nombres)))
+    else:
+        pedidas = set(columnas)
+        posiciones = [i for i, c in enumerate(nombres) if c in pedidas]
+    cols = [nombres[i] for i in posiciones]
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        filas = wb.worksheets[0].iter_rows(min_row=2, values_only=True)  # la hoja que lee pd.read_excel
+        bloque = []
+        for fila in filas:
+            if all(v is None for v in fila):
+                continue  # read_excel descarta las filas vacías
+            bloque.append([fila[i] if i < len(fila) else None for i in posiciones])
+            if len(bloque) >= tam_bloque:
+                yield pd.DataFrame(bloque, columns=cols, dtype=object)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=cols, dtype=object)
+    finally:
+        wb.close()
@@ -0,0 +1,351 @@
+"""Cubo pre-agregado de resultados de clima, NPS e interés en beneficios.
+
+En lugar de recargar la salida y repetir los group-by en cada actualización de los tableros, creadordf.py
+(--cubo) agrega la salida que ya tiene en memoria por cada combinación de dimensiones (EMPRESA, VARIABLE
+1/2/3, Generación, GENERO...) y guarda, por medida, el conteo, la suma y la suma de cuadrados:
+
+    participantes          filas de la combinación
+    <escala>|n|suma|suma2  escalas de clima y satisfacción (valores no numéricos no cuentan)
+    <col>=<valor>|...      categorías como 0/1 sobre las filas con valor (p.ej. Tipo NPS=Entusiastas)
+    <marca>|...            marcas de selección múltiple como 0/1 sobre todas las filas (interés en servicios)
+
+Las tres cantidades son sumables, así que el cubo se combina con otro (participantes nuevos) o se le
+resta la contribución de filas que cambiaron sin volver a leer la salida; cualquier roll-up o drill-down
+(NPS, promedio por bloque de clima, tasas de interés, desviación) sale de sumar filas del cubo, que son
+a lo sumo unos miles. Qué se agrega lo define la sección "cubo" de la especificación.
+
+El cubo se guarda en Parquet (<salida>.cubo.parquet) con la huella de su definición en los metadatos.
+
+Uso: python cubo.py output.xlsx.cubo.parquet [otro.cubo.parquet ...] --por "VARIABLE 1" --donde GENERO=Femenino
+"""
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ingesta import escritura_atomica
+
+VERSION_CUBO = 1
+PARTICIPANTES = 'participantes'
+ESTADISTICOS = ('n', 'suma', 'suma2')
+_META = b'cubo'
+
+
+def ruta_cubo(output) -> Path:
+    output = Path(output)
+    return output.with_name(output.name + '.cubo.parquet')
+
+
+@dataclass(frozen=True)
+class DefinicionCubo:
+    """Sección "cubo" de la especificación ya compilada."""
+    huella: str
+    dimensiones: tuple
+    # (nombre del bloque, columnas); sus columnas son escalas
+    bloques: tuple
+    escalas: tuple
+    # (columna, valores)
+    categorias: tuple
+    marcas: tuple
+    # (columna, valor promotor, valor detractor) o None
+    nps: tuple = None
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> 'DefinicionCubo':
+        bloques = tuple((nombre, tuple(cols)) for nombre, cols in datos.get('bloques', {}).items())
+        escalas = [c for _, cols in bloques for c in cols]
+        escalas += [c for c in datos.get('escalas', []) if c not in escalas]
+        nps = datos.get('nps')
+        categorias = {col: list(valores) for col, valores in datos.get('categorias', {}).items()}
+        if nps:
+            valores = categorias.setdefault(nps['columna'], [])
+            valores += [v for v in (nps['promotores'], nps['detractores']) if v not in valores]
+        texto = json.dumps(datos, sort_keys=True, ensure_ascii=False)
+        return cls(
+            huella=hashlib.sha256(f'v{VERSION_CUBO}:{texto}'.encode()).hexdigest(),
+            dimensiones=tuple(datos['dimensiones']),
+            bloques=bloques,
+            escalas=tuple(escalas),
+            categorias=tuple((col, tuple(valores)) for col, valores in categorias.items()),
+            marcas=tuple(datos.get('marcas', ())),
+            nps=(nps['columna'], nps['promotores'], nps['detractores']) if nps else None,
+        )
+
+    @property
+    def medidas(self) -> list:
+        return (list(self.escalas) + [categoria(col, v) for col, valores in self.categorias for v in valores]
+                + list(self.marcas))
+
+    @property
+    def estadisticos(self) -> list:
+        return [PARTICIPANTES] + [f'{m}|{e}' for m in self.medidas for e in ESTADISTICOS]
+
+
+def categoria(columna: str, valor) -> str:
+    return f'{columna}={valor}'
+
+
+def _numerico(serie: pd.Series) -> np.ndarray:
+    """Valores como float (NaN si faltan o no son numéricos). Las categóricas se convierten por categoría."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        valores = _numerico(pd.Series(serie.cat.categories))
+        return np.append(valores, np.nan)[serie.cat.codes.to_numpy()]  # código -1 (nulo) -> NaN
+    if pd.api.types.is_bool_dtype(serie):
+        return np.full(len(serie), np.nan)
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=float, na_value=np.nan)
+    return pd.to_numeric(serie.astype(object), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def _etiquetas(serie: pd.Series) -> pd.Series:
+    """Valores de una dimensión como texto (None si faltan): el cubo no depende del tipo de cada salida."""
+    valores = serie.astype(object)
+    return valores.where(valores.isna(), valores.map(str)).where(valores.notna(), None)
+
+
+def _grupos(df: pd.DataFrame, dims) -> tuple:
+    """(código de grupo por fila, {dimensión: etiqueta de cada grupo}). Los códigos se combinan dimensión a
+    dimensión con factorize, así que no hay desbordes aunque las dimensiones tengan muchos valores."""
+    n = len(df)
+    grupo = np.zeros(n, dtype=np.int64)
+    codigos, etiquetas = [], []
+    for dim in dims:
+        if dim in df.columns:
+            codigo, unicos = pd.factorize(df[dim], use_na_sentinel=True)
+            valores = _etiquetas(pd.Series(np.asarray(unicos, dtype=object), dtype=object)).tolist() + [None]
+        else:
+            codigo, valores = np.full(n, -1), [None]
+        codigo = np.where(codigo < 0, len(valores) - 1, codigo)  # NA -> última etiqueta (None)
+        grupo = pd.factorize(grupo * len(valores) + codigo)[0]
+        codigos.append(codigo)
+        etiquetas.append(np.array(valores, dtype=object))
+    primeras = np.unique(grupo, return_index=True)[1]  # una fila representante por grupo, en orden de código
+    return grupo, {dim: valores[codigo[primeras]] for dim, codigo, valores in zip(dims, codigos, etiquetas)}
+
+
+def _medidas(df: pd.DataFrame, definicion: DefinicionCubo):
+    """(nombre, filas que cuentan, valor) de cada medida sobre las columnas de df."""
+    n = len(df)
+    ausente = (np.zeros(n, dtype=bool), np.zeros(n))
+    for col in definicion.escalas:
+        if col not in df.columns:
+            yield (col, *ausente)
+            continue
+        valores = _numerico(df[col])
+        yield col, ~np.isnan(valores), valores
+    for col, opciones in definicion.categorias:
+        serie = df[col].astype(object) if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+        validos = serie.notna().to_numpy()
+        for valor in opciones:
+            yield categoria(col, valor), validos, (serie == valor).to_numpy(dtype=float)
+    for col in definicion.marcas:
+        marcadas = df[col].notna().to_numpy(dtype=float) if col in df.columns else np.zeros(n)
+        yield col, np.ones(n, dtype=bool), marcadas
+
+
+class Cubo:
+    """Filas = combinaciones de dimensiones presentes; columnas = dimensiones + `definicion.estadisticos`.
+    `sumar`/`restar` acumulan otros cubos (p.ej. bloque a bloque) y se consolidan al consultar `datos`."""
+
+    def __init__(self, definicion: DefinicionCubo, datos: pd.DataFrame = None):
+        self.definicion = definicion
+        columnas = list(definicion.dimensiones) + definicion.estadisticos
+        self._partes = [_normalizar(datos, definicion.dimensiones) if datos is not None
+                        else pd.DataFrame(columns=columnas)]
+
+    @classmethod
+    def desde_salida(cls, df_out: pd.DataFrame, definicion: DefinicionCubo) -> 'Cubo':
+        """Agrega df_out (la salida tipada, en memoria) por las dimensiones de la definición: un código de
+        grupo por fila y una suma (np.bincount) por estadístico, sin tablas intermedias del tamaño de df_out."""
+        if not len(df_out):
+            return cls(definicion)
+        grupo, dimensiones = _grupos(df_out, definicion.dimensiones)
+        k = int(grupo.max()) + 1  # cantidad de grupos (los códigos son consecutivos desde 0)
+
+        def sumar(pesos):
+            return np.bincount(grupo, weights=pesos, minlength=k)
+
+        datos = dict(dimensiones)
+        datos[PARTICIPANTES] = np.bincount(grupo, minlength=k).astype(np.int64)
+        for nombre, validos, valores in _medidas(df_out, definicion):
+            valores = np.where(validos, valores, 0.0)
+            datos[f'{nombre}|n'] = np.bincount(grupo[validos], minlength=k).astype(np.int64)
+            datos[f'{nombre}|suma'] = sumar(valores)
+            datos[f'{nombre}|suma2'] = sumar(valores * valores)
+        return cls(definicion, pd.DataFrame(datos))
+
+    @property
+    def datos(self) -> pd.DataFrame:
+        if len(self._partes) > 1:
+            dims = list(self.definicion.dimensiones)
+            self._partes = [_normalizar(_consolidar(self._partes, dims), dims)]
+        return self._partes[0]
+
+    def __len__(self):
+        return len(self.datos)
+
+    def _compatible(self, otro: 'Cubo'):
+        if otro.definicion.huella != self.definicion.huella:
+            raise ValueError('Los cubos tienen definiciones distintas (la sección "cubo" de la especificación cambió)')
+
+    def sumar(self, otro: 'Cubo') -> 'Cubo':
+        self._compatible(otro)
+        self._partes.append(otro.datos)
+        return self
+
+    def restar(self, otro: 'Cubo') -> 'Cubo':
+        self._compatible(otro)
+        negado = otro.datos.copy()
+        negado[self.definicion.estadisticos] = -negado[self.definicion.estadisticos]
+        self._partes.append(negado)
+        return self
+
+    # --- Consultas --- #
+
+    def agregar(self, por=(), donde: dict = None) -> pd.DataFrame:
+        """Estadísticos sumados por las dimensiones `por` (roll-up de las demás) sobre las filas que cumplen
+        `donde` ({dimensión: valor o lista de valores})."""
+        datos = self.datos
+        for dim, valores in (donde or {}).items():
+            if dim not in self.definicion.dimensiones:
+                raise KeyError(f"'{dim}' no es una dimensión del cubo ({list(self.definicion.dimensiones)})")
+            valores = valores if isinstance(valores, (list, tuple, set)) else [valores]
+            datos = datos[datos[dim].isin([str(v) for v in valores])]
+        estadisticos = self.definicion.estadisticos
+        if not por:
+            return datos[estadisticos].sum().to_frame().T
+        return datos.groupby(list(por), dropna=False, sort=True)[estadisticos].sum()
+
+    def resultados(self, por=(), donde: dict = None, desviacion: bool = False) -> pd.DataFrame:
+        """Indicadores listos para el tablero: participantes, NPS, promedio de cada bloque de clima y de las
+        escalas sueltas, % de cada categoría y tasa de interés (%) de cada marca."""
+        suma = self.agregar(por, donde)
+        d = self.definicion
+
+        def col(nombre):
+            return suma[nombre].to_numpy(dtype=float)
+
+        def cociente(numerador, denominador):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(denominador != 0, numerador / denominador, np.nan)
+
+        res = {PARTICIPANTES: suma[PARTICIPANTES].to_numpy(dtype=np.int64)}
+        if d.nps:
+            columna, promotores, detractores = d.nps
+            prom, detr = categoria(columna, promotores), categoria(columna, detractores)
+            res['NPS'] = 100 * cociente(col(f'{prom}|suma') - col(f'{detr}|suma'), col(f'{prom}|n'))
+        en_bloques = []
+        for nombre, cols in d.bloques:
+            en_bloques += cols
+            res[nombre] = cociente(sum(col(f'{c}|suma') for c in cols), sum(col(f'{c}|n') for c in cols))
+        escalas = [c for c in d.escalas if c not in en_bloques] + (en_bloques if desviacion else [])
+        for escala in escalas:
+            n, s = col(f'{escala}|n'), col(f'{escala}|suma')
+            res[escala] = cociente(s, n)
+            if desviacion:
+                varianza = cociente(col(f'{escala}|suma2') - cociente(s * s, n), n - 1)
+                res[f'{escala} desv'] = np.sqrt(np.clip(varianza, 0, None))
+        for columna, valores in d.categorias:
+            if d.nps and columna == d.nps[0]:
+                continue
+            for valor in valores:
+                nombre = categoria(columna, valor)
+                res[f'{nombre} %'] = 100 * cociente(col(f'{nombre}|suma'), col(f'{nombre}|n'))
+        for marca in d.marcas:
+            res[f'{marca} %'] = 100 * cociente(col(f'{marca}|suma'), col(f'{marca}|n'))
+        return pd.DataFrame(res, index=suma.index)
+
+    # --- Persistencia --- #
+
+    def guardar(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tabla = pa.Table.from_pandas(self.datos, preserve_index=False)
+        meta = json.dumps({'version': VERSION_CUBO, 'definicion': self.definicion.__dict__}, ensure_ascii=False)
+        tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), _META: meta.encode()})
+        with escritura_atomica(Path(path)) as tmp:
+            pq.write_table(tabla, tmp)
+
+    @classmethod
+    def cargar(cls, path, definicion: DefinicionCubo = None) -> 'Cubo':
+        """Cubo guardado con `guardar`. Si se pasa `definicion` debe coincidir con la del archivo."""
+        import pyarrow.parquet as pq
+
+        tabla = pq.read_table(path, memory_map=True)
+        meta = json.loads((tabla.schema.metadata or {}).get(_META, b'{}'))
+        if meta.get('version') != VERSION_CUBO:
+            raise ValueError(f'{path}: no es un cubo de la versión {VERSION_CUBO}')
+        guardada = DefinicionCubo(**{k: _tuplas(v) for k, v in meta['definicion'].items()})
+        if definicion is not None and definicion.huella != guardada.huella:
+            raise ValueError(f'{path}: el cubo se construyó con otra definición')
+        return cls(guardada, tabla.to_pandas())
+
+
+def _tuplas(valor):
+    return tuple(_tuplas(v) for v in valor) if isinstance(valor, list) else valor
+
+
+def _consolidar(partes, dims) -> pd.DataFrame:
+    """Suma las partes por combinación de dimensiones y descarta las combinaciones que quedaron vacías."""
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        return pd.DataFrame(columns=dims)
+    datos = pd.concat(partes, ignore_index=True)
+    datos = _sumar_por(datos.drop(columns=dims), [datos[d] for d in dims])
+    return datos[datos[PARTICIPANTES] > 0].reset_index(drop=True)
+
+
+def _normalizar(datos: pd.DataFrame, dims) -> pd.DataFrame:
+    """Dimensiones como object con None en los vacíos, vengan de un group-by, de numpy o de Parquet."""
+    dims = [d for d in dims if d in datos.columns]
+    etiquetas = datos[dims].astype(object)
+    return datos.assign(**{d: etiquetas[d].where(etiquetas[d].notna(), None) for d in dims})
+
+
+def _sumar_por(tabla: pd.DataFrame, claves) -> pd.DataFrame:
+    """Suma de `tabla` por `claves` con las claves como columnas (sin insertarlas una a una)."""
+    suma = tabla.groupby(claves, dropna=False, sort=False).sum()
+    return pd.concat([suma.index.to_frame(index=False), suma.reset_index(drop=True)], axis=1)
+
+
+def _donde(condiciones) -> dict:
+    donde = {}
+    for condicion in condiciones or []:
+        dim, _, valor = condicion.partition('=')
+        donde.setdefault(dim, []).append(valor)
+    return donde
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Consulta (y combina) cubos de resultados de clima/NPS')
+    parser.add_argument('cubos', nargs='+', help='Uno o más .cubo.parquet; si son varios se combinan')
+    parser.add_argument('--por', nargs='*', default=[], help='Dimensiones de la consulta (el resto se agrega)')
+    parser.add_argument('--donde', nargs='*', metavar='DIM=VALOR', help='Filtros (se pueden repetir por dimensión)')
+    parser.add_argument('--desviacion', action='store_true', help='Promedio y desviación de cada escala')
+    parser.add_argument('--guardar', metavar='RUTA', help='Guarda el cubo combinado')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    cubo = Cubo.cargar(args.cubos[0])
+    for ruta in args.cubos[1:]:
+        cubo.sumar(Cubo.cargar(ruta, cubo.definicion))
+    t1 = time.perf_counter()
+    res = cubo.resultados(args.por, _donde(args.donde), args.desviacion)
+    t2 = time.perf_counter()
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:.2f}'.format):
+        print(res.T if len(res) <= 3 else res)
+    print(f'{len(cubo)} combinaciones en el cubo; carga {1000 * (t1 - t0):.1f} ms, consulta {1000 * (t2 - t1):.1f} ms')
+    if args.guardar:
+        cubo.guardar(args.guardar)
+        print(f'Cubo combinado en {args.guardar}')
+
+
+if __name__ == '__main__':
+    main()
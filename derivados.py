@@ -0,0 +1,179 @@
+"""Versiones vectorizadas (por Serie) de los campos derivados de creadordf.py.
+
+Cada función devuelve exactamente lo mismo que su equivalente escalar aplicada con .apply/.map,
+incluyendo pd.NA para valores faltantes o no interpretables.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _como_texto(serie: pd.Series) -> pd.Series:
+    """str(x) elemento a elemento (igual que las funciones escalares), con NA donde el valor falta."""
+    faltantes = serie.isna()
+    if pd.api.types.infer_dtype(serie, skipna=True) == 'string':
+        return serie.astype(object).where(~faltantes, pd.NA)
+    texto = serie.astype(object).where(~faltantes, '').astype(str).astype(object)
+    return texto.where(~faltantes, pd.NA)
+
+
+def _quitar_no_digitos(texto: pd.Series) -> pd.Series:
+    """texto.str.replace(r'\D', ''), con pyarrow (RE2) si está disponible. RE2 sólo reconoce dígitos ASCII,
+    así que los textos no ASCII pasan por re de Python para conservar la semántica de normalizar_id."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return texto.str.replace(r'\D', '', regex=True)
+    arr = pa.array(texto.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    limpio = pc.replace_substring_regex(arr, pattern=r'\D', replacement='')
+    out = pd.Series(limpio.to_numpy(zero_copy_only=False), index=texto.index, dtype=object)
+    no_ascii = ~np.asarray(pc.string_is_ascii(arr).fill_null(True))
+    if no_ascii.any():
+        out[no_ascii] = texto[no_ascii].str.replace(r'\D', '', regex=True)
+    return out
+
+
+# Tipos con los que valores iguales según == tienen también el mismo str() (1 == 1.0 == True, pero no su texto)
+_HOMOGENEOS = {'string', 'integer', 'floating', 'boolean', 'empty', 'datetime', 'date'}
+
+
+def _por_unicos(serie: pd.Series, funcion) -> pd.Series:
+    """Aplica `funcion` (vectorizada) sólo a los valores distintos y reexpande con take.
+    Las columnas de encuesta tienen pocos valores distintos, así que el costo real es el de pd.factorize.
+    Si la columna mezcla tipos numéricos se aplica directamente, porque factorize uniría 1, 1.0 y True."""
+    if pd.api.types.infer_dtype(serie, skipna=True) not in _HOMOGENEOS:
+        return funcion(serie)
+    codigos, unicos = pd.factorize(serie.astype(object), use_na_sentinel=True)
+    valores = funcion(pd.Series(unicos, dtype=object)).to_numpy(dtype=object)
+    valores = np.append(valores, pd.NA)  # código -1 (faltante) -> último elemento
+    return pd.Series(valores[codigos], index=serie.index, dtype=object)
+
+
+def normalizar_id_serie(serie: pd.Series) -> pd.Series:
+    """Equivalente a serie.apply(normalizar_id): sólo dígitos, NA si no queda ninguno."""
+    return _por_unicos(serie, _normalizar_id)
+
+
+def _normalizar_id(serie: pd.Series) -> pd.Series:
+    solo = _quitar_no_digitos(_como_texto(serie))
+    return solo.where(solo.notna() & (solo != ''), pd.NA).astype(object)
+
+
+def limpiar_area_serie(serie: pd.Series) -> pd.Series:
+    """Equivalente a serie.apply(limpiar_area)."""
+    return _por_unicos(serie, _limpiar_area)
+
+
+def _limpiar_area(serie: pd.Series) -> pd.Series:
+    a = _como_texto(serie).str.strip().str.upper()
+    a = a.str.replace(r'^SECRETAR[ÍI]A\s+DE\s+', '', regex=True)
+    a = a.str.replace('  ', ' ', regex=False).str.strip().astype(object)
+    return a.where(a.notna(), pd.NA)
+
+
+# ================= Tablas configurables ================= #
+
+# (año inicial, año final, etiqueta), ambos extremos incluidos; los años fuera de los rangos quedan NA
+TABLA_GENERACIONES = (
+    (1946, 1964, 'Baby Boomers'),
+    (1965, 1980, 'Generación X'),
+    (1981, 1996, 'Millennials'),
+    (1997, 2012, 'Centennials'),
+)
+
+# (valor mínimo, etiqueta) de mayor a menor; por debajo del último mínimo queda NA
+TABLA_NPS = (
+    (9, 'Entusiastas'),
+    (7, 'Pasivos'),
+    (0, 'Detractores'),
+)
+
+
+def _intervalos(tabla) -> pd.IntervalIndex:
+    intervalos = pd.IntervalIndex.from_tuples([(ini, fin) for ini, fin, _ in tabla], closed='both')
+    if intervalos.is_overlapping:
+        raise ValueError('La tabla de generaciones tiene rangos superpuestos')
+    return intervalos
+
+
+def generacion_de_anio(anio: int, tabla=TABLA_GENERACIONES):
+    for ini, fin, etiqueta in tabla:
+        if ini <= anio <= fin:
+            return etiqueta
+    return pd.NA
+
+
+def tipo_nps_de_valor(valor: int, tabla=TABLA_NPS):
+    for minimo, etiqueta in tabla:
+        if valor >= minimo:
+            return etiqueta
+    return pd.NA
+
+
+def _etiquetar(codigos: np.ndarray, etiquetas, index) -> pd.Series:
+    etiquetas = np.array(list(etiquetas) + [pd.NA], dtype=object)
+    return pd.Series(etiquetas[codigos], index=index, dtype=object)
+
+
+def generacion_serie(serie: pd.Series, tabla=TABLA_GENERACIONES) -> pd.Series:
+    """Equivalente a serie.map(map_generacion): primer grupo de 4 dígitos -> rango de la tabla."""
+    return _por_unicos(serie, lambda unicos: _generacion(unicos, tabla))
+
+
+def _generacion(serie: pd.Series, tabla) -> pd.Series:
+    grupos = _como_texto(serie).str.extract(r'(\d{4})', expand=False)
+    anios = pd.to_numeric(grupos, errors='coerce')
+    raros = anios.isna() & grupos.notna()  # dígitos no ASCII: int() los acepta, to_numeric no
+    if raros.any():
+        anios = anios.astype(float)
+        anios[raros] = grupos[raros].map(int)
+    codigos = _intervalos(tabla).get_indexer(anios.to_numpy(dtype=float))
+    return _etiquetar(codigos, [e for _, _, e in tabla], serie.index)
+
+
+# Texto que int() acepta (signo, dígitos, separadores '_'); motor_polars.py usa la misma expresión.
+ENTERO_TEXTO = r'^\s*[+-]?\d+(?:_\d+)*\s*$'
+
+
+def _entero_como_int(serie: pd.Series) -> pd.Series:
+    """int(valor) elemento a elemento como float (NaN donde int() fallaría)."""
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.astype(float)
+    if pd.api.types.is_numeric_dtype(serie):
+        valores = serie.to_numpy(dtype=float, na_value=np.nan)
+        return pd.Series(np.where(np.isfinite(valores), np.trunc(valores), np.nan), index=serie.index)
+
+    valores = serie.astype(object)
+    tipos = valores.map(type)
+    numericos = tipos.map(lambda t: issubclass(t, (int, float, np.number)) and not issubclass(t, np.timedelta64))
+    out = pd.Series(np.nan, index=serie.index)
+    if numericos.any():
+        out[numericos] = _entero_como_int(pd.to_numeric(valores[numericos].astype(float), errors='coerce'))
+    textos = tipos.map(lambda t: issubclass(t, str))
+    if textos.any():
+        txt = valores[textos]
+        validos = txt.str.match(ENTERO_TEXTO)
+        convertidos = pd.to_numeric(txt[validos].str.replace('_', '', regex=False), errors='coerce')
+        # dígitos no ASCII (int() los acepta, to_numeric no): caso raro, se convierten uno a uno
+        raros = convertidos.isna()
+        if raros.any():
+            convertidos[raros] = txt[validos][raros].map(int)
+        out[convertidos.index] = convertidos.astype(float)
+    return out
+
+
+def tipo_nps_serie(serie: pd.Series, tabla=TABLA_NPS) -> pd.Series:
+    """Equivalente a serie.map(calcular_tipo_nps): int(valor) y banda según la tabla."""
+    v = _entero_como_int(serie).to_numpy()
+    with np.errstate(invalid='ignore'):
+        condiciones = [v >= minimo for minimo, _ in tabla]
+    codigos = np.select(condiciones, np.arange(len(tabla)), default=len(tabla))
+    return _etiquetar(codigos, [e for _, e in tabla], serie.index)
+
+
+# Campos derivados que puede usar la especificación de salida ("derivados" en especificacion.json).
+# Todas reciben la Serie origen y, opcionalmente, su tabla.
+FUNCIONES_DERIVADAS = {
+    'generacion': generacion_serie,
+    'tipo_nps': tipo_nps_serie,
+}
@@ -0,0 +1,434 @@
+"""Núcleo de comparación referencia (expected) vs. salida generada (actual).
+
+compare.py y analysis.py son fachadas sobre este módulo: la lectura, la alineación por ID (duplicados
+vía cumcount, unión de índices, registros __ROW__) y la comparación de celdas se hacen aquí una sola vez,
+y de ese único resultado salen todos los reportes (resumen en consola, diff_cells.xlsx, diff_ids.csv y
+las columnas con más diferencias).
+
+Si la referencia tiene una línea base bendecida vigente (linea_base.py) se usa en lugar del Excel.
+
+Uso (pasada de regresión completa, cada archivo se lee una vez):
+    python diferencias.py --ref backup_data/output_expect.xlsx --new output.xlsx
+"""
+import argparse
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ingesta import leer_excel
+
+COLUMNAS_DIF = ['ID', 'COLUMN', 'EXPECTED', 'ACTUAL']
+
+# Política de coerción al comparar celdas:
+#   estricta: igualdad de Python tal cual (9 != '9'), comportamiento histórico
+#   numerica: números y textos numéricos se comparan por su valor (9 == 9.0 == '9' == ' 9 ')
+#   texto: todo se compara como texto sin espacios extremos (9 == '9', pero 9.0 != '9')
+COERCIONES = ('estricta', 'numerica', 'texto')
+
+
+def cargar(path, id_texto: bool = False) -> pd.DataFrame:
+    """Lee un libro (vía la caché columnar). Con id_texto el ID se fuerza a texto, como hacía analysis.py."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No existe el archivo: {path}")
+    df = leer_excel(path)
+    if id_texto and 'ID' in df.columns:
+        df['ID'] = df['ID'].astype(str)
+    return df
+
+
+def columnas_diferentes(cols_ref, cols_new):
+    set_ref = set(cols_ref)
+    set_new = set(cols_new)
+    faltan = [c for c in cols_ref if c not in set_new]
+    sobrantes = [c for c in cols_new if c not in set_ref]
+    orden_difiere = cols_ref != cols_new
+    return faltan, sobrantes, orden_difiere
+
+
+def coercionar(valores: pd.Series, politica: str = 'estricta') -> pd.Series:
+    """Valores transformados según la política, sólo para decidir igualdad (los reportes usan los originales)."""
+    if politica == 'estricta':
+        return valores
+    nulos = valores.isna()
+    if politica == 'numerica':
+        numeros = pd.to_numeric(valores.where(~nulos), errors='coerce')
+        return valores.where(numeros.isna(), numeros.astype(object))
+    if politica == 'texto':
+        return valores.astype(str).str.strip().astype(object).where(~nulos, None)
+    raise ValueError(f"Política de coerción desconocida: {politica} (opciones: {COERCIONES})")
+
+
+def _ids(indice: pd.Index) -> np.ndarray:
+    """ID real de cada posición del índice alineado (primer nivel si es (ID, __dup__))."""
+    return (indice.get_level_values(0) if isinstance(indice, pd.MultiIndex) else indice).to_numpy(dtype=object)
+
+
+def alinear(df_ref: pd.DataFrame, df_new: pd.DataFrame, id_col: str = 'ID', recortar: bool = False):
+    """Alinea ambos lados por ID (con (ID, __dup__) si hay repetidos) sobre la unión de índices.
+    Sin columna ID se alinea por posición: todas las filas, o sólo las min(n_ref, n_new) primeras si
+    `recortar` (regla histórica de analysis.py). Devuelve (ref_al, new_al, columnas comunes, nombre del índice)."""
+    if id_col in df_ref.columns and id_col in df_new.columns:
+        ref_use = df_ref.copy()
+        new_use = df_new.copy()
+        # Manejo de duplicados
+        if ref_use[id_col].duplicated().any() or new_use[id_col].duplicated().any():
+            ref_use['__dup__'] = ref_use.groupby(id_col).cumcount()
+            new_use['__dup__'] = new_use.groupby(id_col).cumcount()
+            ref_use.set_index([id_col, '__dup__'], inplace=True)
+            new_use.set_index([id_col, '__dup__'], inplace=True)
+        else:
+            ref_use.set_index(id_col, inplace=True)
+            new_use.set_index(id_col, inplace=True)
+        index_name = id_col
+    else:
+        # Fallback posicional
+        n = min(len(df_ref), len(df_new)) if recortar else None
+        index_name = '__ID__' if recortar else '__POS__'
+        ref_use = df_ref.iloc[:n].copy()
+        new_use = df_new.iloc[:n].copy()
+        ref_use[index_name] = range(len(ref_use))
+        new_use[index_name] = range(len(new_use))
+        ref_use.set_index(index_name, inplace=True)
+        new_use.set_index(index_name, inplace=True)
+
+    # Unir índices para detectar filas faltantes/sobrantes
+    all_index = ref_use.index.union(new_use.index)
+    ref_al = ref_use.reindex(all_index)
+    new_al = new_use.reindex(all_index)
+
+    # Columnas comunes (mismo orden de referencia) excluyendo la columna de ID (se usa como índice)
+    comunes = [c for c in df_ref.columns if c in df_new.columns and c != id_col]
+    return ref_al, new_al, comunes, index_name
+
+
+def diferencias_celdas(ref_al: pd.DataFrame, new_al: pd.DataFrame, columnas, coercion: str = 'estricta') -> pd.DataFrame:
+    """Compara ref_al y new_al (mismo índice) en una sola pasada sobre la matriz apilada de `columnas`.
+    Devuelve ID/COLUMN/EXPECTED/ACTUAL en el mismo orden que el recorrido columna por columna."""
+    columnas = list(columnas)
+    n = len(ref_al)
+    ref_v = pd.Series(ref_al[columnas].to_numpy(dtype=object).ravel(order='F'), dtype=object)
+    new_v = pd.Series(new_al[columnas].to_numpy(dtype=object).ravel(order='F'), dtype=object)
+    ref_c = coercionar(ref_v, coercion)
+    new_c = coercionar(new_v, coercion)
+    nulo_ref = ref_c.isna().to_numpy()
+    nulo_new = new_c.isna().to_numpy()
+    # misma regla que (ref != new) & ~(ambos nulos): un nulo contra un valor siempre es diferencia
+    distinto = nulo_ref != nulo_new
+    ambos = ~nulo_ref & ~nulo_new
+    distinto[ambos] = ref_c.to_numpy()[ambos] != new_c.to_numpy()[ambos]
+    pos = np.nonzero(distinto)[0]
+    cols, filas = np.divmod(pos, max(n, 1))
+    return pd.DataFrame({
+        'ID': _ids(ref_al.index)[filas],
+        'COLUMN': np.asarray(columnas, dtype=object)[cols],
+        'EXPECTED': ref_v.to_numpy()[pos],
+        'ACTUAL': new_v.to_numpy()[pos],
+    }, columns=COLUMNAS_DIF)
+
+
+# tipos de infer_dtype en los que las celdas no nulas comparten clase: basta una etiqueta por columna
+_TIPOS_HOMOGENEOS = {'string', 'datetime', 'datetime64', 'date', 'decimal', 'timedelta', 'timedelta64', 'bytes'}
+_TIPOS_NUMERICOS = {'integer', 'floating', 'mixed-integer-float', 'boolean'}
+_CLASES_NUMERICAS = (bool, int, float, np.bool_, np.integer, np.floating)
+_HASH_NULO = np.uint64(0x9E3779B97F4A7C15)
+_ENTERO_EXACTO = 2 ** 53
+# si más de esta fracción de filas ya difiere, el pre-paso no ahorra nada: se compara todo directamente
+UMBRAL_HUELLAS = 0.3
+
+
+def combinar_huellas(h: np.ndarray, otro) -> np.ndarray:
+    """Mezcla de hashes no conmutativa (estilo boost::hash_combine) sobre uint64 con desborde; con ella se
+    arman las huellas de fila a partir de las de cada celda (huella_celdas), aquí y en linea_base.py."""
+    return h ^ ((h << np.uint64(6)) + (h >> np.uint64(2)) + otro + _HASH_NULO)
+
+
+def _etiquetas(nombres) -> np.ndarray:
+    return pd.util.hash_array(np.asarray(nombres, dtype=object))
+
+
+@lru_cache(maxsize=None)
+def _etiqueta(nombre: str) -> np.uint64:
+    """Etiqueta de una sola clase; hash_array tiene un costo fijo que se pagaba en cada columna."""
+    return _etiquetas([nombre])[0]
+
+
+def _hash_numerico(numeros: np.ndarray):
+    """Números como float64 (mismo hash para 9, 9.0, True/1 y np.int64(9), que también son iguales con ==).
+    Devuelve None si algún entero no cabe exacto en float64: se tratan como texto para no confundirlos."""
+    if np.abs(numeros).max(initial=0) >= _ENTERO_EXACTO:
+        return None
+    return combinar_huellas(pd.util.hash_array(numeros), _etiqueta('numero'))
+
+
+def _hash_texto(serie: pd.Series, etiqueta) -> np.ndarray:
+    return combinar_huellas(pd.util.hash_pandas_object(serie.astype(object), index=False).to_numpy(), etiqueta)
+
+
+def huella_celdas(serie: pd.Series, coercion: str = 'estricta') -> np.ndarray:
+    """Hash uint64 por celda tras aplicar la coerción, con todos los nulos iguales. Los números se hashean por
+    su valor (el reindex que convierte int64 en float64, o un object con números sueltos, no cambia la huella);
+    el resto como texto + su clase, porque hash_pandas_object convierte a texto las columnas object mezcladas
+    (9 y '9' coincidirían). Misma huella => mismo valor para la política (salvo colisión de 64 bits)."""
+    if not len(serie):
+        return np.zeros(0, dtype=np.uint64)
+    serie = coercionar(serie.reset_index(drop=True), coercion)
+    nulos = serie.isna().to_numpy()
+    if serie.dtype.kind in 'iufb':
+        h = _hash_numerico(serie.to_numpy(dtype='float64', na_value=np.nan))
+        tipo = 'integer'
+    else:
+        h = None
+        tipo = pd.api.types.infer_dtype(serie, skipna=True)
+        if tipo in _TIPOS_NUMERICOS:
+            h = _hash_numerico(pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64', na_value=np.nan))
+    if h is None and (tipo in _TIPOS_HOMOGENEOS or tipo in _TIPOS_NUMERICOS):
+        # misma etiqueta que tendría cada celda en una columna mezclada: el nombre de su clase
+        clase = type(serie.iloc[int(np.argmin(nulos))]).__name__
+        h = _hash_texto(serie, _etiqueta(clase))
+    if h is None:
+        # columna mezclada: clase por celda (factorizada, pocas clases distintas); los números sueltos se
+        # hashean igual que en una columna numérica
+        codigos, clases = pd.factorize(serie.map(type))
+        etiquetas = _etiquetas([c.__name__ for c in clases])
+        h = _hash_texto(serie, etiquetas[codigos])
+        numericas = [i for i, c in enumerate(clases) if issubclass(c, _CLASES_NUMERICAS)]
+        es_numero = np.isin(codigos, numericas) & ~nulos
+        if es_numero.any():
+            numeros = pd.to_numeric(serie[es_numero], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            h_num = _hash_numerico(numeros)
+            if h_num is not None:
+                h[es_numero] = h_num
+    h[nulos] = _HASH_NULO
+    return h
+
+
+def columna_igual(ref: pd.Series, new: pd.Series, coercion: str = 'estricta') -> bool:
+    """Atajo por columna: True si todas las celdas coinciden (Series.equals: == celda a celda en C, nulos
+    iguales). Ante la duda (dtypes distintos, pd.NA, coerciones) devuelve False y decide la huella."""
+    if coercion != 'estricta' or ref.dtype != new.dtype:
+        return False
+    try:
+        # sobre RangeIndex: Series.equals también compara los índices, que aquí son el mismo
+        a, b = ref.to_numpy(), new.to_numpy()
+        return pd.Series(a, dtype=a.dtype, copy=False).equals(pd.Series(b, dtype=b.dtype, copy=False))
+    except (TypeError, ValueError):
+        return False
+
+
+def candidatos(ref_al: pd.DataFrame, new_al: pd.DataFrame, columnas, coercion: str = 'estricta', directas=None):
+    """Pre-paso: columnas idénticas se descartan enteras; sobre las demás se calcula una huella por fila
+    (combinación de las huellas de sus celdas) y sólo las filas con huella distinta pasan a la comparación
+    celda a celda. Las filas marcadas en `directas` (p.ej. presentes en un solo lado) no entran a las huellas
+    (harían distintas todas las columnas) y se comparan siempre. Devuelve (posiciones de filas, columnas), o
+    None si la fracción de filas distintas supera UMBRAL_HUELLAS (conviene la comparación completa)."""
+    directas = np.zeros(len(ref_al), dtype=bool) if directas is None else np.asarray(directas, dtype=bool)
+    resto = np.flatnonzero(~directas)
+    todas = len(resto) == len(ref_al)
+    fila_ref = np.zeros(len(resto), dtype=np.uint64)
+    fila_new = np.zeros(len(resto), dtype=np.uint64)
+    columnas_distintas = []
+    for col in columnas:
+        ref_col, new_col = ref_al[col], new_al[col]
+        if not todas:
+            ref_col, new_col = ref_col.iloc[resto], new_col.iloc[resto]
+        if columna_igual(ref_col, new_col, coercion):
+            continue
+        h_ref = huella_celdas(ref_col, coercion)
+        h_new = huella_celdas(new_col, coercion)
+        if np.array_equal(h_ref, h_new):
+            continue
+        columnas_distintas.append(col)
+        fila_ref = combinar_huellas(fila_ref, h_ref)
+        fila_new = combinar_huellas(fila_new, h_new)
+        if np.count_nonzero(fila_ref != fila_new) > UMBRAL_HUELLAS * len(ref_al):
+            return None
+    filas = np.union1d(resto[fila_ref != fila_new], np.flatnonzero(directas))
+    if directas.any():
+        columnas_distintas = list(columnas)  # las filas directas se comparan en todas las columnas
+    return filas, columnas_distintas
+
+
+def _filas_vacias(df: pd.DataFrame) -> np.ndarray:
+    """Máscara de filas con todas las celdas nulas (lo que descarta dropna(how='all')). Se recorre columna a
+    columna sólo sobre las filas que siguen vacías, así que casi siempre basta con mirar la primera."""
+    pos = np.arange(len(df))
+    for j in range(df.shape[1]):
+        if not len(pos):
+            break
+        pos = pos[df.iloc[pos, j].isna().to_numpy()]
+    vacias = np.zeros(len(df), dtype=bool)
+    vacias[pos] = True
+    return vacias
+
+
+def filas_ausentes(ref_al: pd.DataFrame, new_al: pd.DataFrame, vacias_ref=None, vacias_new=None) -> pd.DataFrame:
+    """Registros __ROW__ de las filas presentes sólo en uno de los dos lados (vacías en el otro)."""
+    vacias_ref = _filas_vacias(ref_al) if vacias_ref is None else vacias_ref
+    vacias_new = _filas_vacias(new_al) if vacias_new is None else vacias_new
+    missing_in_new = ref_al.index[vacias_new].difference([])
+    missing_in_ref = new_al.index[vacias_ref].difference([])
+    return pd.concat([
+        pd.DataFrame({'ID': _ids(missing_in_new), 'COLUMN': '__ROW__',
+                      'EXPECTED': 'ROW_PRESENT_IN_REF', 'ACTUAL': 'MISSING_IN_NEW'}, columns=COLUMNAS_DIF),
+        pd.DataFrame({'ID': _ids(missing_in_ref), 'COLUMN': '__ROW__',
+                      'EXPECTED': 'MISSING_IN_REF', 'ACTUAL': 'ROW_PRESENT_IN_NEW'}, columns=COLUMNAS_DIF),
+    ], ignore_index=True)
+
+
+@dataclass
+class ResultadoDiff:
+    """Todo lo que necesitan los reportes; se calcula una vez por par de archivos."""
+    filas_ref: int
+    filas_new: int
+    columnas_ref: int
+    faltan: list
+    sobrantes: list
+    orden_difiere: bool
+    index_name: str
+    difs: pd.DataFrame = field(repr=False)
+    # tamaño de lo que realmente se comparó celda a celda tras el pre-paso por huellas
+    filas_comparadas: int = 0
+    columnas_comparadas: int = 0
+
+    @property
+    def columnas_iguales(self) -> bool:
+        return not self.faltan and not self.sobrantes
+
+    @property
+    def total_celdas(self) -> int:
+        return self.filas_ref * self.columnas_ref
+
+    def top_columnas(self, n: int = 10) -> pd.Series:
+        return self.difs['COLUMN'].value_counts().head(n)
+
+
+def comparar(df_ref: pd.DataFrame, df_new: pd.DataFrame, id_col: str = 'ID', coercion: str = 'estricta',
+             recortar: bool = False, huellas: bool = True) -> ResultadoDiff:
+    """Compara ambos lados. Con `huellas` sólo se comparan celda a celda las filas cuya huella difiere y las
+    columnas con algún cambio: en salidas casi iguales el costo depende de lo que cambió, no del tamaño."""
+    faltan, sobrantes, orden_difiere = columnas_diferentes(df_ref.columns.tolist(), df_new.columns.tolist())
+    ref_al, new_al, comunes, index_name = alinear(df_ref, df_new, id_col, recortar)
+    vacias_ref, vacias_new = _filas_vacias(ref_al), _filas_vacias(new_al)
+    seleccion = candidatos(ref_al, new_al, comunes, coercion, directas=vacias_ref | vacias_new) if huellas else None
+    if seleccion is not None:
+        filas, columnas = seleccion
+        celdas = diferencias_celdas(ref_al.iloc[filas], new_al.iloc[filas], columnas, coercion)
+    else:
+        filas, columnas = range(len(ref_al)), comunes
+        celdas = diferencias_celdas(ref_al, new_al, comunes, coercion)
+    difs = pd.concat([celdas, filas_ausentes(ref_al, new_al, vacias_ref, vacias_new)], ignore_index=True)
+    return ResultadoDiff(len(df_ref), len(df_new), len(df_ref.columns), faltan, sobrantes, orden_difiere,
+                         index_name, difs, len(filas), len(columnas))
+
+
+# ---------- reportes ---------- #
+
+def imprimir_resumen(res: ResultadoDiff, max_print: int = 50):
+    """Resumen de consola de compare.py (columnas, filas y primeras celdas diferentes)."""
+    if res.faltan or res.sobrantes or res.orden_difiere:
+        print("=== DIFERENCIAS DE COLUMNAS ===")
+        if res.faltan:
+            print(f"Columnas faltantes en nuevo ({len(res.faltan)}): {res.faltan}")
+        if res.sobrantes:
+            print(f"Columnas sobrantes en nuevo ({len(res.sobrantes)}): {res.sobrantes}")
+        if res.columnas_iguales and res.orden_difiere:
+            print("Mismo conjunto de columnas pero el orden difiere")
+    else:
+        print("Columnas: idénticas (mismo conjunto y orden)")
+
+    if res.filas_ref != res.filas_new:
+        print(f"=== DIFERENCIA EN NUMERO DE FILAS === referencia={res.filas_ref} nuevo={res.filas_new}")
+    else:
+        print(f"Filas: misma cantidad = {res.filas_ref}")
+
+    if not res.columnas_iguales:
+        print("No se compara celda por celda porque difiere el conjunto de columnas")
+        return
+
+    difs = res.difs
+    if difs.empty:
+        print("Celdas: todas coinciden (sin diferencias)")
+        return
+    print(f"Celdas diferentes: {len(difs)} de {res.total_celdas} ({len(difs)/res.total_celdas:.4%})")
+    for d in difs.head(max_print).to_dict('records'):
+        print(f"{res.index_name}={d['ID']} Col='{d['COLUMN']}' esperado='{d['EXPECTED']}' obtenido='{d['ACTUAL']}'")
+    if len(difs) > max_print:
+        print(f"... ({len(difs)-max_print} diferencias más no impresas)")
+
+
+def exportar_celdas(res: ResultadoDiff, path) -> bool:
+    """diff_cells.xlsx (sólo si hay diferencias y el conjunto de columnas coincide, como compare.py)."""
+    if not res.columnas_iguales or res.difs.empty:
+        return False
+    res.difs.to_excel(path, index=False)
+    print(f"Detalle exportado a {path}")
+    return True
+
+
+def exportar_ids(res: ResultadoDiff, path, limit: int = 0):
+    """diff_ids.csv con todas las diferencias (o las `limit` primeras)."""
+    difs = res.difs.head(limit) if limit > 0 else res.difs
+    difs.to_csv(path, index=False)
+    print(f"Diferencias: {len(difs)} filas exportadas a {path}")
+
+
+def imprimir_top_columnas(res: ResultadoDiff, n: int = 10):
+    if res.difs.empty:
+        print('No se encontraron diferencias.')
+        return
+    print('Top columnas con diferencias:')
+    print(res.top_columnas(n).to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Regresión completa: compara referencia y generado una sola vez y emite todos los reportes')
+    parser.add_argument('--ref', default='backup_data/output_expect.xlsx', help='Archivo de referencia (expected)')
+    parser.add_argument('--new', default='output.xlsx', help='Archivo generado (actual)')
+    parser.add_argument('--export-diff', default='diff_cells.xlsx', help='Excel con las celdas diferentes')
+    parser.add_argument('--out', default='diff_ids.csv', help='CSV con las diferencias por ID y columna')
+    parser.add_argument('--max-print', type=int, default=50, help='Máximo de diferencias a imprimir en consola')
+    parser.add_argument('--coercion', choices=COERCIONES, default='estricta',
+                        help="Cómo comparar números contra textos: estricta (9 != '9'), numerica o texto")
+    parser.add_argument('--en-disco', action='store_true',
+                        help='Comparación por particiones en disco con memoria acotada; sólo exporta --out')
+    args = parser.parse_args()
+
+    if args.en_disco:
+        from diferencias_bloques import comparar_en_disco, formato_por_extension, imprimir_resumen as resumen_disco
+
+        resumen_disco(comparar_en_disco(args.ref, args.new, args.out, formato_por_extension(args.out),
+                                        args.coercion, max_muestra=args.max_print), args.max_print)
+        return
+
+    from linea_base import abrir
+
+    t0 = time.perf_counter()
+    # ID como texto (regla de analysis.py) para que ambos reportes salgan de la misma alineación; la
+    # referencia, desde su línea base bendecida si está vigente (sólo se abre con memory mapping)
+    base = abrir(args.ref)
+    df_ref = cargar(args.ref, id_texto=True) if base is None else None
+    df_new = cargar(args.new, id_texto=True)
+    t1 = time.perf_counter()
+    if base is not None:
+        res = base.comparar(df_new, coercion=args.coercion, id_texto=True)
+    else:
+        res = comparar(df_ref, df_new, coercion=args.coercion)
+    t2 = time.perf_counter()
+
+    imprimir_resumen(res, args.max_print)
+    exportar_celdas(res, args.export_diff)
+    exportar_ids(res, args.out)
+    imprimir_top_columnas(res)
+    print(f"Huellas: {res.filas_comparadas} filas y {res.columnas_comparadas} columnas comparadas celda a celda")
+    print(f"Tiempos: lectura {t1 - t0:.2f}s, comparación {t2 - t1:.2f}s, "
+          f"reportes {time.perf_counter() - t2:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+"""Comparación fuera de memoria para libros muy grandes (p.ej. salidas consolidadas de lote.py).
+
+En lugar de cargar ambos libros completos y reindexarlos sobre la unión (dos copias más), se trabaja con
+memoria acotada:
+
+1. Perfil: se recorren ambos libros por bloques (openpyxl read-only) y, con la misma inferencia de tipos que
+   hace pd.read_excel sobre las celdas, se decide el dtype global de cada columna; además se toma una muestra
+   de IDs.
+2. Partición: cada bloque se tipa con esos dtypes y sus filas se reparten en archivos temporales por
+   rangos de ID (los cortes salen de la muestra), así un ID y sus repetidos quedan en la misma partición.
+   Si ambos libros traen exactamente los mismos IDs en el mismo orden se parte por posición.
+3. Cada par de particiones se compara con diferencias.comparar y las diferencias se vuelcan a disco por
+   columna; al final se escriben (CSV/Parquet/xlsx) en el mismo orden que el modo en memoria.
+
+El resultado coincide registro a registro con diferencias.comparar sobre cargar(..., id_texto=True).
+
+Uso: python diferencias_bloques.py --ref referencia.xlsx --new salida.xlsx --out diff_ids.csv
+"""
+import argparse
+import hashlib
+import math
+import pickle
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from bloques import leer_bloques
+from diferencias import COERCIONES, COLUMNAS_DIF, alinear, columnas_diferentes, comparar
+from ingesta import encabezados
+from instrumentacion import memoria_pico_mb
+from salida import abrir_escritor
+
+FILAS_POR_PARTICION = 50_000
+TAM_MUESTRA = 20_000
+# Textos que pd.read_excel lee como NaN (los na_values por defecto de pandas) y los que convierte a booleano
+TEXTOS_NULOS = frozenset({'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                          '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'})
+_VERDADEROS = frozenset({'True', 'TRUE', 'true'})
+_FALSOS = frozenset({'False', 'FALSE', 'false'})
+_BOOLEANOS = _VERDADEROS | _FALSOS
+
+
+def _celda_excel(valor):
+    """Misma conversión de celda que el lector openpyxl de pandas (vacío -> '', 5.0 -> 5)."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _filas_excel(bloque: pd.DataFrame) -> list:
+    return [[_celda_excel(v) for v in fila] for fila in bloque.itertuples(index=False, name=None)]
+
+
+def _booleanos(valores: np.ndarray) -> np.ndarray:
+    """bool si todos los valores son booleanos o textos 'True'/'false'... (object con NaN si hay nulos); si no,
+    los valores tal cual."""
+    salida = np.zeros(len(valores), dtype=bool)
+    nulos = np.zeros(len(valores), dtype=bool)
+    for i, v in enumerate(valores):
+        if isinstance(v, (bool, np.bool_)):
+            salida[i] = v
+        elif isinstance(v, str) and v in _BOOLEANOS:
+            salida[i] = v in _VERDADEROS
+        elif v is None or (isinstance(v, float) and np.isnan(v)):
+            nulos[i] = True
+        else:
+            return valores
+    if not nulos.any():
+        return salida
+    salida = salida.astype(object)
+    salida[nulos] = np.nan
+    return salida
+
+
+def _columna(valores, inferir: bool) -> pd.Series:
+    """Una columna de celdas como la deja pd.read_excel: con `inferir`, números (también textos numéricos) o
+    booleanos si todos lo son; el constructor de Series infiere luego texto y fechas. Sin `inferir`, object."""
+    crudos = np.empty(len(valores), dtype=object)
+    crudos[:] = valores
+    # como el parser de pandas: textos nulos a NaN y valores iguales (1, 1.0, True) unificados al primero que aparece
+    codigos, unicos = pd.factorize(crudos, use_na_sentinel=False)
+    unicos = np.asarray(unicos, dtype=object)
+    nulos = np.array([isinstance(v, str) and v in TEXTOS_NULOS for v in unicos], dtype=bool)
+    unicos[nulos] = np.nan
+    saneados = unicos[codigos]
+    if not inferir or not len(crudos):
+        return pd.Series(saneados, dtype=object)
+    try:
+        numeros = pd.to_numeric(np.where(nulos[codigos], np.nan, crudos))  # sin unificar: 1 y True siguen siendo 1
+    except (ValueError, TypeError):
+        resultado = base = saneados
+    else:
+        if numeros.dtype != object:
+            return pd.Series(numeros)
+        resultado, base = numeros, crudos  # enteros que no caben en 64 bits: la columna queda object
+    if isinstance(resultado[0], int):
+        return pd.Series(resultado)
+    return pd.Series(_booleanos(base))
+
+
+def _parsear(filas: list, columnas, dtype=None) -> pd.DataFrame:
+    """DataFrame de filas de celdas con la inferencia de pd.read_excel; las columnas de `dtype` quedan object."""
+    columnas = list(columnas)
+    sin_inferir = set(dtype or ())
+    valores = list(zip(*filas)) if filas else [()] * len(columnas)
+    df = pd.concat([_columna(v, c not in sin_inferir) for c, v in zip(columnas, valores)], axis=1, ignore_index=True)
+    df.columns = columnas
+    return df
+
+
+def _clases_texto(textos) -> dict:
+    """Clase de cada texto para la inferencia de tipos de pandas: nulo ('NA', 'null'...), número, booleano o texto."""
+    textos = pd.Series(list(textos), dtype=object)
+    numeros = pd.to_numeric(textos, errors='coerce').notna()
+    clases = {}
+    for texto, numero in zip(textos, numeros):
+        if texto in TEXTOS_NULOS:
+            clases[texto] = 'nulo'
+        elif numero:
+            clases[texto] = 'numero'
+        else:
+            clases[texto] = 'booleano' if texto in _BOOLEANOS else 'texto'
+    return clases
+
+
+def tipo_global(ejemplos: dict):
+    """dtype que pd.read_excel daría a la columna completa. La inferencia de pandas sólo depende de qué clases de
+    valores aparecen (enteros, decimales, textos numéricos, vacíos...), así que basta con un ejemplo de cada una."""
+    return _columna(list(ejemplos.values()), inferir=True).dtype
+
+
+class _Volcado:
+    """Archivo temporal con DataFrames añadidos uno tras otro (pickle), leídos luego en el mismo orden."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.filas = 0
+
+    def agregar(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        with open(self.path, 'ab') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.filas += len(df)
+
+    def partes(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def leer(self) -> pd.DataFrame:
+        return pd.concat(list(self.partes()), ignore_index=True)
+
+
+def perfilar(path, tam_bloque: int, crudo: '_Volcado' = None, tam_muestra: int = TAM_MUESTRA, semilla: int = 0) -> dict:
+    """Primera pasada: un ejemplo de cada clase de valor por columna, filas, muestra de IDs y huella de la
+    secuencia de IDs (para saber si ambos libros traen los mismos IDs en el mismo orden). Con `crudo` los
+    bloques se guardan tal cual para la segunda pasada (releer el pickle es mucho más barato que el XML)."""
+    rng = random.Random(semilla)
+    ejemplos, textos, muestra, filas = {}, {}, [], 0
+    secuencia = hashlib.blake2b(digest_size=16)
+    for bloque in leer_bloques(path, tam_bloque=tam_bloque):
+        if crudo is not None:
+            crudo.agregar(bloque)
+        for j, col in enumerate(bloque.columns):
+            vistos = ejemplos.setdefault(col, {})
+            clases = textos.setdefault(col, {})
+            nuevos = set()
+            for v in bloque.iloc[:, j]:
+                v = _celda_excel(v)
+                if isinstance(v, str):
+                    if v not in clases:
+                        nuevos.add(v)
+                    continue
+                clave = type(v).__name__
+                if clave not in vistos:
+                    vistos[clave] = v
+            if nuevos:
+                clases.update(_clases_texto(nuevos))
+                for v in nuevos:
+                    vistos.setdefault(('str', clases[v]), v)
+        if 'ID' in bloque.columns:
+            ids = [_celda_excel(v) for v in bloque['ID']]
+            secuencia.update(repr(ids).encode('utf-8'))
+            for valor in ids:
+                if valor == '':
+                    continue
+                filas += 1  # reservoir sampling sobre los IDs no vacíos
+                if len(muestra) < tam_muestra:
+                    muestra.append(valor)
+                elif (j := rng.randrange(filas)) < tam_muestra:
+                    muestra[j] = valor
+    return {'dtypes': {col: tipo_global(ej) for col, ej in ejemplos.items()}, 'muestra': muestra, 'filas': filas,
+            'secuencia': secuencia.hexdigest()}
+
+
+def _tipar(bloque: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Bloque con los dtypes globales (como quedaría esa parte del libro leída con pd.read_excel). Las columnas
+    de texto se leen sin inferencia para no convertir '09' en 9 en un bloque donde sólo hay textos numéricos."""
+    sin_inferir = {c: object for c in bloque.columns
+                   if not (is_numeric_dtype(dtypes[c]) or is_datetime64_any_dtype(dtypes[c]))}
+    df = _parsear(_filas_excel(bloque), bloque.columns, dtype=sin_inferir)
+    for col in df.columns:
+        if df[col].dtype != dtypes[col]:
+            df[col] = df[col].astype(dtypes[col])
+    return df
+
+
+def _ids_texto(df: pd.DataFrame) -> pd.Series:
+    return df['ID'].astype(str)
+
+
+def _con_fila_vacia(df: pd.DataFrame) -> pd.DataFrame:
+    """Mismos datos con los dtypes que deja reindex al agregar filas faltantes (sin agregarlas)."""
+    return df.reindex(pd.RangeIndex(len(df) + 1)).iloc[:-1]
+
+
+def comparar_en_disco(ref, new, salida, formato: str = 'csv', coercion: str = 'estricta',
+                      filas_por_particion: int = FILAS_POR_PARTICION, tam_bloque: int = 5000,
+                      dir_trabajo=None, max_muestra: int = 50) -> dict:
+    """Compara ref y new por ID con memoria acotada y escribe las diferencias en `salida` a medida que salen.
+    Devuelve un resumen (conteos, columnas con más diferencias y las primeras diferencias)."""
+    cols_ref, cols_new = encabezados(ref), encabezados(new)
+    if 'ID' not in cols_ref or 'ID' not in cols_new:
+        raise KeyError("La comparación en disco alinea por 'ID': ambos libros deben tener esa columna")
+    faltan, sobrantes, orden_difiere = columnas_diferentes(cols_ref, cols_new)
+    comunes = [c for c in cols_ref if c in cols_new and c != 'ID']
+
+    trabajo = Path(tempfile.mkdtemp(prefix='diferencias-', dir=dir_trabajo))
+    try:
+        # 1. perfil de tipos + cortes de las particiones
+        crudos = {'ref': _Volcado(trabajo / 'crudo-ref.pkl'), 'new': _Volcado(trabajo / 'crudo-new.pkl')}
+        perfiles = {'ref': perfilar(ref, tam_bloque, crudos['ref']), 'new': perfilar(new, tam_bloque, crudos['new'])}
+        dtypes = {lado: p['dtypes'] for lado, p in perfiles.items()}
+        # Con los mismos IDs en el mismo orden, pandas no ordena la unión de índices: las diferencias salen
+        # en el orden del libro y basta con partir por posición. Si no, la unión queda ordenada por ID.
+        por_posicion = (perfiles['ref']['secuencia'] == perfiles['new']['secuencia']
+                        and dtypes['ref']['ID'] == dtypes['new']['ID'])
+        muestra = sorted({str(v) for p in perfiles.values() for v in p['muestra']})
+        n_part = max(1, math.ceil(max(p['filas'] for p in perfiles.values()) / filas_por_particion))
+        pos = np.linspace(0, len(muestra), n_part + 1)[1:-1].astype(int)
+        cortes = np.array(sorted({muestra[i] for i in pos}), dtype=object)
+
+        # 2. partición por posición o por rangos de ID (los IDs nulos van a una partición final propia)
+        filas = {'ref': 0, 'new': 0}
+        volcados = {}
+        for lado in ('ref', 'new'):
+            for bloque in crudos[lado].partes():
+                df = _tipar(bloque, dtypes[lado])
+                df['ID'] = _ids_texto(df)
+                if por_posicion:
+                    particion = (filas[lado] + np.arange(len(df))) // filas_por_particion
+                else:
+                    ids = df['ID'].to_numpy(dtype=object)
+                    nulos = df['ID'].isna().to_numpy()
+                    particion = np.full(len(df), len(cortes) + 1)
+                    if (~nulos).any():
+                        particion[~nulos] = np.searchsorted(cortes, ids[~nulos], side='right')
+                for p in np.unique(particion):
+                    clave = (lado, int(p))
+                    if clave not in volcados:
+                        volcados[clave] = _Volcado(trabajo / f'{lado}-{int(p)}.pkl')
+                    volcados[clave].agregar(df[particion == p])
+                filas[lado] += len(df)
+            crudos[lado].path.unlink(missing_ok=True)
+
+        def leer_particion(lado, p):
+            if (lado, p) in volcados:
+                return volcados[(lado, p)].leer()
+            vacio = {c: pd.Series(dtype=t) for c, t in dtypes[lado].items()}
+            return pd.DataFrame(vacio).assign(ID=lambda d: _ids_texto(d))
+
+        # En memoria, la unión de índices agrega filas vacías al lado al que le faltan IDs y eso cambia dtypes
+        # (int64 -> float64, bool -> object) en todo el libro; hay que saberlo antes de comparar partición a partición.
+        particiones = sorted({p for _, p in volcados})
+        ampliar = {'ref': False, 'new': False}
+        for p in particiones:
+            ids_ref, ids_new = leer_particion('ref', p)[['ID']], leer_particion('new', p)[['ID']]
+            ref_al, new_al, _, _ = alinear(ids_ref, ids_new)
+            ampliar['ref'] |= len(ref_al) > len(ids_ref)
+            ampliar['new'] |= len(new_al) > len(ids_new)
+
+        # 3. comparación por partición; diferencias volcadas por columna para respetar el orden global
+        por_columna = {c: _Volcado(trabajo / f'col-{j}.pkl') for j, c in enumerate(comunes)}
+        faltan_new = _Volcado(trabajo / 'faltan-new.pkl')
+        faltan_ref = _Volcado(trabajo / 'faltan-ref.pkl')
+        conteo = Counter()
+        for p in particiones:
+            df_ref, df_new = leer_particion('ref', p), leer_particion('new', p)
+            if ampliar['ref']:
+                df_ref = _con_fila_vacia(df_ref)
+            if ampliar['new']:
+                df_new = _con_fila_vacia(df_new)
+            difs = comparar(df_ref, df_new, 'ID', coercion).difs
+            filas_dif = difs['COLUMN'] == '__ROW__'
+            celdas = difs[~filas_dif]
+            for col, grupo in celdas.groupby('COLUMN', sort=False):
+                por_columna[col].agregar(grupo)
+            conteo.update(difs['COLUMN'].value_counts().to_dict())
+            filas_faltantes = difs[filas_dif]
+            faltan_new.agregar(filas_faltantes[filas_faltantes['ACTUAL'] == 'MISSING_IN_NEW'])
+            faltan_ref.agregar(filas_faltantes[filas_faltantes['ACTUAL'] == 'ROW_PRESENT_IN_NEW'])
+            del df_ref, df_new, difs
+
+        # 4. escritura incremental en el orden del modo en memoria
+        primeras = []
+        total = 0
+        with abrir_escritor(formato, salida, COLUMNAS_DIF, streaming=True) as escritor:
+            for volcado in list(por_columna.values()) + [faltan_new, faltan_ref]:
+                for parte in volcado.partes():
+                    escritor.escribir(parte)
+                    total += len(parte)
+                    if len(primeras) < max_muestra:
+                        primeras.extend(parte.head(max_muestra - len(primeras)).to_dict('records'))
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+    return {
+        'filas_ref': filas['ref'], 'filas_new': filas['new'], 'columnas_ref': len(cols_ref),
+        'faltan': faltan, 'sobrantes': sobrantes, 'orden_difiere': orden_difiere,
+        'particiones': len(particiones), 'diferencias': total,
+        'top_columnas': pd.Series(dict(conteo.most_common(10)), dtype='int64'), 'primeras': primeras,
+        'archivo': str(salida),
+    }
+
+
+def imprimir_resumen(resumen: dict, max_print: int = 50):
+    if resumen['faltan']:
+        print(f"Columnas faltantes en nuevo ({len(resumen['faltan'])}): {resumen['faltan']}")
+    if resumen['sobrantes']:
+        print(f"Columnas sobrantes en nuevo ({len(resumen['sobrantes'])}): {resumen['sobrantes']}")
+    print(f"Filas: referencia={resumen['filas_ref']} nuevo={resumen['filas_new']} "
+          f"({resumen['particiones']} particiones)")
+    total_celdas = resumen['filas_ref'] * resumen['columnas_ref']
+    if not resumen['diferencias']:
+        print('No se encontraron diferencias.')
+        return
+    print(f"Diferencias: {resumen['diferencias']} registros"
+          + (f" ({resumen['diferencias'] / total_celdas:.4%} de {total_celdas} celdas)" if total_celdas else ''))
+    for d in resumen['primeras'][:max_print]:
+        print(f"ID={d['ID']} Col='{d['COLUMN']}' esperado='{d['EXPECTED']}' obtenido='{d['ACTUAL']}'")
+    print('Top columnas con diferencias:')
+    print(resumen['top_columnas'].to_string())
+    print(f"Detalle exportado a {resumen['archivo']}")
+
+
+def formato_por_extension(path) -> str:
+    return {'.parquet': 'parquet', '.feather': 'feather', '.xlsx': 'xlsx'}.get(Path(path).suffix.lower(), 'csv')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparación por ID con memoria acotada (libros muy grandes)')
+    parser.add_argument('--ref', default='backup_data/output_expect.xlsx', help='Archivo referencia (expected)')
+    parser.add_argument('--new', default='output.xlsx', help='Archivo generado (actual)')
+    parser.add_argument('--out', default='diff_ids.csv', help='Diferencias (.csv, .parquet o .xlsx)')
+    parser.add_argument('--coercion', choices=COERCIONES, default='estricta')
+    parser.add_argument('--filas-por-particion', type=int, default=FILAS_POR_PARTICION)
+    parser.add_argument('--bloque', type=int, default=5000, help='Filas por bloque de lectura')
+    parser.add_argument('--dir-trabajo', default=None, help='Carpeta para los temporales (por defecto la del sistema)')
+    parser.add_argument('--max-print', type=int, default=50)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    resumen = comparar_en_disco(args.ref, args.new, args.out, formato_por_extension(args.out), args.coercion,
+                                args.filas_por_particion, args.bloque, args.dir_trabajo, args.max_print)
+    imprimir_resumen(resumen, args.max_print)
+    pico = memoria_pico_mb()
+    print(f"Tiempo total: {time.perf_counter() - t0:.2f}s" + (f", memoria pico {pico:.0f} MB" if pico else ''))
+
+
+if __name__ == '__main__':
+    main()
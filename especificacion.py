@@ -0,0 +1,333 @@
+"""Especificación declarativa de la salida: columnas, mapeo encuesta -> salida y reglas fijas.
+
+Todo lo que cambia entre versiones de la encuesta vive en un archivo JSON o YAML (especificacion.json es
+la de la Alcaldía de Funza), así que incorporar una versión nueva no requiere tocar código:
+
+    columnas_salida  orden de las columnas de la salida
+    mapeo            encabezado (o prefijo) de la encuesta -> columna de salida (null = se ignora)
+    sin_prefijo      fuentes del mapeo que sólo aceptan coincidencia exacta
+    consecutivo      columna con el número de fila (texto, desde 0)
+    maestro          columnas que el maestro sobrescribe si las trae -> valor por defecto para los vacíos
+    constantes       columnas con un valor fijo (null = vacías)
+    derivados        columna -> {"funcion": nombre en derivados.FUNCIONES_DERIVADAS, "desde": columna, "tabla": ...}
+    copias           columna -> columna de salida de la que se copia
+    tipos            clase de esquema.py ("escala", "texto", "identificador") -> columnas; el resto es "etiqueta"
+    rangos           [{"min": 0, "max": 4, "columnas": [...]}, ...] valores válidos de las escalas (validacion.py)
+    cubo             dimensiones, bloques de clima, escalas, categorías, marcas y NPS del cubo de resultados (cubo.py)
+
+El archivo se valida y se compila una sola vez en una Transformacion (funciones resueltas, tablas y
+tipos por columna); el resultado se guarda en .cache/especificacion/ con el hash del archivo, y las
+ejecuciones siguientes sólo lo deserializan.
+
+Uso: python especificacion.py [especificacion.json]   (valida e imprime un resumen)
+"""
+import hashlib
+import json
+import pickle
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from cubo import DefinicionCubo
+from derivados import FUNCIONES_DERIVADAS
+from esquema import CLASES, columna_vacia, tipar
+from ingesta import escritura_atomica
+from plan_columnas import PlanColumnas, cargar_o_compilar, huella_encabezados
+
+VERSION_ESPEC = 1
+ESPECIFICACION = Path(__file__).resolve().with_name('especificacion.json')
+CACHE_ESPEC = '.cache/especificacion'
+
+_CLAVES = {'version', 'nombre', 'columnas_salida', 'mapeo', 'sin_prefijo', 'consecutivo', 'maestro',
+           'constantes', 'derivados', 'copias', 'tipos', 'rangos', 'cubo'}
+_OBLIGATORIAS = {'version', 'columnas_salida', 'mapeo'}
+
+# planes ya resueltos en este proceso, por huella (encabezados + mapeo); procesos largos como servicio.py
+# no vuelven a leer la caché del plan por cada archivo
+_PLANES = {}
+
+
+class EspecificacionInvalida(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Transformacion:
+    """Especificación compilada. `aplicar` construye df_out a partir de la encuesta ya filtrada y cruzada."""
+    huella: str
+    nombre: str
+    columnas: tuple
+    mapeo: dict
+    sin_prefijo: frozenset
+    consecutivo: str
+    # (columna, valor por defecto o None)
+    maestro: tuple
+    # (columna, valor)
+    constantes: tuple
+    # (columna, función ya ligada a su tabla, columna origen)
+    derivados: tuple
+    # (columna destino, columna origen)
+    copias: tuple
+    # columna -> tipos candidatos (esquema.py)
+    esquema: dict
+    # (columna, mínimo, máximo) de las escalas
+    rangos: tuple = ()
+    # definición del cubo de resultados o None
+    cubo: DefinicionCubo = None
+
+    @property
+    def defectos(self) -> dict:
+        return {col: defecto for col, defecto in self.maestro if defecto is not None}
+
+    def resolver(self, columnas_in, ruta_cache=None) -> PlanColumnas:
+        """Plan de columnas (posición de cada fuente en la entrada) para estos encabezados."""
+        columnas_in = list(columnas_in)
+        huella = huella_encabezados(columnas_in, self.mapeo, self.sin_prefijo)
+        if huella not in _PLANES:
+            _PLANES[huella] = cargar_o_compilar(columnas_in, self.mapeo, self.sin_prefijo, ruta_cache)
+        return _PLANES[huella]
+
+    def aplicar(self, df_in: pd.DataFrame, plan: PlanColumnas, inicio: int = 0, defectos: dict = None) -> pd.DataFrame:
+        """df_out columna a columna; `defectos` reemplaza los valores por defecto del maestro (p.ej. EMPRESA)."""
+        df_in = df_in.reset_index(drop=True)
+
+        # Valores por columna destino (aún sin tipo); las columnas que no aparecen quedan vacías
+        crudos = {dst: df_in[src] for dst, src in plan.destinos.items()}
+        for col, _ in self.maestro:
+            if col in df_in.columns:
+                crudos[col] = df_in[col]
+        for paso in self.pasos(inicio, defectos):
+            self.aplicar_paso(crudos, paso, df_in.index)
+        return self.tipada(crudos, df_in.index)
+
+    def pasos(self, inicio: int = 0, defectos: dict = None) -> list:
+        """Reglas fijas en el orden en que `aplicar` las ejecuta sobre las columnas ya tomadas de la entrada:
+        ('defecto', col, valor), ('constante', col, valor), ('consecutivo', col, inicio),
+        ('derivado', col, funcion, desde) y ('copia', col, origen)."""
+        defectos = {**self.defectos, **(defectos or {})}
+        pasos = [('defecto', col, defectos[col]) for col, _ in self.maestro if defectos.get(col) is not None]
+        pasos += [('constante', col, valor) for col, valor in self.constantes]
+        pasos.append(('consecutivo', self.consecutivo, inicio))
+        pasos += [('derivado', col, funcion, desde) for col, funcion, desde in self.derivados]
+        pasos += [('copia', dst, src) for dst, src in self.copias]
+        return pasos
+
+    def aplicar_paso(self, crudos: dict, paso: tuple, index):
+        """Ejecuta un paso de `pasos` sobre los valores sin tipo de cada columna destino."""
+        tipo, col = paso[:2]
+        vacia = pd.Series(pd.NA, index=index, dtype=object)
+        if tipo == 'defecto':
+            valores = crudos.get(col, vacia)
+            crudos[col] = valores.where(valores.notna(), paso[2])
+        elif tipo == 'constante':
+            if paso[2] is None:
+                crudos.pop(col, None)
+            else:
+                crudos[col] = pd.Series(paso[2], index=index, dtype=object)
+        elif tipo == 'consecutivo':
+            crudos[col] = pd.Series(range(paso[2], paso[2] + len(index)), index=index).astype(str)
+        elif tipo == 'derivado':
+            crudos[col] = paso[2](crudos.get(paso[3], vacia))
+        else:
+            crudos[col] = crudos.get(paso[2], vacia)
+
+    def tipada(self, crudos: dict, index) -> pd.DataFrame:
+        """df_out en el orden de la especificación a partir de los valores sin tipo de cada columna destino."""
+        # Cada columna se crea directamente con su tipo compacto del esquema (nunca pasa por object + NA)
+        return pd.DataFrame({
+            col: tipar(crudos[col], self.esquema[col]) if col in crudos
+            else columna_vacia(len(index), self.esquema[col], index)
+            for col in self.columnas
+        }, index=index)
+
+
+def leer_especificacion(ruta) -> dict:
+    """Contenido del archivo (JSON, o YAML si la extensión es .yaml/.yml y PyYAML está instalado)."""
+    ruta = Path(ruta)
+    texto = ruta.read_text(encoding='utf-8')
+    if ruta.suffix.lower() in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise EspecificacionInvalida(f'{ruta}: leer YAML requiere PyYAML (pip install pyyaml)') from None
+        datos = yaml.safe_load(texto)
+    else:
+        try:
+            datos = json.loads(texto)
+        except ValueError as e:
+            raise EspecificacionInvalida(f'{ruta}: JSON inválido ({e})') from None
+    if not isinstance(datos, dict):
+        raise EspecificacionInvalida(f'{ruta}: se esperaba un objeto con las claves {sorted(_OBLIGATORIAS)}')
+    return datos
+
+
+def validar(datos: dict) -> list:
+    """Lista de problemas de la especificación (vacía si es válida)."""
+    problemas = []
+    faltantes = _OBLIGATORIAS - set(datos)
+    if faltantes:
+        return [f'faltan las claves {sorted(faltantes)}']
+    desconocidas = set(datos) - _CLAVES
+    if desconocidas:
+        problemas.append(f'claves desconocidas {sorted(desconocidas)}')
+    if datos['version'] != VERSION_ESPEC:
+        problemas.append(f"versión {datos['version']} no soportada (se espera {VERSION_ESPEC})")
+
+    columnas = datos['columnas_salida']
+    if not isinstance(columnas, list) or not all(isinstance(c, str) for c in columnas):
+        return problemas + ['columnas_salida debe ser una lista de textos']
+    repetidas = sorted({c for c in columnas if columnas.count(c) > 1})
+    if repetidas:
+        problemas.append(f'columnas_salida repetidas: {repetidas}')
+    existentes = set(columnas)
+
+    def revisar(seccion, nombres):
+        ajenas = [c for c in nombres if c not in existentes]
+        if ajenas:
+            problemas.append(f'{seccion}: columnas que no están en columnas_salida: {ajenas}')
+
+    mapeo = datos['mapeo']
+    if not isinstance(mapeo, dict):
+        return problemas + ['mapeo debe ser un objeto encabezado -> columna']
+    revisar('mapeo', [d for d in mapeo.values() if d is not None])
+    sin_mapeo = [s for s in datos.get('sin_prefijo', []) if s not in mapeo]
+    if sin_mapeo:
+        problemas.append(f'sin_prefijo: fuentes que no están en el mapeo: {sin_mapeo}')
+    consecutivo = datos.get('consecutivo')
+    if consecutivo is not None:
+        revisar('consecutivo', [consecutivo])
+    for seccion in ('maestro', 'constantes', 'derivados', 'copias'):
+        if not isinstance(datos.get(seccion, {}), dict):
+            problemas.append(f'{seccion} debe ser un objeto columna -> valor')
+    revisar('maestro', list(datos.get('maestro', {})))
+    revisar('constantes', list(datos.get('constantes', {})))
+    copias = datos.get('copias', {})
+    revisar('copias', list(copias) + list(copias.values()))
+    for col, derivado in datos.get('derivados', {}).items():
+        revisar('derivados', [col])
+        if not isinstance(derivado, dict) or 'funcion' not in derivado or 'desde' not in derivado:
+            problemas.append(f"derivados['{col}'] debe tener 'funcion' y 'desde'")
+            continue
+        if derivado['funcion'] not in FUNCIONES_DERIVADAS:
+            problemas.append(f"derivados['{col}']: función desconocida '{derivado['funcion']}' "
+                             f"(opciones: {sorted(FUNCIONES_DERIVADAS)})")
+        revisar(f"derivados['{col}']", [derivado['desde']])
+    for clase, nombres in datos.get('tipos', {}).items():
+        if clase not in CLASES:
+            problemas.append(f"tipos: clase desconocida '{clase}' (opciones: {sorted(CLASES)})")
+        revisar(f"tipos['{clase}']", nombres)
+    for i, rango in enumerate(datos.get('rangos', [])):
+        if not isinstance(rango, dict) or not {'min', 'max', 'columnas'} <= set(rango):
+            problemas.append(f"rangos[{i}] debe tener 'min', 'max' y 'columnas'")
+            continue
+        if not rango['min'] <= rango['max']:
+            problemas.append(f"rangos[{i}]: min mayor que max")
+        revisar(f'rangos[{i}]', rango['columnas'])
+    if 'cubo' in datos:
+        problemas += _validar_cubo(datos['cubo'], revisar)
+    return problemas
+
+
+def _validar_cubo(cubo, revisar) -> list:
+    if not isinstance(cubo, dict) or not cubo.get('dimensiones'):
+        return ["cubo debe ser un objeto con al menos 'dimensiones'"]
+    problemas = []
+    revisar('cubo.dimensiones', cubo['dimensiones'])
+    for nombre, cols in cubo.get('bloques', {}).items():
+        revisar(f"cubo.bloques['{nombre}']", cols)
+    revisar('cubo.escalas', cubo.get('escalas', []))
+    revisar('cubo.categorias', list(cubo.get('categorias', {})))
+    revisar('cubo.marcas', cubo.get('marcas', []))
+    nps = cubo.get('nps')
+    if nps is not None:
+        if not isinstance(nps, dict) or not {'columna', 'promotores', 'detractores'} <= set(nps):
+            problemas.append("cubo.nps debe tener 'columna', 'promotores' y 'detractores'")
+        else:
+            revisar('cubo.nps', [nps['columna']])
+    return problemas
+
+
+def _tabla(valor):
+    return tuple(tuple(fila) for fila in valor)
+
+
+def compilar(datos: dict, huella: str = '') -> Transformacion:
+    problemas = validar(datos)
+    if problemas:
+        raise EspecificacionInvalida('Especificación inválida:\n  - ' + '\n  - '.join(problemas))
+    columnas = tuple(datos['columnas_salida'])
+    esquema = {col: CLASES['etiqueta'] for col in columnas}
+    for clase, nombres in datos.get('tipos', {}).items():
+        esquema.update({col: CLASES[clase] for col in nombres})
+    derivados = []
+    for col, d in datos.get('derivados', {}).items():
+        funcion = FUNCIONES_DERIVADAS[d['funcion']]
+        if d.get('tabla') is not None:
+            funcion = partial(funcion, tabla=_tabla(d['tabla']))
+        derivados.append((col, funcion, d['desde']))
+    return Transformacion(
+        huella=huella,
+        nombre=datos.get('nombre', ''),
+        columnas=columnas,
+        mapeo=dict(datos['mapeo']),
+        sin_prefijo=frozenset(datos.get('sin_prefijo', ())),
+        consecutivo=datos.get('consecutivo') or columnas[0],
+        maestro=tuple(datos.get('maestro', {}).items()),
+        constantes=tuple(datos.get('constantes', {}).items()),
+        derivados=tuple(derivados),
+        copias=tuple(datos.get('copias', {}).items()),
+        esquema=esquema,
+        rangos=tuple((col, r['min'], r['max']) for r in datos.get('rangos', []) for col in r['columnas']),
+        cubo=DefinicionCubo.desde_dict(datos['cubo']) if 'cubo' in datos else None,
+    )
+
+
+def huella_archivo(ruta) -> str:
+    h = hashlib.sha256(f'v{VERSION_ESPEC}:'.encode())
+    h.update(Path(ruta).read_bytes())
+    return h.hexdigest()
+
+
+def cargar_especificacion(ruta=ESPECIFICACION, dir_cache=CACHE_ESPEC) -> Transformacion:
+    """Transformacion compilada para el archivo `ruta`, desde la caché si el archivo no cambió."""
+    huella = huella_archivo(ruta)
+    cache = Path(dir_cache) / f'{huella}.pkl' if dir_cache is not None else None
+    if cache is not None and cache.exists():
+        try:
+            with open(cache, 'rb') as f:
+                transformacion = pickle.load(f)
+            if isinstance(transformacion, Transformacion) and transformacion.huella == huella:
+                return transformacion
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass  # caché corrupta o de otra versión del código: se recompila
+    transformacion = compilar(leer_especificacion(ruta), huella)
+    if cache is not None:
+        with escritura_atomica(cache) as tmp:
+            with open(tmp, 'wb') as f:
+                pickle.dump(transformacion, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return transformacion
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Valida y compila una especificación de salida')
+    parser.add_argument('ruta', nargs='?', default=str(ESPECIFICACION), help='Archivo JSON o YAML')
+    args = parser.parse_args()
+    try:
+        t = cargar_especificacion(args.ruta, dir_cache=None)
+    except EspecificacionInvalida as e:
+        raise SystemExit(str(e))
+    print(f"{t.nombre or args.ruta}: {len(t.columnas)} columnas, {len(t.mapeo)} fuentes en el mapeo, "
+          f"{len(t.derivados)} derivados, {len(t.copias)} copias, {len(t.constantes)} constantes")
+    clases = {}
+    for candidatos in t.esquema.values():
+        nombre = next(k for k, v in CLASES.items() if v == candidatos)
+        clases[nombre] = clases.get(nombre, 0) + 1
+    print('Tipos: ' + ', '.join(f'{k} {v}' for k, v in sorted(clases.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Esquema de tipos compactos para la salida (df_out).
+
+Cada columna de la salida declara una clase con su lista de tipos candidatos ("tipos" en la especificación); al
+construir la salida se usa el primero que represente los valores sin pérdida:
+
+    ESCALA         Int8 para las escalas de clima (0-4) y de 1 a 10
+    ETIQUETA       category para respuestas con pocos valores (demográficos, bandas NPS, generación, EMPRESA...)
+    TEXTO          string[pyarrow] para texto libre o de alta cardinalidad (COMENTARIOS, FECHA)
+    IDENTIFICADOR  Int64 para cédulas numéricas; texto si llegan con otros caracteres
+
+"Sin pérdida" significa que al escribir la salida se obtienen los mismos valores que con object: un
+Int8 sólo acepta enteros (no 4.0 ni True), un texto sólo acepta str y una categoría no se usa si la
+columna mezcla números de distinta clase (1, 1.0 y True serían la misma categoría). Si ningún candidato
+sirve, la columna queda como object, igual que antes.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    TIPO_TEXTO = 'string[pyarrow]'
+except ImportError:
+    TIPO_TEXTO = 'string'
+
+ESCALA = ('Int8', 'category')
+ETIQUETA = ('category',)
+TEXTO = (TIPO_TEXTO, 'category')
+IDENTIFICADOR = ('Int64', TIPO_TEXTO)
+CLASES = {'escala': ESCALA, 'etiqueta': ETIQUETA, 'texto': TEXTO, 'identificador': IDENTIFICADOR}
+
+_RANGOS = {'Int8': (-2**7, 2**7 - 1), 'Int16': (-2**15, 2**15 - 1), 'Int32': (-2**31, 2**31 - 1),
+           'Int64': (-2**63, 2**63 - 1)}
+# Tipos con los que pandas.Categorical no une valores distintos (en 'mixed' pueden convivir 1, 1.0 y True)
+_CATEGORIZABLES = {'string', 'integer', 'floating', 'boolean', 'empty', 'datetime', 'datetime64', 'date',
+                   'mixed-integer'}
+
+
+def _clase_numerica(valor):
+    if isinstance(valor, (bool, np.bool_)):
+        return 'bool'
+    if isinstance(valor, (int, np.integer)):
+        return 'int'
+    if isinstance(valor, (float, np.floating)):
+        return 'float'
+    return None
+
+
+def _categorizable(serie: pd.Series, inferido: str) -> bool:
+    if inferido not in _CATEGORIZABLES:
+        return False
+    if inferido != 'mixed-integer':
+        return True
+    # enteros con texto u otros objetos: sólo hay pérdida si además hay floats o booleanos
+    clases = {_clase_numerica(v) for v in pd.unique(serie.dropna().astype(object).to_numpy())}
+    return len(clases - {None}) <= 1
+
+
+def admite(serie: pd.Series, tipo: str, inferido: str = None) -> bool:
+    """True si `serie` se puede convertir a `tipo` conservando exactamente sus valores."""
+    if isinstance(serie.dtype, pd.CategoricalDtype) and tipo != 'category':
+        serie = serie.astype(object)
+    inferido = inferido or pd.api.types.infer_dtype(serie, skipna=True)
+    if inferido == 'empty':
+        return True
+    if tipo == 'category':
+        return _categorizable(serie, inferido)
+    if tipo in _RANGOS:
+        if inferido != 'integer':
+            return False
+        minimo, maximo = _RANGOS[tipo]
+        valores = serie.dropna()
+        return bool(valores.empty or (minimo <= valores.min() and valores.max() <= maximo))
+    if tipo.startswith('string'):
+        return inferido == 'string'
+    raise ValueError(f'Tipo de esquema desconocido: {tipo}')
+
+
+def tipar(serie: pd.Series, candidatos) -> pd.Series:
+    """`serie` convertida al primer tipo candidato que no pierde valores (o sin cambios si ninguno sirve)."""
+    if not candidatos or str(serie.dtype) == candidatos[0]:
+        return serie
+    inferido = pd.api.types.infer_dtype(serie, skipna=True)
+    for tipo in candidatos:
+        if str(serie.dtype) == tipo:
+            return serie
+        if admite(serie, tipo, inferido):
+            if inferido == 'empty':
+                return pd.Series(pd.NA if tipo != 'category' else np.nan, index=serie.index, dtype=tipo)
+            return serie.astype(tipo)
+    return serie
+
+
+def columna_vacia(n: int, candidatos, index=None) -> pd.Series:
+    """Columna sin valores ya con el primer tipo candidato (las columnas que la encuesta no trae)."""
+    tipo = candidatos[0] if candidatos else object
+    return pd.Series(np.nan if tipo in ('category', object) else pd.NA, index=index if index is not None else
+                     pd.RangeIndex(n), dtype=tipo)
+
+
+def aplicar_esquema(df: pd.DataFrame, esquema: dict) -> pd.DataFrame:
+    """Aplica `tipar` a cada columna del esquema presente en df (p.ej. tras concatenar salidas, donde las
+    categorías distintas vuelven a object)."""
+    return df.assign(**{c: tipar(df[c], esquema[c]) for c in df.columns if c in esquema})
+
+
+def tipos(df: pd.DataFrame) -> dict:
+    """dtype efectivo por columna (para reportes y para verificar el esquema)."""
+    return {c: str(t) for c, t in df.dtypes.items()}
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
@@ -0,0 +1,20 @@
+"""Formatos de salida con sus extensiones y motores de proceso (sin dependencias, para que la línea de comandos
+no cargue pandas)."""
+from pathlib import Path
+
+EXTENSIONES = {
+    'xlsx': '.xlsx',
+    'xlsxwriter': '.xlsx',
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv',
+}
+FORMATOS = list(EXTENSIONES)
+
+# pandas (por defecto) o polars (motor_polars.py, sólo en modo completo)
+MOTORES = ['pandas', 'polars']
+
+
+def ruta_para_formato(path, formato: str) -> Path:
+    """Misma ruta con la extensión del formato (output.xlsx -> output.parquet)."""
+    return Path(path).with_suffix(EXTENSIONES[formato])
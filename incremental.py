@@ -0,0 +1,206 @@
+"""Reprocesamiento incremental de creadordf.py.
+
+Junto a la salida se guarda un estado (<salida>.estado.pkl) con las filas ya proyectadas, la huella de
+cada participante ('IDs / TAN del participante' + hash del contenido de la fila), cuántas filas de salida
+produjo (más de una si el maestro repite su ID) y una huella por ID de los valores del maestro. En cada
+corrida sólo se proyectan las filas nuevas o modificadas y las de IDs cuyo maestro cambió, y se eliminan las
+que ya no están. Si cambió el plan de columnas, la especificación de la salida o la deduplicación del maestro
+se reconstruye todo.
+
+Si se pide el cubo de resultados (cubo.py), el estado también guarda el cubo de la salida anterior: se le
+resta la contribución de las filas eliminadas o modificadas y se le suma la de las filas nuevas, sin
+volver a agregar la salida completa.
+"""
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import proceso
+from cubo import Cubo
+from derivados import normalizar_id_serie
+from especificacion import Transformacion
+from esquema import aplicar_esquema
+from ingesta import encabezados, escritura_atomica, leer_excel
+from maestro import IndiceMaestro
+from proceso import PLAN_CACHE
+from validacion import Validador
+
+VERSION_ESTADO = 2
+COL_CLAVE = 'IDs / TAN del participante'
+
+
+def ruta_estado(output) -> Path:
+    output = Path(output)
+    return output.with_name(output.name + '.estado.pkl')
+
+
+def claves_participantes(df_in: pd.DataFrame) -> pd.Series:
+    """Clave estable por fila: TAN del participante + ordinal para TAN repetidos."""
+    tan = df_in[COL_CLAVE].astype(object).where(df_in[COL_CLAVE].notna(), None).map(str)
+    ordinal = df_in.groupby(tan, sort=False).cumcount().astype(str)
+    return (tan + '#' + ordinal).reset_index(drop=True)
+
+
+def hashes_contenido(df_in: pd.DataFrame) -> np.ndarray:
+    columnas = sorted(df_in.columns, key=str)
+    return pd.util.hash_pandas_object(df_in[columnas].astype(object), index=False).to_numpy()
+
+
+def huellas_maestro(indice: IndiceMaestro) -> pd.Series:
+    """Hash por ID de todas sus filas en el maestro (la primera y, ponderadas por su orden, las repeticiones)."""
+    if len(indice) == 0:
+        return pd.Series(dtype='uint64')
+    hashes = pd.util.hash_pandas_object(indice.valores.astype(object), index=False).to_numpy()
+    if len(indice.repeticiones):
+        extra = pd.util.hash_pandas_object(indice.repeticiones[indice.columnas].astype(object), index=False).to_numpy()
+        orden = indice.repeticiones.groupby('ID', sort=False).cumcount().to_numpy(dtype='uint64') + np.uint64(2)
+        np.add.at(hashes, indice.ids.get_indexer(indice.repeticiones['ID']), extra * orden)  # módulo 2**64
+    return pd.Series(hashes, index=indice.ids)
+
+
+def ids_maestro_cambiados(previas: pd.Series, actuales: pd.Series) -> set:
+    comunes = previas.index.intersection(actuales.index)
+    distintos = comunes[previas.loc[comunes].to_numpy() != actuales.loc[comunes].to_numpy()]
+    return set(distintos) | set(previas.index.difference(actuales.index)) | set(actuales.index.difference(previas.index))
+
+
+def cargar_estado(path: Path):
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            estado = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    return estado if estado.get('version') == VERSION_ESTADO else None
+
+
+def guardar_estado(path: Path, estado: dict):
+    with escritura_atomica(path) as tmp, open(tmp, 'wb') as f:
+        pickle.dump(estado, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _rangos(inicio: np.ndarray, veces: np.ndarray) -> np.ndarray:
+    """Concatenación de arange(inicio[i], inicio[i] + veces[i])."""
+    return np.repeat(inicio, veces) + np.arange(veces.sum()) - np.repeat(np.cumsum(veces) - veces, veces)
+
+
+def _actualizar_cubo(cubo: Cubo, previo, previas: pd.DataFrame, df_out: pd.DataFrame, reusadas: np.ndarray,
+                     nuevas: np.ndarray) -> None:
+    """Suma a `cubo` el cubo de df_out: el anterior (`previo` = (huella, datos) del estado) menos las filas de
+    `previas` que ya no están tal cual (todas salvo `reusadas`) y más las filas `nuevas` de df_out. Sin cubo
+    previo de la misma definición se agrega df_out completo."""
+    definicion = cubo.definicion
+    if previo is None or previo[0] != definicion.huella:
+        cubo.sumar(Cubo.desde_salida(df_out, definicion))
+        return
+    quitadas = np.setdiff1d(np.arange(len(previas)), reusadas)
+    cubo.sumar(Cubo(definicion, previo[1]))
+    cubo.restar(Cubo.desde_salida(previas.iloc[quitadas], definicion))
+    cubo.sumar(Cubo.desde_salida(df_out.iloc[nuevas], definicion))
+
+
+def procesar_incremental(input1, indice: IndiceMaestro, output, formato: str = 'xlsx',
+                         espec: Transformacion = None, validador: Validador = None, cubo: Cubo = None,
+                         avisos: bool = True) -> dict:
+    """Actualiza la salida reprocesando sólo lo necesario. Devuelve el resumen de cambios.
+    La validación de calidad se hace sobre la salida completa (reutilizada + recién proyectada); si se pasa
+    `cubo`, se le suma el cubo de la salida actualizada. Con `avisos` se imprimen los prefijos ambiguos y los
+    hallazgos de calidad."""
+    espec = espec or proceso.especificacion_por_defecto()
+    columnas = list(espec.columnas)
+    usadas = proceso.columnas_usadas(input1, espec)
+    df_in = leer_excel(input1, columnas=usadas)
+    df_in = df_in[df_in.get('Estado de la participación') == 'Participación completa'].reset_index(drop=True)
+    if COL_CLAVE not in df_in.columns:
+        raise KeyError(f"El modo incremental requiere la columna '{COL_CLAVE}' en INPUT1")
+
+    cruzado_cols = list(indice.cruzar(df_in.head(0), 'ID').columns)
+    plan = espec.resolver(cruzado_cols, PLAN_CACHE)
+    if avisos:
+        proceso.avisar_ambiguos(plan)
+
+    claves = claves_participantes(df_in)
+    hashes = hashes_contenido(df_in)
+    maestro_actual = huellas_maestro(indice)
+
+    path_estado = ruta_estado(output)
+    estado = cargar_estado(path_estado)
+    reconstruir = (estado is None or estado['huella_plan'] != plan.huella or estado.get('huella_espec') != espec.huella
+                   or estado['columnas'] != columnas or estado['deduplicar'] != indice.deduplicar
+                   or not Path(output).exists())
+
+    resumen = {'nuevas': 0, 'modificadas': 0, 'eliminadas': 0, 'sin_cambios': 0, 'maestro_actualizadas': 0}
+    if reconstruir:
+        a_proyectar = np.arange(len(df_in))
+        previas = pd.DataFrame(columns=columnas)
+        pos_previa = np.full(len(df_in), -1)
+        resumen['nuevas'] = len(df_in)
+    else:
+        previas = estado['df_out']
+        idx_prev = pd.Index(estado['claves'])
+        pos_previa = idx_prev.get_indexer(claves)
+        existe = pos_previa >= 0
+        igual = np.zeros(len(df_in), dtype=bool)
+        igual[existe] = estado['hashes'][pos_previa[existe]] == hashes[existe]
+        a_proyectar = np.flatnonzero(~igual)
+        resumen['nuevas'] = int((~existe).sum())
+        resumen['modificadas'] = int((existe & ~igual).sum())
+        resumen['sin_cambios'] = int(igual.sum())
+        resumen['eliminadas'] = int(len(idx_prev) - existe.sum())
+        pos_previa = np.where(igual, pos_previa, -1)
+        # las filas de IDs cuyo maestro cambió se vuelven a cruzar (puede cambiar también su número de filas)
+        cambiados = ids_maestro_cambiados(estado['maestro'], maestro_actual)
+        if cambiados:
+            afectadas = np.flatnonzero((pos_previa >= 0) & normalizar_id_serie(df_in['ID']).isin(cambiados).to_numpy())
+            pos_previa[afectadas] = -1
+            a_proyectar = np.union1d(a_proyectar, afectadas)
+            resumen['maestro_actualizadas'] = len(afectadas)
+
+    cruzado = proceso.filtrar_y_cruzar(df_in.iloc[a_proyectar], indice)
+    origen = cruzado.index.to_numpy()  # fila de df_in de cada fila cruzada (varias si el maestro repite el ID)
+    proyectadas = proceso.proyectar(cruzado, plan, espec=espec)
+
+    # Ensamblar en el orden actual de la encuesta: filas reutilizadas + filas recién proyectadas
+    reusar = np.flatnonzero(pos_previa >= 0)
+    reusadas = np.array([], dtype=int)
+    partes, filas_de = [], []
+    if len(reusar):
+        filas_previas = estado['filas']
+        veces = filas_previas[pos_previa[reusar]]
+        reusadas = _rangos((np.cumsum(filas_previas) - filas_previas)[pos_previa[reusar]], veces)
+        partes.append(previas.iloc[reusadas])
+        filas_de.append(np.repeat(reusar, veces))
+    if len(a_proyectar):
+        partes.append(proyectadas)
+        filas_de.append(origen)
+    if partes:
+        filas_de = np.concatenate(filas_de)
+        orden = np.argsort(filas_de, kind='stable')  # las filas de un mismo participante vienen de una sola parte
+        df_out = pd.concat(partes).iloc[orden].reindex(columns=columnas)
+        nuevas = np.flatnonzero(orden >= len(reusadas))
+    else:
+        filas_de, df_out, nuevas = np.array([], dtype=int), pd.DataFrame(columns=columnas), np.array([], dtype=int)
+
+    df_out = df_out.reset_index(drop=True)
+    df_out[espec.consecutivo] = pd.Series(range(len(df_out))).astype(str)
+    df_out = aplicar_esquema(df_out, espec.esquema)  # concat de categorías distintas vuelve a object
+    validador = validador or Validador(espec)
+    validador.validar(None, df_out, plan, encabezados(input1))
+    if avisos:
+        validador.imprimir()
+    if cubo is not None:
+        previo = None if reconstruir else estado.get('cubo')
+        _actualizar_cubo(cubo, previo, previas, df_out, reusadas, nuevas)
+
+    metricas = proceso.escribir_salida(df_out, output, formato)
+    guardar_estado(path_estado, {
+        'version': VERSION_ESTADO, 'huella_plan': plan.huella, 'huella_espec': espec.huella, 'columnas': columnas,
+        'claves': claves.to_numpy(), 'hashes': hashes, 'filas': np.bincount(filas_de, minlength=len(df_in)),
+        'maestro': maestro_actual, 'deduplicar': indice.deduplicar, 'df_out': df_out,
+        'cubo': (cubo.definicion.huella, cubo.datos) if cubo is not None else None,
+    })
+    resumen.update(filas=len(df_out), reconstruccion=reconstruir, escritura=metricas)
+    return resumen
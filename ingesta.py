@@ -0,0 +1,260 @@
+"""Lectura de los libros Excel con caché columnar (Arrow IPC / Feather v2).
+
+Cada libro se convierte una sola vez a .cache/columnar/; la caché se identifica por hash y mtime del
+archivo origen. Las lecturas siguientes usan memory mapping y sólo cargan las columnas pedidas.
+Si el origen cambió, si pyarrow no está instalado o si el libro tiene tipos que no se pueden
+representar sin pérdida, se lee directamente el Excel.
+
+Uso: python ingesta.py input1.xlsx input2.xlsx   (precalienta la caché)
+"""
+import datetime as dt
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = '.cache/columnar'
+VERSION_CACHE = 1
+
+# Columnas object con tipos mezclados (p.ej. '3 o más' y 2 en la misma pregunta): se guardan como texto
+# más una columna PREFIJO_TIPO<columna> de códigos de tipo para reconstruir exactamente los valores que da
+# read_excel (codificar_mixta / decodificar_mixta; también los usan linea_base.py y motor_polars.py).
+PREFIJO_TIPO = '__tipo__'
+_NULO, _STR, _INT, _FLOAT, _BOOL, _FECHA = range(6)
+
+
+class CacheNoSoportada(Exception):
+    pass
+
+
+def hash_archivo(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+@contextmanager
+def escritura_atomica(path: Path):
+    """Entrega una ruta temporal y la renombra sobre `path` al terminar: otro proceso que lea la caché
+    en paralelo (p.ej. el runner por lotes) nunca ve un archivo a medio escribir."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _escribir_json(path: Path, datos: dict):
+    with escritura_atomica(path) as tmp:
+        tmp.write_text(json.dumps(datos, ensure_ascii=False), encoding='utf-8')
+
+
+def _rutas_cache(path: Path, cache_dir) -> tuple:
+    clave = hashlib.sha256(str(path.resolve()).encode('utf-8')).hexdigest()[:12]
+    base = Path(cache_dir) / f'{path.stem}-{clave}'
+    return base.with_suffix('.arrow'), base.with_suffix('.json')
+
+
+def codificar_mixta(serie: pd.Series) -> tuple:
+    """(textos, códigos int8 de tipo) de una columna object con tipos mezclados, para guardarla en Arrow.
+    Lanza CacheNoSoportada si algún valor no es nulo, texto, bool, entero, float o fecha."""
+    codigos = np.empty(len(serie), dtype=np.int8)
+    textos = []
+    for i, v in enumerate(serie.to_numpy(dtype=object)):
+        if v is None or (isinstance(v, float) and np.isnan(v)) or v is pd.NaT:
+            codigos[i], t = _NULO, None
+        elif isinstance(v, str):
+            codigos[i], t = _STR, v
+        elif isinstance(v, (bool, np.bool_)):
+            codigos[i], t = _BOOL, str(bool(v))
+        elif isinstance(v, (int, np.integer)):
+            codigos[i], t = _INT, str(int(v))
+        elif isinstance(v, (float, np.floating)):
+            codigos[i], t = _FLOAT, repr(float(v))
+        elif isinstance(v, dt.datetime):
+            codigos[i], t = _FECHA, pd.Timestamp(v).isoformat()
+        else:
+            raise CacheNoSoportada(f"Tipo {type(v).__name__} no soportado en la columna '{serie.name}'")
+        textos.append(t)
+    return pd.Series(textos, dtype=object, name=serie.name), codigos
+
+
+def decodificar_mixta(textos: pd.Series, codigos: np.ndarray) -> pd.Series:
+    """Inversa de codificar_mixta: la columna object con los mismos valores y tipos que dio read_excel."""
+    valores = textos.to_numpy(dtype=object)
+    out = np.full(len(valores), np.nan, dtype=object)
+    for codigo, conv in ((_STR, str), (_INT, int), (_FLOAT, float), (_BOOL, lambda s: s == 'True'),
+                         (_FECHA, pd.Timestamp)):
+        idx = np.flatnonzero(codigos == codigo)
+        if len(idx):
+            out[idx] = [conv(v) for v in valores[idx]]
+    return pd.Series(out, index=textos.index, name=textos.name, dtype=object)
+
+
+def _convertir(path: Path, ruta_arrow: Path, ruta_meta: Path, stat, sha: str) -> pd.DataFrame:
+    from pyarrow import feather
+
+    df = pd.read_excel(path)
+    if not all(isinstance(c, str) for c in df.columns) or df.columns.duplicated().any():
+        raise CacheNoSoportada('Encabezados no textuales o duplicados')
+    guardar = {}
+    mixtas = []
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype == object and serie.dropna().map(type).nunique() > 1:
+            guardar[col], guardar[PREFIJO_TIPO + col] = codificar_mixta(serie)
+            mixtas.append(col)
+        else:
+            guardar[col] = serie
+    with escritura_atomica(ruta_arrow) as tmp:
+        feather.write_feather(pd.DataFrame(guardar), tmp, compression='uncompressed')
+    _escribir_json(ruta_meta, {
+        'version': VERSION_CACHE, 'origen': str(path), 'sha256': sha, 'mtime_ns': stat.st_mtime_ns,
+        'tamano': stat.st_size, 'columnas': list(df.columns), 'mixtas': mixtas,
+    })
+    return df
+
+
+def origen_sin_cambios(path: Path, meta: dict) -> tuple:
+    """Compara path con la firma guardada en meta (mtime_ns, tamano, sha256). Devuelve (sin_cambios, sha).
+    Si sólo cambió el mtime pero no el contenido, actualiza meta['mtime_ns'] y lo da por vigente."""
+    stat = path.stat()
+    if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('tamano') == stat.st_size:
+        return True, meta.get('sha256')
+    sha = hash_archivo(path)
+    if sha != meta.get('sha256'):
+        return False, sha
+    meta['mtime_ns'] = stat.st_mtime_ns
+    meta['tamano'] = stat.st_size
+    return True, sha
+
+
+def _meta_vigente(path: Path, ruta_arrow: Path, ruta_meta: Path):
+    """Devuelve (meta, stat, sha). meta es None si la caché no existe o no corresponde al origen."""
+    stat = path.stat()
+    if not (ruta_arrow.exists() and ruta_meta.exists()):
+        return None, stat, None
+    try:
+        meta = json.loads(ruta_meta.read_text(encoding='utf-8'))
+    except ValueError:
+        return None, stat, None
+    if meta.get('version') != VERSION_CACHE:
+        return None, stat, None
+    mtime_previo = meta['mtime_ns']
+    vigente, sha = origen_sin_cambios(path, meta)
+    if not vigente:
+        return None, stat, sha
+    if meta['mtime_ns'] != mtime_previo:
+        _escribir_json(ruta_meta, meta)
+    return meta, stat, sha
+
+
+def seleccionar_columnas(columnas_todas, columnas):
+    """Las de `columnas_todas` pedidas en `columnas` (lista, función tipo usecols o None = todas), en su orden."""
+    if columnas is None:
+        return list(columnas_todas)
+    if callable(columnas):
+        return [c for c in columnas_todas if columnas(c)]
+    pedidas = set(columnas)
+    return [c for c in columnas_todas if c in pedidas]
+
+
+def _leer_excel_directo(path: Path, columnas) -> pd.DataFrame:
+    if columnas is None:
+        return pd.read_excel(path)
+    if callable(columnas):
+        return pd.read_excel(path, usecols=columnas)
+    pedidas = set(columnas)
+    return pd.read_excel(path, usecols=lambda c: c in pedidas)
+
+
+def leer_excel(path, columnas=None, cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """Equivalente a pd.read_excel(path) (primera hoja) restringido a `columnas` (lista o función tipo usecols)."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No existe el archivo: {path}")
+    try:
+        from pyarrow import feather
+    except ImportError:
+        return _leer_excel_directo(path, columnas)
+
+    ruta_arrow, ruta_meta = _rutas_cache(path, cache_dir)
+    meta, stat, sha = _meta_vigente(path, ruta_arrow, ruta_meta)
+    if meta is None:
+        try:
+            df = _convertir(path, ruta_arrow, ruta_meta, stat, sha or hash_archivo(path))
+        except CacheNoSoportada as e:
+            print(f"[AVISO] {path} se lee sin caché columnar: {e}")
+            return _leer_excel_directo(path, columnas)
+        return df[seleccionar_columnas(df.columns, columnas)]
+
+    sel = seleccionar_columnas(meta['columnas'], columnas)
+    mixtas = [c for c in sel if c in set(meta['mixtas'])]
+    tabla = feather.read_table(ruta_arrow, columns=sel + [PREFIJO_TIPO + c for c in mixtas], memory_map=True)
+    df = tabla.to_pandas()
+    for col in mixtas:
+        df[col] = decodificar_mixta(df[col], df.pop(PREFIJO_TIPO + col).to_numpy())
+    return df[sel]
+
+
+def ruta_columnar(path, cache_dir=CACHE_DIR):
+    """(ruta .arrow, meta) de la caché vigente de `path`, convirtiendo el libro si hace falta, para quien
+    escanea la caché directamente (motor_polars.py). None si pyarrow no está instalado o el libro no se
+    puede representar sin pérdida. Las columnas de meta['mixtas'] vienen como texto + PREFIJO_TIPO<columna>."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No existe el archivo: {path}")
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    ruta_arrow, ruta_meta = _rutas_cache(path, cache_dir)
+    meta, stat, sha = _meta_vigente(path, ruta_arrow, ruta_meta)
+    if meta is None:
+        try:
+            _convertir(path, ruta_arrow, ruta_meta, stat, sha or hash_archivo(path))
+        except CacheNoSoportada as e:
+            print(f"[AVISO] {path} se lee sin caché columnar: {e}")
+            return None
+        meta = json.loads(ruta_meta.read_text(encoding='utf-8'))
+    return ruta_arrow, meta
+
+
+def encabezados(path, cache_dir=CACHE_DIR) -> list:
+    """Encabezados de la primera hoja, desde la caché si está vigente o leyendo sólo la primera fila."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No existe el archivo: {path}")
+    ruta_arrow, ruta_meta = _rutas_cache(path, cache_dir)
+    meta, _, _ = _meta_vigente(path, ruta_arrow, ruta_meta)
+    if meta is not None:
+        return list(meta['columnas'])
+    return list(pd.read_excel(path, nrows=0).columns)
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Convierte libros Excel a la caché columnar')
+    parser.add_argument('archivos', nargs='+')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+    for archivo in args.archivos:
+        t0 = time.perf_counter()
+        df = leer_excel(archivo, cache_dir=args.cache_dir)
+        print(f"{archivo}: {df.shape[0]} filas x {df.shape[1]} columnas en {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Medición por etapas de una ejecución (lectura, filtro, cruce, proyección, escritura...).
+
+Cada etapa registra tiempo de reloj, tiempo de CPU, memoria y filas de entrada/salida; al final se obtiene
+un reporte JSON con formato estable para comparar ejecuciones entre ciclos de encuesta:
+
+    {"version": 1, "inicio": "2025-01-31T10:00:00", "comando": [...], "entorno": {...},
+     "etapas": [{"nombre": "lectura", "segundos": 0.41, "cpu_segundos": 0.39, "filas_entrada": null,
+                 "filas_salida": 812, "rss_mb": 180.2, "rss_pico_mb": 185.0, "python_pico_mb": null}, ...],
+     "total": {"segundos": 1.2, "cpu_segundos": 1.1, "rss_pico_mb": 190.4}}
+
+Las claves sólo se agregan, nunca se renombran; si cambia su significado se sube VERSION_REPORTE.
+`python_pico_mb` (tracemalloc) sólo se llena si se pide, porque tracemalloc vuelve lenta la ejecución.
+"""
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from ingesta import escritura_atomica
+
+VERSION_REPORTE = 1
+
+
+def memoria_pico_mb():
+    """Pico de memoria residente del proceso (MB) o None donde no hay `resource` (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024  # macOS reporta bytes; Linux, KB
+
+
+def memoria_actual_mb():
+    """Memoria residente actual (MB) en Linux; None en otros sistemas."""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return paginas * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+def _redondear(valor, decimales=4):
+    return None if valor is None else round(valor, decimales)
+
+
+class Etapa:
+    """Resultado de una etapa; `filas_salida` (y `filas_entrada`) se pueden completar dentro del bloque with."""
+
+    def __init__(self, nombre: str, filas_entrada=None):
+        self.nombre = nombre
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+        self.segundos = self.cpu_segundos = None
+        self.rss_mb = self.rss_pico_mb = self.python_pico_mb = None
+
+    def como_dict(self) -> dict:
+        return {
+            'nombre': self.nombre, 'segundos': _redondear(self.segundos), 'cpu_segundos': _redondear(self.cpu_segundos),
+            'filas_entrada': self.filas_entrada, 'filas_salida': self.filas_salida,
+            'rss_mb': _redondear(self.rss_mb, 1), 'rss_pico_mb': _redondear(self.rss_pico_mb, 1),
+            'python_pico_mb': _redondear(self.python_pico_mb, 1),
+        }
+
+
+class Medidor:
+    """Registra etapas con `with medidor.etapa('nombre') as e: ...`. Con `perfilar` las etapas de ese conjunto se
+    ejecutan bajo cProfile y sus estadísticas se guardan en `dir_perfiles` (<etapa>.prof)."""
+
+    def __init__(self, memoria_python: bool = False, perfilar=(), dir_perfiles='.'):
+        self.etapas = []
+        self.memoria_python = memoria_python
+        self.perfilar = set(perfilar)
+        self.dir_perfiles = Path(dir_perfiles)
+        self.perfiles = {}
+        self.inicio = datetime.now()
+        self._t0, self._cpu0 = time.perf_counter(), time.process_time()
+        if memoria_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def etapa(self, nombre: str, filas_entrada=None):
+        etapa = Etapa(nombre, filas_entrada)
+        perfil = cProfile.Profile() if nombre in self.perfilar else None
+        if self.memoria_python:
+            tracemalloc.reset_peak()
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        if perfil:
+            perfil.enable()
+        try:
+            yield etapa
+        finally:
+            if perfil:
+                perfil.disable()
+            etapa.segundos = time.perf_counter() - t0
+            etapa.cpu_segundos = time.process_time() - cpu0
+            etapa.rss_mb, etapa.rss_pico_mb = memoria_actual_mb(), memoria_pico_mb()
+            if self.memoria_python:
+                etapa.python_pico_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            self.etapas.append(etapa)
+            if perfil:
+                self._guardar_perfil(nombre, perfil)
+
+    def _guardar_perfil(self, nombre: str, perfil: cProfile.Profile):
+        self.dir_perfiles.mkdir(parents=True, exist_ok=True)
+        ruta = self.dir_perfiles / f'{nombre}.prof'
+        perfil.dump_stats(ruta)
+        self.perfiles[nombre] = ruta
+
+    def resumen_perfil(self, nombre: str, n: int = 25) -> str:
+        """Las n funciones con más tiempo acumulado de una etapa perfilada (texto de pstats)."""
+        salida = io.StringIO()
+        pstats.Stats(str(self.perfiles[nombre]), stream=salida).sort_stats('cumulative').print_stats(n)
+        return salida.getvalue()
+
+    def reporte(self, **extra) -> dict:
+        return {
+            'version': VERSION_REPORTE,
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'comando': sys.argv,
+            'entorno': entorno(),
+            'etapas': [e.como_dict() for e in self.etapas],
+            'total': {'segundos': _redondear(time.perf_counter() - self._t0),
+                      'cpu_segundos': _redondear(time.process_time() - self._cpu0),
+                      'rss_pico_mb': _redondear(memoria_pico_mb(), 1)},
+            **extra,
+        }
+
+    def guardar(self, path, **extra) -> dict:
+        datos = self.reporte(**extra)
+        with escritura_atomica(path) as tmp:
+            tmp.write_text(json.dumps(datos, ensure_ascii=False, indent=2), encoding='utf-8')
+        return datos
+
+    def imprimir(self):
+        ancho = max([14] + [len(e.nombre) for e in self.etapas])
+        print(f"{'etapa':<{ancho}} {'seg':>8} {'cpu':>8} {'filas in':>9} {'filas out':>9} {'rss pico MB':>12}")
+        for e in self.etapas:
+            print(f"{e.nombre:<{ancho}} {e.segundos:>8.3f} {e.cpu_segundos:>8.3f} {_o_guion(e.filas_entrada):>9} "
+                  f"{_o_guion(e.filas_salida):>9} {_o_guion(_redondear(e.rss_pico_mb, 1)):>12}")
+
+
+class _SinMedicion(Medidor):
+    """Medidor que no registra nada: es el valor por defecto de las funciones instrumentadas."""
+
+    @contextmanager
+    def etapa(self, nombre: str, filas_entrada=None):
+        yield Etapa(nombre, filas_entrada)
+
+
+SIN_MEDIR = _SinMedicion()
+
+
+def _o_guion(valor):
+    return '-' if valor is None else valor
+
+
+def entorno() -> dict:
+    import pandas as pd
+    return {'python': platform.python_version(), 'pandas': pd.__version__, 'plataforma': platform.platform()}
@@ -0,0 +1,314 @@
+"""Línea base de regresión precompilada: la salida esperada convertida una sola vez a un artefacto columnar.
+
+compare.py, analysis.py, analysis_dep.py y diferencias.py comparan contra backup_data/output_expect.xlsx. Al
+bendecir la referencia se guarda junto a ella (output_expect.base.arrow + output_expect.base.json):
+    - todas sus columnas en Arrow IPC sin comprimir (las mezcladas como texto + códigos, igual que ingesta.py)
+    - las filas ordenadas por ID como texto (nulos al final), con el ordinal de repetición (__dup__) y la
+      posición original (__fila__) ya calculados
+    - una huella por fila (diferencias.huella_celdas combinada sobre todas las columnas salvo ID) y, en el
+      JSON, una huella por columna y la firma del Excel de origen
+Las herramientas abren el artefacto con memory mapping en lugar de parsear el Excel. En la comparación estricta
+por ID sólo se calculan las huellas del nuevo: los grupos de ID cuyas filas coinciden en ambos lados se
+descartan sin materializar la referencia y diferencias.comparar corre sobre el resto, así que una regresión
+cuesta la carga del nuevo más el diff. Con otra coerción, sin columna ID o con otro conjunto de columnas se
+compara la referencia completa (leída igualmente del artefacto). Si el Excel cambió después de bendecir se
+avisa y se vuelve a leer el Excel.
+
+Uso: python linea_base.py bendecir [backup_data/output_expect.xlsx]
+     python linea_base.py verificar [backup_data/output_expect.xlsx]
+"""
+import argparse
+import dataclasses
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from diferencias import ResultadoDiff, combinar_huellas, comparar, huella_celdas
+from ingesta import (PREFIJO_TIPO, CacheNoSoportada, codificar_mixta, decodificar_mixta, escritura_atomica,
+                     hash_archivo, origen_sin_cambios, seleccionar_columnas)
+
+REFERENCIA = 'backup_data/output_expect.xlsx'
+VERSION_BASE = 1
+_CLAVE, _DUP, _FILA, _HUELLA = '__clave__', '__dup__', '__fila__', '__huella__'
+# tipos de ID (infer_dtype) en los que el texto identifica al valor igual que ==: emparejar por texto da los
+# mismos pares que la alineación de diferencias.alinear sobre el ID sin convertir
+_TIPOS_ID = ('string', 'integer')
+
+
+def rutas_base(path) -> tuple:
+    """(.base.arrow, .base.json) junto al Excel de referencia."""
+    path = Path(path)
+    return path.with_name(f'{path.stem}.base.arrow'), path.with_name(f'{path.stem}.base.json')
+
+
+def _ordenar(ids: pd.Series) -> tuple:
+    """(orden estable por ID como texto con los nulos al final, claves en ese orden con None en los nulos,
+    ordinal de repetición de cada fila en ese orden, cantidad de IDs no nulos)."""
+    nulos = ids.isna().to_numpy()
+    claves = ids.astype(str).to_numpy(dtype=object)
+    claves[nulos] = None
+    validas = np.flatnonzero(~nulos)
+    orden = np.concatenate([validas[np.argsort(claves[validas], kind='stable')], np.flatnonzero(nulos)])
+    claves = claves[orden]
+    m = len(validas)
+    dup = np.zeros(len(orden), dtype=np.int64)
+    if m:
+        pos = np.arange(m)
+        inicio = np.r_[True, claves[1:m] != claves[:m - 1]]
+        dup[:m] = pos - np.maximum.accumulate(np.where(inicio, pos, 0))
+    return orden, claves, dup, m
+
+
+def huellas_filas(df: pd.DataFrame, columnas) -> np.ndarray:
+    """Huella uint64 por fila: huella_celdas (coerción estricta) de cada columna, combinadas en orden."""
+    h = np.zeros(len(df), dtype=np.uint64)
+    for col in columnas:
+        h = combinar_huellas(h, huella_celdas(df[col]))
+    return h
+
+
+def _huella_columna(celdas: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(celdas).tobytes()).hexdigest()[:16]
+
+
+def _escribir_meta(ruta_meta: Path, meta: dict):
+    with escritura_atomica(ruta_meta) as tmp:
+        tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding='utf-8')
+
+
+def bendecir(path=REFERENCIA, id_col: str = 'ID') -> dict:
+    """Convierte el Excel de referencia al artefacto de línea base y devuelve su meta."""
+    from pyarrow import feather
+
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No existe el archivo: {path}")
+    stat = path.stat()
+    sha = hash_archivo(path)
+    df = pd.read_excel(path)
+    if not all(isinstance(c, str) for c in df.columns) or df.columns.duplicated().any():
+        raise CacheNoSoportada('Encabezados no textuales o duplicados')
+    if id_col in df.columns:
+        orden, claves, dup, m = _ordenar(df[id_col])
+        tipo_id = pd.api.types.infer_dtype(df[id_col], skipna=True)
+    else:
+        orden, claves, dup, m = np.arange(len(df)), np.full(len(df), None, dtype=object), np.zeros(len(df)), 0
+        tipo_id = None
+    datos = [c for c in df.columns if c != id_col]
+    ordenado = df.take(orden).reset_index(drop=True)
+
+    guardar, mixtas, huellas = {}, [], {}
+    fila = np.zeros(len(df), dtype=np.uint64)
+    for col in ordenado.columns:
+        serie = ordenado[col]
+        if serie.dtype == object and serie.dropna().map(type).nunique() > 1:
+            guardar[col], guardar[PREFIJO_TIPO + col] = codificar_mixta(serie)
+            mixtas.append(col)
+        else:
+            guardar[col] = serie
+        celdas = huella_celdas(serie)
+        huellas[col] = _huella_columna(celdas)
+        if col in datos:
+            fila = combinar_huellas(fila, celdas)
+    guardar.update({_CLAVE: pd.Series(claves, dtype=object), _DUP: dup.astype(np.int64),
+                    _FILA: orden.astype(np.int64), _HUELLA: fila})
+
+    ruta_arrow, ruta_meta = rutas_base(path)
+    with escritura_atomica(ruta_arrow) as tmp:
+        feather.write_feather(pd.DataFrame(guardar), tmp, compression='uncompressed')
+    meta = {
+        'version': VERSION_BASE, 'origen': str(path), 'sha256': sha, 'mtime_ns': stat.st_mtime_ns,
+        'tamano': stat.st_size, 'filas': len(df), 'columnas': list(df.columns), 'mixtas': mixtas,
+        'id_col': id_col if id_col in df.columns else None, 'tipo_id': tipo_id, 'ids_validos': int(m),
+        'huellas_columnas': huellas,
+    }
+    _escribir_meta(ruta_meta, meta)
+    return meta
+
+
+class LineaBase:
+    """Artefacto bendecido abierto con memory mapping: las columnas se materializan sólo al pedirlas."""
+
+    def __init__(self, ruta_arrow: Path, meta: dict):
+        from pyarrow import feather
+
+        self.ruta = Path(ruta_arrow)
+        self.meta = meta
+        self.columnas = list(meta['columnas'])
+        self._mixtas = set(meta['mixtas'])
+        self._tabla = feather.read_table(self.ruta, memory_map=True)
+        self._fila = self._tabla.column(_FILA).to_numpy()
+
+    def __len__(self) -> int:
+        return self.meta['filas']
+
+    def _filas(self, posiciones, columnas, id_texto: bool = False) -> pd.DataFrame:
+        """Filas del artefacto en `posiciones` (todas si None), devueltas en el orden original del Excel."""
+        if posiciones is None:
+            posiciones = np.arange(len(self))
+        posiciones = posiciones[np.argsort(self._fila[posiciones], kind='stable')]
+        mixtas = [c for c in columnas if c in self._mixtas]
+        tabla = self._tabla.select(list(columnas) + [PREFIJO_TIPO + c for c in mixtas]).take(posiciones)
+        df = tabla.to_pandas()
+        for col in mixtas:
+            df[col] = decodificar_mixta(df[col], df.pop(PREFIJO_TIPO + col).to_numpy())
+        df = df[list(columnas)]
+        id_col = self.meta['id_col']
+        if id_texto and id_col in df.columns:
+            df[id_col] = df[id_col].astype(str)
+        return df
+
+    def leer(self, columnas=None, id_texto: bool = False) -> pd.DataFrame:
+        """La referencia como la daría ingesta.leer_excel (mismo orden de filas), restringida a `columnas`
+        (lista o función tipo usecols). Con id_texto el ID se fuerza a texto, como diferencias.cargar."""
+        return self._filas(None, seleccionar_columnas(self.columnas, columnas), id_texto)
+
+    def _admite_poda(self, df_new: pd.DataFrame, id_col: str, coercion: str, id_texto: bool) -> bool:
+        if coercion != 'estricta' or id_col != self.meta['id_col']:
+            return False
+        if df_new.columns.duplicated().any() or set(df_new.columns) != set(self.columnas):
+            return False
+        tipo_new = pd.api.types.infer_dtype(df_new[id_col], skipna=True)
+        if id_texto:
+            # ambos lados se alinean por el mismo texto que las claves guardadas, sea cual sea el tipo del ID
+            return tipo_new == 'string'
+        return self.meta['tipo_id'] in _TIPOS_ID and tipo_new == self.meta['tipo_id']
+
+    def comparar(self, df_new: pd.DataFrame, id_col: str = 'ID', coercion: str = 'estricta',
+                 recortar: bool = False, id_texto: bool = False) -> ResultadoDiff:
+        """Mismo resultado que diferencias.comparar(referencia, df_new, ...), con la referencia leída con
+        id_texto si se pide (df_new debe venir ya convertido). Los conteos de filas son los de ambos lados
+        completos; filas_comparadas/columnas_comparadas, los de lo que quedó tras descartar los grupos de ID
+        idénticos."""
+        if not self._admite_poda(df_new, id_col, coercion, id_texto):
+            return comparar(self.leer(id_texto=id_texto), df_new, id_col, coercion, recortar)
+
+        n, m = len(self), self.meta['ids_validos']
+        claves_ref = self._tabla.column(_CLAVE).to_numpy(zero_copy_only=False)[:m]
+        dup_ref = self._tabla.column(_DUP).to_numpy()[:m]
+        huella_ref = self._tabla.column(_HUELLA).to_numpy()[:m]
+        orden, claves, dup, m_new = _ordenar(df_new[id_col])
+        claves, dup, orden = claves[:m_new], dup[:m_new], orden[:m_new]
+        huella_new = huellas_filas(df_new, [c for c in self.columnas if c != id_col])[orden]
+
+        # cada fila del nuevo con la de igual (ID, ordinal) en la referencia: ésta ya está ordenada por ID
+        # con sus repetidos contiguos, así que su posición es el inicio del grupo más el ordinal
+        inicio = np.searchsorted(claves_ref, claves) if m else np.zeros(m_new, dtype=np.int64)
+        pos = np.minimum(inicio + dup, max(m - 1, 0))
+        existe = np.zeros(m_new, dtype=bool)
+        par = np.zeros(m_new, dtype=bool)
+        if m:
+            existe = claves_ref[np.minimum(inicio, m - 1)] == claves
+            par = (inicio + dup < m) & (claves_ref[pos] == claves) & (dup_ref[pos] == dup)
+        identica = par & (huella_ref[pos] == huella_new)
+
+        # un grupo de ID se descarta entero (así los ordinales del resto no cambian) si todas sus filas de la
+        # referencia tienen una idéntica en el nuevo y el nuevo no trae más filas con ese ID
+        if m:
+            es_inicio = np.r_[True, claves_ref[1:] != claves_ref[:-1]]
+            arranques = np.flatnonzero(es_inicio)
+            grupo = np.cumsum(es_inicio) - 1
+            iguales = np.zeros(m, dtype=bool)
+            iguales[pos[identica]] = True
+            descartar = np.logical_and.reduceat(iguales, arranques)
+            descartar[grupo[inicio[existe & ~par]]] = False
+            # el texto 'nan' también es el de un ID nulo convertido con id_texto: ese grupo no se toca
+            descartar[claves_ref[arranques] == 'nan'] = False
+            fuera_ref = np.zeros(n, dtype=bool)
+            fuera_ref[:m] = descartar[grupo]
+            fuera_new = np.zeros(len(df_new), dtype=bool)
+            fuera_new[orden[par & descartar[grupo[pos]]]] = True
+        else:
+            fuera_ref, fuera_new = np.zeros(n, dtype=bool), np.zeros(len(df_new), dtype=bool)
+
+        # lo que queda son filas con huella distinta (o de su mismo grupo): el pre-paso por huellas de
+        # diferencias.comparar volvería a hashear ambos lados para descartar casi nada
+        ref_sub = self._filas(np.flatnonzero(~fuera_ref), self.columnas, id_texto)
+        res = comparar(ref_sub, df_new[~fuera_new], id_col, coercion, recortar, huellas=False)
+        return dataclasses.replace(res, filas_ref=n, filas_new=len(df_new))
+
+    def verificar(self) -> list:
+        """Recalcula desde el artefacto las huellas de columnas y filas; devuelve lo que no coincide con lo
+        guardado al bendecir (lista vacía si el artefacto está íntegro)."""
+        id_col = self.meta['id_col']
+        df = self._tabla.to_pandas()
+        for col in self._mixtas:
+            df[col] = decodificar_mixta(df[col], df.pop(PREFIJO_TIPO + col).to_numpy())
+        problemas = []
+        fila = np.zeros(len(df), dtype=np.uint64)
+        for col in self.columnas:
+            celdas = huella_celdas(df[col])
+            if _huella_columna(celdas) != self.meta['huellas_columnas'].get(col):
+                problemas.append(f"columna '{col}'")
+            if col != id_col:
+                fila = combinar_huellas(fila, celdas)
+        distintas = np.count_nonzero(fila != df[_HUELLA].to_numpy())
+        if distintas:
+            problemas.append(f'{distintas} huellas de fila')
+        if not np.array_equal(np.sort(df[_FILA].to_numpy()), np.arange(len(df))):
+            problemas.append('posiciones originales (__fila__)')
+        return problemas
+
+
+def abrir(path=REFERENCIA):
+    """LineaBase bendecida de `path` si existe y corresponde al Excel actual; None si no la hay o quedó
+    desactualizada (quien llama lee el Excel). Si el Excel ya no existe se usa el artefacto tal cual."""
+    path = Path(path)
+    ruta_arrow, ruta_meta = rutas_base(path)
+    if not (ruta_arrow.exists() and ruta_meta.exists()):
+        return None
+    try:
+        import pyarrow  # noqa: F401
+        meta = json.loads(ruta_meta.read_text(encoding='utf-8'))
+    except (ImportError, ValueError):
+        return None
+    if meta.get('version') != VERSION_BASE:
+        print(f"[AVISO] Línea base de {path} con otra versión: se lee el Excel "
+              f"(python linea_base.py bendecir {path})")
+        return None
+    if path.exists():
+        mtime_previo = meta['mtime_ns']
+        vigente, _ = origen_sin_cambios(path, meta)
+        if not vigente:
+            print(f"[AVISO] {path} cambió después de bendecir su línea base: se lee el Excel "
+                  f"(python linea_base.py bendecir {path})")
+            return None
+        if meta['mtime_ns'] != mtime_previo:
+            _escribir_meta(ruta_meta, meta)
+    return LineaBase(ruta_arrow, meta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bendice la salida esperada como línea base de regresión')
+    parser.add_argument('accion', choices=['bendecir', 'verificar'])
+    parser.add_argument('referencia', nargs='?', default=REFERENCIA, help='Excel de referencia (expected)')
+    parser.add_argument('--id-col', default='ID')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.accion == 'bendecir':
+        meta = bendecir(args.referencia, args.id_col)
+        ruta_arrow, _ = rutas_base(args.referencia)
+        print(f"Línea base {ruta_arrow}: {meta['filas']} filas x {len(meta['columnas'])} columnas, "
+              f"ID {meta['tipo_id']} ({time.perf_counter() - t0:.2f}s)")
+        if meta['tipo_id'] not in _TIPOS_ID:
+            print(f"[AVISO] ID de tipo {meta['tipo_id']}: las comparaciones sin ID como texto "
+                  "cargarán la referencia completa")
+        return
+
+    base = abrir(args.referencia)
+    if base is None:
+        raise SystemExit(f"{args.referencia} no tiene una línea base vigente (python linea_base.py bendecir)")
+    problemas = base.verificar()
+    if problemas:
+        raise SystemExit(f"[ERROR] La línea base no coincide con sus huellas: {', '.join(problemas)}")
+    print(f"Línea base íntegra: {len(base)} filas x {len(base.columnas)} columnas "
+          f"({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Ejecución por lotes: varias empresas (encuesta + maestro + EMPRESA por defecto + salida) en paralelo.
+
+El manifiesto es un CSV o JSON con un trabajo por fila:
+
+    encuesta,maestro,empresa,salida,formato
+    funza/input1.xlsx,funza/input2.xlsx,ALCALDIA FUNZA,salidas/funza.xlsx,xlsx
+    chia/input1.xlsx,chia/input2.xlsx,ALCALDIA CHIA,salidas/chia.parquet,
+
+`empresa` y `formato` son opcionales (por defecto la EMPRESA de la especificación y el formato de --formato).
+Las rutas relativas se resuelven desde la carpeta del manifiesto.
+
+El proceso principal sólo lee encabezados: compila un plan por cada combinación distinta de encabezados
+(normalmente una para todas las empresas) y lo entrega a los workers al iniciarlos junto con la especificación
+compilada (--espec), así que ningún worker vuelve a resolver el mapeo ni a compilar la especificación. Cada trabajo lee, cruza, proyecta y escribe en su propio proceso; al final se
+imprime el tiempo y el estado de cada uno y, con --consolidado, una salida única con todas las empresas.
+
+Uso: python lote.py manifiesto.csv --procesos 8 [--espec especificacion.json] [--consolidado salidas/todas.xlsx]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+import proceso
+from especificacion import ESPECIFICACION, Transformacion, cargar_especificacion
+from esquema import aplicar_esquema
+from ingesta import encabezados
+from maestro import COLS_VALORES, cargar_indice, columnas_cruzadas
+from plan_columnas import compilar_plan
+from salida import FORMATOS, escribir_salida, reportar, ruta_para_formato
+
+CAMPOS = ['encuesta', 'maestro', 'empresa', 'salida', 'formato']
+
+# plan compartido por huella y especificación compilada; los llena _iniciar_worker en cada proceso del pool
+_PLANES = {}
+_ESPEC = {}
+
+
+def leer_manifiesto(path, formato_defecto: str = 'xlsx', espec: Transformacion = None) -> list:
+    """Lista de trabajos (dict con CAMPOS) desde un manifiesto .csv o .json. La empresa por defecto es la de
+    `espec` (por defecto, la de especificacion.json)."""
+    path = Path(path)
+    empresa_defecto = (espec or proceso.especificacion_por_defecto()).defectos.get('EMPRESA')
+    if path.suffix.lower() == '.json':
+        filas = json.loads(path.read_text(encoding='utf-8'))
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            filas = list(csv.DictReader(f))
+
+    base = path.parent
+    trabajos = []
+    for i, fila in enumerate(filas, start=1):
+        fila = {k.strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in fila.items() if k}
+        faltantes = [c for c in ('encuesta', 'maestro', 'salida') if not fila.get(c)]
+        if faltantes:
+            raise ValueError(f"Manifiesto {path}, trabajo {i}: faltan los campos {faltantes}")
+        formato = fila.get('formato') or formato_defecto
+        if formato not in FORMATOS:
+            raise ValueError(f"Manifiesto {path}, trabajo {i}: formato desconocido '{formato}' (opciones: {FORMATOS})")
+        trabajos.append({
+            'encuesta': base / fila['encuesta'],
+            'maestro': base / fila['maestro'],
+            'empresa': fila.get('empresa') or empresa_defecto,
+            'salida': ruta_para_formato(base / fila['salida'], formato),
+            'formato': formato,
+        })
+    return trabajos
+
+
+def compilar_planes(trabajos: list, espec: Transformacion = None) -> dict:
+    """Compila (en el proceso principal) un plan por cada juego distinto de encabezados cruzados y anota en
+    cada trabajo la huella del suyo. Sólo se leen encabezados, nunca datos."""
+    espec = espec or proceso.especificacion_por_defecto()
+    planes = {}
+    for trabajo in trabajos:
+        try:
+            usadas = proceso.columnas_usadas(trabajo['encuesta'], espec)
+            columnas = [c for c in encabezados(trabajo['encuesta']) if c in usadas]
+            del_maestro = [c for c in COLS_VALORES if c in set(encabezados(trabajo['maestro']))]
+            plan = compilar_plan(columnas_cruzadas(columnas, del_maestro), espec.mapeo, espec.sin_prefijo)
+        except Exception:
+            trabajo['plan'] = None  # el worker reportará el error al intentar leer los archivos
+            continue
+        planes.setdefault(plan.huella, plan)
+        trabajo['plan'] = plan.huella
+    return planes
+
+
+def _iniciar_worker(planes: dict, espec: Transformacion = None):
+    _PLANES.update(planes)
+    _ESPEC['espec'] = espec
+
+
+def ejecutar_trabajo(trabajo: dict, devolver_salida: bool = False) -> dict:
+    """Procesa un trabajo completo. Nunca lanza: los errores quedan en el resultado para el reporte."""
+    t0 = time.perf_counter()
+    resultado = {'salida': str(trabajo['salida']), 'empresa': trabajo['empresa'], 'filas': 0,
+                 'error': None, 'df_out': None}
+    try:
+        indice = cargar_indice(trabajo['maestro'])
+        df_out = proceso.construir_salida(
+            trabajo['encuesta'], indice, plan=_PLANES.get(trabajo.get('plan')),
+            empresa_defecto=trabajo['empresa'], ruta_cache=None, avisos=False, espec=_ESPEC.get('espec'))
+        Path(trabajo['salida']).parent.mkdir(parents=True, exist_ok=True)
+        escribir_salida(df_out, trabajo['salida'], trabajo['formato'])
+        resultado['filas'] = len(df_out)
+        if devolver_salida:
+            resultado['df_out'] = df_out
+    except Exception as e:
+        resultado['error'] = f'{type(e).__name__}: {e}'
+    resultado['segundos'] = time.perf_counter() - t0
+    return resultado
+
+
+def numero_procesos(pedidos, trabajos: int) -> int:
+    return max(1, min(pedidos or os.cpu_count() or 1, trabajos))
+
+
+def ejecutar_lote(trabajos: list, procesos: int = None, consolidar: bool = False,
+                  espec: Transformacion = None) -> list:
+    """Corre los trabajos en un ProcessPoolExecutor y devuelve los resultados en el orden del manifiesto."""
+    planes = compilar_planes(trabajos, espec)
+    procesos = numero_procesos(procesos, len(trabajos))
+    resultados = [None] * len(trabajos)
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker, initargs=(planes, espec)) as pool:
+        futuros = {pool.submit(ejecutar_trabajo, t, consolidar): i for i, t in enumerate(trabajos)}
+        for futuro in as_completed(futuros):
+            resultados[futuros[futuro]] = futuro.result()
+    return resultados
+
+
+def consolidar_salidas(resultados: list, espec: Transformacion = None) -> pd.DataFrame:
+    """Une las salidas exitosas en el orden del manifiesto con 'Unnamed: 0' renumerado."""
+    espec = espec or proceso.especificacion_por_defecto()
+    partes = [r['df_out'] for r in resultados if r['error'] is None and r['df_out'] is not None]
+    if not partes:
+        return pd.DataFrame(columns=list(espec.columnas))
+    df = pd.concat(partes, ignore_index=True)
+    df['Unnamed: 0'] = pd.Series(range(len(df))).astype(str)
+    return aplicar_esquema(df, espec.esquema)
+
+
+def imprimir_reporte(resultados: list, segundos_total: float, procesos: int):
+    ancho = max([len('salida')] + [len(r['salida']) for r in resultados])
+    print(f"{'salida':<{ancho}} {'empresa':<25} {'filas':>8} {'seg':>8}  estado")
+    for r in resultados:
+        estado = 'OK' if r['error'] is None else f"ERROR {r['error']}"
+        print(f"{r['salida']:<{ancho}} {str(r['empresa'])[:25]:<25} {r['filas']:>8} {r['segundos']:>8.2f}  {estado}")
+    secuencial = sum(r['segundos'] for r in resultados)
+    fallidos = sum(r['error'] is not None for r in resultados)
+    print(f"{len(resultados)} trabajos ({fallidos} fallidos) en {segundos_total:.2f}s con {procesos} procesos; "
+          f"suma secuencial {secuencial:.2f}s (aceleración {secuencial / segundos_total if segundos_total else 0:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ejecuta creadordf.py para varias empresas en paralelo')
+    parser.add_argument('manifiesto', help='CSV o JSON con columnas encuesta, maestro, empresa, salida, formato')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos del pool (por defecto: núcleos)')
+    parser.add_argument('--formato', '--format', choices=FORMATOS, default='xlsx',
+                        help='Formato para los trabajos que no lo indican en el manifiesto')
+    parser.add_argument('--consolidado', metavar='RUTA',
+                        help='Además escribe una salida única con las filas de todas las empresas')
+    parser.add_argument('--espec', metavar='RUTA',
+                        help='Especificación de la salida (JSON o YAML) para todos los trabajos (por defecto '
+                             'especificacion.json); ver especificacion.py')
+    args = parser.parse_args()
+
+    espec = cargar_especificacion(args.espec or ESPECIFICACION)
+    trabajos = leer_manifiesto(args.manifiesto, args.formato, espec)
+    if not trabajos:
+        print('El manifiesto no tiene trabajos.')
+        return
+    procesos = numero_procesos(args.procesos, len(trabajos))
+
+    t0 = time.perf_counter()
+    resultados = ejecutar_lote(trabajos, procesos, consolidar=bool(args.consolidado), espec=espec)
+    imprimir_reporte(resultados, time.perf_counter() - t0, procesos)
+
+    if args.consolidado:
+        df = consolidar_salidas(resultados, espec)
+        reportar(escribir_salida(df, ruta_para_formato(args.consolidado, args.formato), args.formato))
+
+    if any(r['error'] is not None for r in resultados):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Índice del maestro (INPUT2): ID normalizado -> VARIABLE 1/2/3 y EMPRESA.
+
+Las cédulas se normalizan y las áreas se limpian una sola vez, de forma vectorizada; el resultado se
+guarda en disco (.cache/maestro/) y se reutiliza mientras el archivo maestro no cambie. El cruce con la
+encuesta es una búsqueda por hash (pd.Index.get_indexer) en lugar de un merge, con el mismo resultado: si el
+maestro repite un ID, cada participante con ese ID sale una vez por cada fila del maestro (o sólo con la primera
+si se pide deduplicar, --deduplicar-maestro en creadordf.py).
+
+Uso: python maestro.py input2.xlsx   (resumen + IDs duplicados/en conflicto)
+"""
+import hashlib
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from derivados import limpiar_area_serie, normalizar_id_serie
+from ingesta import encabezados, escritura_atomica, hash_archivo, leer_excel, origen_sin_cambios
+
+CACHE_DIR = '.cache/maestro'
+VERSION_INDICE = 2
+COLS_VALORES = ['VARIABLE 1', 'VARIABLE 2', 'VARIABLE 3', 'EMPRESA']
+
+
+def buscar_col_cedula(columnas):
+    return next(
+        (c for c in columnas
+         if str(c).strip().lower().replace('é', 'e') == 'cedula'),
+        None
+    )
+
+
+def columnas_cruzadas(columnas_in, columnas_maestro) -> list:
+    """Encabezados que tendrá la encuesta tras cruzarla con un maestro de esas columnas (regla _MAP de merge)."""
+    columnas_in = list(columnas_in)
+    return columnas_in + [f'{c}_MAP' if c in columnas_in else c for c in columnas_maestro]
+
+
+class IndiceMaestro:
+    """IDs normalizados únicos + arreglos de valores alineados (la primera fila de cada ID). Las filas
+    siguientes de un ID repetido quedan en `repeticiones` (ID + valores, en el orden del maestro) y el cruce las
+    usa como merge: una fila de la encuesta por cada fila del maestro. Con `deduplicar` se cruza sólo con la
+    primera. Los IDs repetidos se listan además en `duplicados` (mismos valores) o `conflictos` (valores
+    distintos), con todas sus filas."""
+
+    def __init__(self, ids, valores: pd.DataFrame, duplicados=None, conflictos=None, meta=None, repeticiones=None,
+                 deduplicar: bool = False):
+        vacio = pd.DataFrame(columns=['ID'] + list(valores.columns))
+        self.ids = pd.Index(ids, dtype=object)
+        self.valores = valores.reset_index(drop=True)
+        self.duplicados = duplicados if duplicados is not None else vacio
+        self.conflictos = conflictos if conflictos is not None else vacio
+        self.repeticiones = repeticiones.reset_index(drop=True) if repeticiones is not None else vacio
+        self.meta = meta or {}
+        self.deduplicar = deduplicar
+        self._expansion = None
+
+    @property
+    def columnas(self) -> list:
+        return list(self.valores.columns)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def desde_dataframe(cls, df_map: pd.DataFrame, col_cedula: str = 'ID') -> 'IndiceMaestro':
+        cols = [c for c in COLS_VALORES if c in df_map.columns]
+        df = df_map[cols].copy()
+        df.insert(0, 'ID', normalizar_id_serie(df_map[col_cedula]).to_numpy())
+        if 'VARIABLE 1' in df.columns:
+            df['VARIABLE 1'] = limpiar_area_serie(df['VARIABLE 1'])
+        df = df[df['ID'].notna()].reset_index(drop=True)
+
+        repetidos = df[df['ID'].duplicated(keep=False)]
+        conflictivos = set()
+        if not repetidos.empty:
+            distintos = repetidos.astype(object).where(repetidos.notna(), None).drop_duplicates()
+            conteo = distintos['ID'].value_counts()
+            conflictivos = set(conteo[conteo > 1].index)
+        duplicados = repetidos[~repetidos['ID'].isin(conflictivos)].reset_index(drop=True)
+        conflictos = repetidos[repetidos['ID'].isin(conflictivos)].reset_index(drop=True)
+
+        primera = ~df['ID'].duplicated(keep='first')
+        unicos = df[primera]
+        return cls(unicos['ID'].to_numpy(), unicos[cols], duplicados, conflictos, repeticiones=df[~primera])
+
+    @classmethod
+    def desde_excel(cls, path) -> 'IndiceMaestro':
+        col_cedula = buscar_col_cedula(encabezados(path))
+        if col_cedula is None:
+            raise KeyError("INPUT2 no tiene la columna 'CEDULA' (o variante).")
+        df_map = leer_excel(path, columnas=[col_cedula] + COLS_VALORES)
+        return cls.desde_dataframe(df_map, col_cedula)
+
+    def buscar(self, id_normalizado):
+        """Valores del maestro para un ID (dict, de su primera fila) o None si no existe."""
+        pos = self.ids.get_indexer([id_normalizado])[0]
+        if pos < 0:
+            return None
+        return self.valores.iloc[pos].to_dict()
+
+    def cruzar(self, df_in: pd.DataFrame, col_id: str = 'ID') -> pd.DataFrame:
+        """Left join de df_in con el maestro por ID (sufijo _MAP si df_in ya tiene la columna, como merge).
+        El ID de la encuesta se normaliza igual que las cédulas del maestro, así que también coincide si viene
+        como número (int64/float) o con puntos y guiones. Si el maestro repite el ID (y no se deduplica) la fila
+        se repite una vez por cada fila del maestro, conservando su etiqueta de índice."""
+        pos = self.ids.get_indexer(normalizar_id_serie(df_in[col_id]).astype(object))
+        tabla = self.valores
+        if not self.deduplicar and len(self.repeticiones):
+            filas, pos, tabla = self._expandir(pos)
+            df_in = df_in.iloc[filas]
+        encontrados = pos >= 0
+        nuevas = {}
+        destinos = columnas_cruzadas(df_in.columns, self.columnas)[len(df_in.columns):]
+        for col, destino in zip(self.columnas, destinos):
+            valores = np.full(len(df_in), np.nan, dtype=object)
+            valores[encontrados] = tabla[col].to_numpy(dtype=object)[pos[encontrados]]
+            nuevas[destino] = valores
+        # todas las columnas de una vez: assign sobre el DataFrame fragmentado que da read_excel avisa por
+        # cada columna (PerformanceWarning)
+        return pd.concat([df_in, pd.DataFrame(nuevas, index=df_in.index, dtype=object)], axis=1)
+
+    def _expandir(self, pos: np.ndarray) -> tuple:
+        """(filas de df_in, posición de cada una en la tabla completa, tabla completa) para el cruce con
+        repeticiones. La tabla completa es `valores` seguida de `repeticiones`; cada fila de df_in con un ID
+        repetido se toma tantas veces como filas tenga su ID, en el orden del maestro."""
+        if self._expansion is None:
+            codigos = self.ids.get_indexer(self.repeticiones['ID'])
+            extra = np.bincount(codigos, minlength=len(self.ids))
+            tabla = pd.concat([self.valores, self.repeticiones[self.columnas]], ignore_index=True)
+            self._expansion = (np.argsort(codigos, kind='stable'), extra, np.cumsum(extra) - extra, tabla)
+        orden, extra, inicio, tabla = self._expansion
+        veces = np.where(pos >= 0, 1 + extra[pos], 1)
+        filas = np.repeat(np.arange(len(pos)), veces)
+        rango = np.arange(len(filas)) - np.repeat(np.cumsum(veces) - veces, veces)  # 0 = primera fila del ID
+        pos = pos[filas]
+        siguiente = orden[np.clip(inicio[pos] + rango - 1, 0, max(len(orden) - 1, 0))]
+        return filas, np.where(rango == 0, pos, len(self.ids) + siguiente), tabla
+
+    # ---------- persistencia ---------- #
+
+    def guardar(self, ruta):
+        with escritura_atomica(ruta) as tmp, open(tmp, 'wb') as f:
+            pickle.dump({
+                'version': VERSION_INDICE, 'meta': self.meta, 'ids': self.ids.to_numpy(),
+                'valores': self.valores, 'duplicados': self.duplicados, 'conflictos': self.conflictos,
+                'repeticiones': self.repeticiones,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def cargar(cls, ruta) -> 'IndiceMaestro':
+        with open(ruta, 'rb') as f:
+            datos = pickle.load(f)
+        if datos.get('version') != VERSION_INDICE:
+            raise ValueError('Versión de índice incompatible')
+        return cls(datos['ids'], datos['valores'], datos['duplicados'], datos['conflictos'], datos['meta'],
+                   datos['repeticiones'])
+
+
+def _ruta_indice(path: Path, cache_dir) -> Path:
+    clave = hashlib.sha256(str(path.resolve()).encode('utf-8')).hexdigest()[:12]
+    return Path(cache_dir) / f'{path.stem}-{clave}.pkl'
+
+
+def cargar_indice(path, cache_dir=CACHE_DIR, deduplicar: bool = False) -> IndiceMaestro:
+    """Índice del maestro desde caché si el archivo no cambió (mtime/hash); si no, se reconstruye y se guarda.
+    Con `deduplicar` el cruce usa sólo la primera fila de cada ID repetido (no cambia lo que se guarda)."""
+    indice = _cargar_indice(Path(path), cache_dir)
+    indice.deduplicar = deduplicar
+    return indice
+
+
+def _cargar_indice(path: Path, cache_dir) -> IndiceMaestro:
+    if not path.exists():
+        raise FileNotFoundError(f"No existe el archivo: {path}")
+    ruta = _ruta_indice(path, cache_dir)
+    if ruta.exists():
+        try:
+            indice = IndiceMaestro.cargar(ruta)
+            mtime_previo = indice.meta.get('mtime_ns')
+            vigente, _ = origen_sin_cambios(path, indice.meta)
+            if vigente:
+                if indice.meta.get('mtime_ns') != mtime_previo:
+                    indice.guardar(ruta)
+                return indice
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError, EOFError):
+            pass  # caché corrupta o incompatible: se reconstruye
+    indice = IndiceMaestro.desde_excel(path)
+    stat = path.stat()
+    indice.meta = {'origen': str(path), 'sha256': hash_archivo(path), 'mtime_ns': stat.st_mtime_ns,
+                   'tamano': stat.st_size}
+    indice.guardar(ruta)
+    return indice
+
+
+def avisar_calidad(indice: IndiceMaestro, max_ids: int = 10):
+    uso = 'se usa la primera fila' if indice.deduplicar else 'el participante se repite por cada fila'
+    if not indice.duplicados.empty:
+        ids = indice.duplicados['ID'].unique().tolist()
+        print(f"[AVISO] {len(ids)} ID(s) repetidos en el maestro con los mismos valores ({uso}): {ids[:max_ids]}")
+    if not indice.conflictos.empty:
+        ids = indice.conflictos['ID'].unique().tolist()
+        print(f"[AVISO] {len(ids)} ID(s) del maestro con valores en conflicto ({uso}): {ids[:max_ids]}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Construye/inspecciona el índice del maestro (INPUT2)')
+    parser.add_argument('archivo', nargs='?', default='input2.xlsx')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    indice = cargar_indice(args.archivo, args.cache_dir)
+    print(f"Maestro {args.archivo}: {len(indice)} IDs únicos, columnas {indice.columnas}")
+    avisar_calidad(indice)
+    if not indice.conflictos.empty:
+        print(indice.conflictos.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""Motor Polars: la proyección de una encuesta completa como una sola consulta perezosa sobre la caché columnar.
+
+El motor pandas (proceso.construir_salida) lee, filtra, cruza y proyecta paso a paso en un solo núcleo. Aquí
+la misma Transformacion (especificacion.py) y el mismo plan de columnas se traducen a un LazyFrame sobre el
+.arrow de ingesta.py:
+
+    - el filtro 'Participación completa' se empuja al escaneo (predicate pushdown) y sólo se leen las
+      columnas que el plan, el filtro y el cruce usan (projection pushdown)
+    - el cruce con el maestro es un left join por el ID normalizado contra el índice del maestro (maestro.py)
+    - renombres, defectos del maestro, constantes, consecutivo y los derivados Generación / Tipo NPS son
+      expresiones; Polars ejecuta la consulta en paralelo (hilos: POLARS_MAX_THREADS)
+
+Después del collect la salida se tipa con el mismo esquema que el motor pandas (Transformacion.tipada), así
+que ambas salidas son idénticas. Se terminan en pandas, con Transformacion.aplicar_paso:
+    - las columnas con tipos mezclados en la caché (texto + códigos de tipo), decodificadas con ingesta
+    - desde el primer paso que no tiene expresión equivalente (defecto o constante que no es texto, derivado
+      sin expresión Polars o con origen que no es texto ni entero, cualquier paso sobre una columna mezclada)
+      todos los pasos siguientes, para conservar su orden
+Si el libro no tiene caché columnar, si el filtro o el cruce caen sobre columnas que no son texto o si el
+maestro trae valores que no son texto, construir_salida devuelve None y proceso.py usa el motor pandas.
+
+Diferencia conocida: un año o una satisfacción escritos con dígitos no ASCII (p.ej. '١٩٨٥') se interpretan
+en pandas (int() los acepta) y quedan vacíos en Polars.
+"""
+from functools import partial
+
+import pandas as pd
+import polars as pl
+
+from derivados import ENTERO_TEXTO, TABLA_GENERACIONES, TABLA_NPS, generacion_serie, tipo_nps_serie
+from ingesta import PREFIJO_TIPO, decodificar_mixta, ruta_columnar
+from instrumentacion import SIN_MEDIR, Medidor
+from maestro import IndiceMaestro, columnas_cruzadas
+from validacion import COLS_CRUCE
+
+ESTADO = 'Estado de la participación'
+COMPLETA = 'Participación completa'
+_CLAVE = '__id__'
+_CRUCE = '__cruce__'
+_VACIA = pl.lit(None, dtype=pl.String)
+
+# último índice del maestro convertido (servicio.py reutiliza el mismo IndiceMaestro entre archivos)
+_MAESTRO = {}
+
+
+def _es_texto(tipo) -> bool:
+    return tipo == pl.String or tipo == pl.Null
+
+
+def _bandas(casos) -> pl.Expr:
+    """Primera etiqueta cuya condición se cumple; vacío si ninguna."""
+    (condicion, etiqueta), *resto = casos
+    expr = pl.when(condicion).then(pl.lit(etiqueta))
+    for condicion, etiqueta in resto:
+        expr = expr.when(condicion).then(pl.lit(etiqueta))
+    return expr.otherwise(_VACIA)
+
+
+def normalizar_id(expr: pl.Expr) -> pl.Expr:
+    """derivados.normalizar_id_serie: sólo dígitos, vacío si no queda ninguno (clave del cruce con el maestro)."""
+    digitos = expr.cast(pl.String).str.replace_all(r'\D', '')
+    return pl.when(digitos != '').then(digitos).otherwise(_VACIA)
+
+
+def generacion(expr: pl.Expr, tipo, tabla=TABLA_GENERACIONES) -> pl.Expr:
+    """derivados.generacion_serie: primer grupo de 4 dígitos -> rango de la tabla."""
+    anios = expr.cast(pl.String).str.extract(r'(\d{4})', 1).cast(pl.Int64, strict=False)
+    return _bandas([(anios.is_between(ini, fin), etiqueta) for ini, fin, etiqueta in tabla])
+
+
+def tipo_nps(expr: pl.Expr, tipo, tabla=TABLA_NPS) -> pl.Expr:
+    """derivados.tipo_nps_serie: int(valor) y banda según la tabla."""
+    if not tipo.is_integer():
+        texto = expr.cast(pl.String)
+        expr = (pl.when(texto.str.contains(ENTERO_TEXTO))
+                .then(texto.str.replace_all('_', '', literal=True).str.strip_chars())
+                .cast(pl.Int64, strict=False))
+    return _bandas([(expr >= minimo, etiqueta) for minimo, etiqueta in tabla])
+
+
+# función de derivados.py -> (expresión Polars equivalente, tabla por defecto)
+EXPRESIONES = {
+    generacion_serie: (generacion, TABLA_GENERACIONES),
+    tipo_nps_serie: (tipo_nps, TABLA_NPS),
+}
+
+
+def _expresion_derivada(funcion):
+    """(constructor, tabla) para la función compilada en la especificación (con su tabla si es un partial)."""
+    base, tabla = funcion, None
+    if isinstance(funcion, partial):
+        base, tabla = funcion.func, funcion.keywords.get('tabla')
+    if base not in EXPRESIONES:
+        return None
+    constructor, defecto = EXPRESIONES[base]
+    return constructor, tabla if tabla is not None else defecto
+
+
+def maestro_polars(indice: IndiceMaestro):
+    """IDs y valores del maestro como DataFrame de texto, o None si algún valor no es texto. Sin deduplicar
+    incluye las repeticiones de cada ID después de su primera fila (el join las toma en ese orden)."""
+    if _MAESTRO.get('indice') is not indice or _MAESTRO.get('deduplicar') != indice.deduplicar:
+        partes = [indice.valores.assign(**{_CLAVE: indice.ids.to_numpy(dtype=object)})]
+        if not indice.deduplicar and len(indice.repeticiones):
+            partes.append(indice.repeticiones.rename(columns={'ID': _CLAVE}))
+        tabla = pd.concat(partes, ignore_index=True)
+        columnas = {c: tabla[c].to_numpy(dtype=object) for c in [_CLAVE, *indice.columnas]}
+        if any(pd.api.types.infer_dtype(v, skipna=True) not in ('string', 'empty') for v in columnas.values()):
+            df = None
+        else:
+            df = pl.DataFrame({c: pl.Series(c, [None if pd.isna(x) else x for x in v], dtype=pl.String)
+                               for c, v in columnas.items()})
+        _MAESTRO.clear()
+        _MAESTRO.update(indice=indice, deduplicar=indice.deduplicar, df=df)
+    return _MAESTRO['df']
+
+
+def _paso_polars(paso: tuple, exprs: dict, tipos: dict, mixtas: dict, objeto: set) -> bool:
+    """Traduce un paso de Transformacion.pasos a una expresión; False si debe hacerse en pandas. `objeto` son
+    las columnas que el motor pandas tiene como object (maestro, defectos, constantes, derivados): al volver a
+    pandas se convierten igual, porque una columna vacía de texto no se tipa como una vacía object."""
+    tipo, col = paso[:2]
+    if tipo == 'copia':
+        src = paso[2]
+        if src in mixtas:
+            mixtas[col] = mixtas[src]
+            exprs.pop(col, None)
+            return True
+        expr, tipo_col, es_objeto = exprs.get(src, _VACIA), tipos.get(src, pl.String), src in objeto or src not in exprs
+    elif tipo == 'defecto':
+        if col in mixtas or not _es_texto(tipos.get(col, pl.String)) or not isinstance(paso[2], str):
+            return False
+        expr, tipo_col = exprs.get(col, _VACIA).fill_null(pl.lit(paso[2])), pl.String
+        es_objeto = col in objeto or col not in exprs
+    elif tipo == 'constante':
+        if paso[2] is None:
+            exprs.pop(col, None)
+            mixtas.pop(col, None)
+            return True
+        if not isinstance(paso[2], str):
+            return False
+        expr, tipo_col, es_objeto = pl.lit(paso[2]), pl.String, True
+    elif tipo == 'consecutivo':
+        expr, tipo_col, es_objeto = pl.int_range(paso[2], paso[2] + pl.len()).cast(pl.String), pl.String, False
+    else:
+        desde, expresion = paso[3], _expresion_derivada(paso[2])
+        origen = tipos.get(desde, pl.String)
+        if expresion is None or desde in mixtas or not (_es_texto(origen) or origen.is_integer()):
+            return False
+        constructor, tabla = expresion
+        expr, tipo_col, es_objeto = constructor(exprs.get(desde, _VACIA), origen, tabla), pl.String, True
+    exprs[col], tipos[col] = expr, tipo_col
+    mixtas.pop(col, None)
+    if es_objeto:
+        objeto.add(col)
+    else:
+        objeto.discard(col)
+    return True
+
+
+def construir_salida(input1, indice: IndiceMaestro, espec, usadas: set, ruta_cache=None,
+                     empresa_defecto: str = None, medidor: Medidor = SIN_MEDIR):
+    """(df_cruce, df_out, plan) de una encuesta completa, o None si debe ir por el motor pandas. df_cruce trae
+    sólo ID y VARIABLE 1/2/3 de la encuesta cruzada (lo que revisa validacion.Validador)."""
+    with medidor.etapa('lectura'):
+        columnar = ruta_columnar(input1)
+    if columnar is None:
+        return None
+    ruta_arrow, meta = columnar
+    entrada = [c for c in meta['columnas'] if c in usadas]
+    mixtas_in = set(meta['mixtas']) & set(entrada)
+    consulta = pl.scan_ipc(ruta_arrow)
+    esquema = consulta.collect_schema()
+    tipos = {c: esquema[c] for c in entrada}
+    maestro = maestro_polars(indice)
+    if (maestro is None or ESTADO not in tipos or 'ID' not in tipos or mixtas_in & {ESTADO, 'ID'}
+            or not _es_texto(tipos[ESTADO]) or not (_es_texto(tipos['ID']) or tipos['ID'].is_integer())):
+        return None
+
+    columnas = columnas_cruzadas(entrada, indice.columnas)
+    with medidor.etapa('plan'):
+        plan = espec.resolver(columnas, ruta_cache)
+
+    consulta = consulta.filter(pl.col(ESTADO) == COMPLETA)
+    destinos = columnas[len(entrada):]
+    unir = maestro.rename(dict(zip(indice.columnas, destinos))).lazy()
+    consulta = (consulta.with_columns(normalizar_id(pl.col('ID')).alias(_CLAVE))
+                .join(unir, on=_CLAVE, how='left', maintain_order='left_right').drop(_CLAVE))
+    tipos.update({d: pl.String for d in destinos})
+
+    # Mismo orden que Transformacion.aplicar: columnas del plan y del maestro, luego las reglas fijas
+    exprs, mixtas, objeto = {}, {}, set()
+    tomadas = list(plan.destinos.items()) + [(col, col) for col, _ in espec.maestro if col in columnas]
+    for dst, src in tomadas:
+        if src in mixtas_in:
+            mixtas[dst] = src
+            exprs.pop(dst, None)
+        else:
+            exprs[dst] = pl.col(src)
+            mixtas.pop(dst, None)
+        if src in destinos:
+            objeto.add(dst)
+        else:
+            objeto.discard(dst)
+    tipos_out = {dst: tipos[src] for dst, src in tomadas}
+    pasos = espec.pasos(0, {'EMPRESA': empresa_defecto} if empresa_defecto is not None else None)
+    diferidos = []
+    for i, paso in enumerate(pasos):
+        if not _paso_polars(paso, exprs, tipos_out, mixtas, objeto):
+            diferidos = pasos[i:]
+            break
+
+    seleccion = [expr.alias(col) for col, expr in exprs.items()]
+    for col, src in mixtas.items():
+        seleccion += [pl.col(src).alias(col), pl.col(PREFIJO_TIPO + src).alias(PREFIJO_TIPO + col)]
+    cruce = [c for c in ['ID', *COLS_CRUCE] if c in columnas]
+    seleccion += [pl.col(c).alias(_CRUCE + c) for c in cruce]
+    with medidor.etapa('consulta') as etapa:
+        df = consulta.select(seleccion).collect()
+        etapa.filas_salida = df.height
+
+    with medidor.etapa('proyeccion', df.height) as etapa:
+        pdf = df.to_pandas()
+        crudos = {col: pdf[col].astype(object) if col in objeto else pdf[col] for col in exprs}
+        for col in mixtas:
+            crudos[col] = decodificar_mixta(pdf[col], pdf[PREFIJO_TIPO + col].to_numpy())
+        for paso in diferidos:
+            espec.aplicar_paso(crudos, paso, pdf.index)
+        df_out = espec.tipada(crudos, pdf.index)
+        etapa.filas_salida = len(df_out)
+    df_cruce = pdf[[_CRUCE + c for c in cruce]].rename(columns=lambda c: c[len(_CRUCE):])
+    return df_cruce, df_out, plan
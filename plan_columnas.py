@@ -0,0 +1,160 @@
+"""Plan de columnas: resolución única de los encabezados de entrada contra MAPPING_DIRECTO.
+
+El plan depende sólo de la lista de encabezados (y del mapeo), así que se compila una vez por archivo,
+se puede inspeccionar/serializar a JSON y se reutiliza desde caché mientras la huella no cambie.
+
+Uso: python plan_columnas.py input1.xlsx   (imprime el plan resuelto)
+"""
+import bisect
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+VERSION_PLAN = 1
+
+
+def huella_encabezados(columnas_in, mapping: dict, sin_prefijo) -> str:
+    """Hash estable de los encabezados + mapeo + exclusiones; cambia si cualquiera de ellos cambia."""
+    contenido = json.dumps(
+        [[str(c) for c in columnas_in], [[k, v] for k, v in mapping.items()], sorted(sin_prefijo)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+@dataclass(frozen=True)
+class PlanColumnas:
+    huella: str
+    # (destino, encabezado origen, posición del encabezado en la entrada)
+    asignaciones: tuple
+    # fuente -> encabezados que coinciden por prefijo cuando hay más de uno (se usa el primero)
+    ambiguos: dict = field(default_factory=dict)
+    # fuentes del mapeo sin ningún encabezado que coincida
+    sin_resolver: tuple = ()
+
+    @property
+    def destinos(self) -> dict:
+        """dict destino -> encabezado origen."""
+        return {dst: src for dst, src, _ in self.asignaciones}
+
+    def a_dict(self) -> dict:
+        return {
+            'version': VERSION_PLAN,
+            'huella': self.huella,
+            'asignaciones': [[dst, str(src), pos] for dst, src, pos in self.asignaciones],
+            'ambiguos': {k: [str(c) for c in v] for k, v in self.ambiguos.items()},
+            'sin_resolver': list(self.sin_resolver),
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: dict, columnas_in) -> 'PlanColumnas':
+        """Reconstruye el plan; los encabezados se recuperan por posición para conservar su tipo original."""
+        columnas_in = list(columnas_in)
+        return cls(
+            huella=datos['huella'],
+            asignaciones=tuple((dst, columnas_in[pos], pos) for dst, _, pos in datos['asignaciones']),
+            ambiguos={k: tuple(v) for k, v in datos['ambiguos'].items()},
+            sin_resolver=tuple(datos['sin_resolver']),
+        )
+
+
+class IndicePrefijos:
+    """Encabezados ordenados como texto; las coincidencias de un prefijo son un rango contiguo (bisect)."""
+
+    def __init__(self, columnas_in):
+        self._ordenados = sorted((str(c), pos) for pos, c in enumerate(columnas_in))
+        self._claves = [k for k, _ in self._ordenados]
+
+    def buscar(self, prefijo: str) -> list:
+        """Posiciones de los encabezados que empiezan por prefijo, en el orden original de la entrada."""
+        ini = bisect.bisect_left(self._claves, prefijo)
+        fin = ini
+        while fin < len(self._claves) and self._claves[fin].startswith(prefijo):
+            fin += 1
+        return sorted(pos for _, pos in self._ordenados[ini:fin])
+
+
+def compilar_plan(columnas_in, mapping: dict, sin_prefijo=()) -> PlanColumnas:
+    """Resuelve cada fuente: coincidencia exacta o, salvo las de sin_prefijo, el primer encabezado con ese prefijo.
+    Si varias fuentes llegan al mismo destino gana la última resuelta (mismo orden que MAPPING_DIRECTO)."""
+    columnas_in = list(columnas_in)
+    posicion_exacta = {}
+    for pos, c in enumerate(columnas_in):
+        posicion_exacta.setdefault(c, pos)
+    indice = IndicePrefijos(columnas_in)
+
+    resueltos = {}
+    ambiguos = {}
+    sin_resolver = []
+    for col_src, col_dst in mapping.items():
+        pos = posicion_exacta.get(col_src)
+        if pos is None and col_src not in sin_prefijo:
+            candidatos = indice.buscar(col_src)
+            if len(candidatos) > 1:
+                ambiguos[col_src] = tuple(columnas_in[p] for p in candidatos)
+            pos = candidatos[0] if candidatos else None
+        if pos is None:
+            sin_resolver.append(col_src)
+            continue
+        if col_dst is not None:
+            resueltos[col_dst] = (columnas_in[pos], pos)
+
+    return PlanColumnas(
+        huella=huella_encabezados(columnas_in, mapping, sin_prefijo),
+        asignaciones=tuple((dst, src, pos) for dst, (src, pos) in resueltos.items()),
+        ambiguos=ambiguos,
+        sin_resolver=tuple(sin_resolver),
+    )
+
+
+def cargar_o_compilar(columnas_in, mapping: dict, sin_prefijo=(), ruta_cache=None) -> PlanColumnas:
+    """Reutiliza el plan guardado en ruta_cache si su huella coincide; si no, lo compila y lo guarda."""
+    columnas_in = list(columnas_in)
+    huella = huella_encabezados(columnas_in, mapping, sin_prefijo)
+    if ruta_cache is not None:
+        ruta_cache = Path(ruta_cache)
+        if ruta_cache.exists():
+            try:
+                datos = json.loads(ruta_cache.read_text(encoding='utf-8'))
+                if datos.get('version') == VERSION_PLAN and datos.get('huella') == huella:
+                    return PlanColumnas.desde_dict(datos, columnas_in)
+            except (ValueError, KeyError, IndexError):
+                pass  # caché corrupta: se recompila
+    plan = compilar_plan(columnas_in, mapping, sin_prefijo)
+    if ruta_cache is not None:
+        ruta_cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ruta_cache.with_name(f'{ruta_cache.name}.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(plan.a_dict(), ensure_ascii=False, indent=1), encoding='utf-8')
+        os.replace(tmp, ruta_cache)
+    return plan
+
+
+def main():
+    import argparse
+    import openpyxl
+    from proceso import MAPPING_DIRECTO, SIN_PREFIJO
+
+    parser = argparse.ArgumentParser(description='Muestra el plan de columnas resuelto para un archivo de encuesta')
+    parser.add_argument('archivo', help='Excel de encuesta (sólo se lee la fila de encabezados)')
+    parser.add_argument('--json', action='store_true', help='Imprimir el plan serializado en JSON')
+    args = parser.parse_args()
+
+    wb = openpyxl.load_workbook(args.archivo, read_only=True)
+    encabezados = next(wb.active.iter_rows(max_row=1, values_only=True))
+    wb.close()
+    plan = compilar_plan(encabezados, MAPPING_DIRECTO, SIN_PREFIJO)
+    if args.json:
+        print(json.dumps(plan.a_dict(), ensure_ascii=False, indent=1))
+        return
+    for dst, src, pos in plan.asignaciones:
+        print(f"{dst:<45} <- [{pos}] {str(src)[:70]}")
+    for src, candidatos in plan.ambiguos.items():
+        print(f"[AVISO] Prefijo ambiguo '{src}': {len(candidatos)} encabezados coinciden, se usa el primero")
+    if plan.sin_resolver:
+        print(f"Fuentes sin resolver ({len(plan.sin_resolver)}): {list(plan.sin_resolver)}")
+
+
+if __name__ == '__main__':
+    main()
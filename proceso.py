@@ -0,0 +1,262 @@
+"""Proceso de creadordf.py como biblioteca: lectura, filtro, cruce con el maestro, proyección, validación,
+cubo y escritura de la salida. Importarlo no lee ni escribe archivos (la especificación por defecto se
+compila la primera vez que se usa), así que sirve en procesos de larga duración y en pruebas.
+
+    from creadordf import build_output
+    resultado = build_output('input1.xlsx', 'input2.xlsx', 'output.xlsx')   # o output=None: sólo en memoria
+    resultado['df_out'], resultado['filas'], resultado['validador'].hallazgos()
+
+creadordf.py es sólo la línea de comandos; los nombres históricos (proyectar, ESPEC, MAPPING_DIRECTO...)
+se siguen pudiendo importar desde creadordf.
+"""
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bloques import leer_bloques
+from cubo import Cubo, ruta_cubo
+from especificacion import ESPECIFICACION, Transformacion, cargar_especificacion
+from formatos import MOTORES
+from ingesta import encabezados, leer_excel
+from instrumentacion import SIN_MEDIR, Medidor
+from maestro import IndiceMaestro, avisar_calidad, cargar_indice
+from plan_columnas import compilar_plan, huella_encabezados
+from salida import abrir_escritor, escribir_salida, metricas_escritura, ruta_para_formato
+from validacion import Validador
+
+# ================= Especificación de la salida ================= #
+# Columnas, mapeo de la encuesta y reglas fijas (maestro, constantes, derivados, copias, tipos) viven en
+# especificacion.json; ver especificacion.py. Estos nombres quedan como atajos de la especificación por defecto,
+# que se compila la primera vez que se pide alguno.
+_ATAJOS = {
+    'ESPEC': lambda espec: espec,
+    'OUTPUT_COLUMNS': lambda espec: list(espec.columnas),
+    'MAPPING_DIRECTO': lambda espec: espec.mapeo,
+    'SIN_PREFIJO': lambda espec: espec.sin_prefijo,
+    'EMPRESA_DEFECTO': lambda espec: espec.defectos.get('EMPRESA'),
+    'ESQUEMA_SALIDA': lambda espec: espec.esquema,
+}
+_POR_DEFECTO = {}
+
+def especificacion_por_defecto() -> Transformacion:
+    if 'espec' not in _POR_DEFECTO:
+        _POR_DEFECTO['espec'] = cargar_especificacion(ESPECIFICACION, dir_cache=None)
+    return _POR_DEFECTO['espec']
+
+def __getattr__(nombre):
+    if nombre in _ATAJOS:
+        return _ATAJOS[nombre](especificacion_por_defecto())
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+# ================= Proyección por columnas ================= #
+
+def resolver_columnas(columnas_in, ruta_cache=None, espec: Transformacion = None):
+    """Compila (o recupera de caché) el plan de columnas para estos encabezados de entrada."""
+    return (espec or especificacion_por_defecto()).resolver(columnas_in, ruta_cache)
+
+def proyectar(df_in: pd.DataFrame, plan=None, inicio: int = 0, empresa_defecto: str = None,
+              espec: Transformacion = None) -> pd.DataFrame:
+    """Construye df_out columna a columna a partir de df_in (ya filtrado y unido al maestro).
+    `inicio` es el consecutivo de 'Unnamed: 0' para la primera fila (procesamiento por bloques);
+    `empresa_defecto` se usa cuando el maestro no trae EMPRESA para el participante (por defecto, el de la
+    especificación)."""
+    espec = espec or especificacion_por_defecto()
+    if plan is None:
+        plan = espec.resolver(df_in.columns)
+    defectos = {'EMPRESA': empresa_defecto} if empresa_defecto is not None else None
+    return espec.aplicar(df_in, plan, inicio, defectos)
+
+# ================= Carga de datos ================= #
+PLAN_CACHE = '.cache/plan_columnas.json'
+
+COLS_MAESTRO = ['ID', 'VARIABLE 1', 'VARIABLE 2', 'VARIABLE 3', 'EMPRESA']
+
+def columnas_usadas(path, espec: Transformacion = None) -> set:
+    """Columnas de la encuesta que el plan, el filtro de completitud o el cruce con el maestro realmente usan."""
+    espec = espec or especificacion_por_defecto()
+    plan_previo = compilar_plan(encabezados(path), espec.mapeo, espec.sin_prefijo)
+    return set(plan_previo.destinos.values()) | {'Estado de la participación'} | set(COLS_MAESTRO)
+
+def filtrar_completas(df_in: pd.DataFrame) -> pd.DataFrame:
+    return df_in[df_in.get('Estado de la participación') == 'Participación completa']
+
+def filtrar_y_cruzar(df_in: pd.DataFrame, indice: IndiceMaestro) -> pd.DataFrame:
+    return indice.cruzar(filtrar_completas(df_in), 'ID')
+
+def avisar_ambiguos(plan):
+    for col_src, candidatos in plan.ambiguos.items():
+        print(f"[AVISO] Prefijo ambiguo '{col_src}': {len(candidatos)} encabezados coinciden, se usa '{candidatos[0]}'.")
+
+def construir_salida(input1, indice: IndiceMaestro, plan=None, empresa_defecto: str = None,
+                     ruta_cache=PLAN_CACHE, avisos: bool = True, medidor: Medidor = SIN_MEDIR,
+                     espec: Transformacion = None, validador: Validador = None, motor: str = 'pandas') -> pd.DataFrame:
+    """Lectura + filtro + cruce + proyección de una encuesta completa. Si se pasa un `plan` ya compilado
+    (p.ej. desde lote.py) se usa tal cual mientras su huella coincida con los encabezados leídos.
+    Cada paso se registra como etapa en `medidor`; `espec` es la especificación compilada (por defecto la de especificacion.json).
+    Los chequeos de calidad se acumulan en `validador` (con `avisos` se imprimen al final).
+    Con motor='polars' todo se hace en una consulta de motor_polars.py (si la encuesta no se puede, con pandas)."""
+    espec = espec or especificacion_por_defecto()
+    validador = validador or Validador(espec)
+    resultado = None
+    if motor == 'polars':
+        resultado = motor_polars().construir_salida(input1, indice, espec, columnas_usadas(input1, espec),
+                                                    ruta_cache, empresa_defecto, medidor)
+    if resultado is None:
+        resultado = _construir_pandas(input1, indice, plan, empresa_defecto, ruta_cache, medidor, espec)
+    df_in, df_out, plan = resultado
+    if avisos:
+        avisar_ambiguos(plan)
+    with medidor.etapa('validacion', len(df_out)):
+        validador.validar(df_in, df_out, plan, encabezados(input1))
+    if avisos:
+        validador.imprimir()
+    return df_out
+
+def _construir_pandas(input1, indice: IndiceMaestro, plan, empresa_defecto, ruta_cache, medidor: Medidor,
+                      espec: Transformacion) -> tuple:
+    # Sólo se cargan las columnas que el plan (o el cruce con el maestro) realmente usa
+    with medidor.etapa('lectura') as etapa:
+        df_in = leer_excel(input1, columnas=columnas_usadas(input1, espec))
+        etapa.filas_salida = len(df_in)
+    with medidor.etapa('filtro', len(df_in)) as etapa:
+        df_in = filtrar_completas(df_in)
+        etapa.filas_salida = len(df_in)
+    with medidor.etapa('cruce', len(df_in)) as etapa:
+        df_in = indice.cruzar(df_in, 'ID')
+        etapa.filas_salida = len(df_in)
+
+    with medidor.etapa('plan'):
+        if plan is None or plan.huella != huella_encabezados(df_in.columns, espec.mapeo, espec.sin_prefijo):
+            plan = espec.resolver(df_in.columns, ruta_cache)
+
+    with medidor.etapa('proyeccion', len(df_in)) as etapa:
+        df_out = proyectar(df_in, plan, empresa_defecto=empresa_defecto, espec=espec)
+        etapa.filas_salida = len(df_out)
+    return df_in, df_out, plan
+
+def motor_polars():
+    try:
+        import motor_polars
+    except ImportError as e:
+        raise ImportError(f'El motor polars requiere polars (pip install polars): {e}') from None
+    return motor_polars
+
+def procesar_por_bloques(input1, indice: IndiceMaestro, output, tam_bloque: int, formato: str = 'xlsx',
+                         espec: Transformacion = None, validador: Validador = None, cubo: Cubo = None,
+                         avisos: bool = True) -> int:
+    """Modo streaming: lee la encuesta por bloques, filtra, cruza, proyecta, valida y escribe cada bloque
+    (y lo suma a `cubo` si se pasa). La memoria queda acotada a un bloque más el maestro. Devuelve el número
+    de filas escritas. Con `avisos` se imprimen los prefijos ambiguos y los hallazgos de calidad."""
+    espec = espec or especificacion_por_defecto()
+    validador = validador or Validador(espec)
+    escritas = 0
+    plan = None
+    columnas_in = encabezados(input1)
+    with abrir_escritor(formato, output, espec.columnas, streaming=True, esquema=espec.esquema) as escritor:
+        for bloque in leer_bloques(input1, columnas_usadas(input1, espec), tam_bloque):
+            bloque = filtrar_y_cruzar(bloque, indice)
+            if plan is None:
+                plan = espec.resolver(bloque.columns, PLAN_CACHE)
+                if avisos:
+                    avisar_ambiguos(plan)
+            df_out = proyectar(bloque, plan, inicio=escritas, espec=espec)
+            validador.validar(bloque, df_out, plan, columnas_in)
+            if cubo is not None:
+                cubo.sumar(Cubo.desde_salida(df_out, cubo.definicion))
+            escritor.escribir(df_out)
+            escritas += len(df_out)
+    if avisos:
+        validador.imprimir()
+    return escritas
+
+def build_output(survey, master, output=None, formato: str = 'xlsx', bloques: int = 0, incremental: bool = False,
+                 espec=None, validacion=None, cubo=None, medidor: Medidor = SIN_MEDIR, avisos: bool = True,
+                 motor: str = 'pandas', deduplicar_maestro: bool = False) -> dict:
+    """Genera la salida de la encuesta `survey` (INPUT1) cruzada con el maestro `master` (ruta de INPUT2 o un
+    IndiceMaestro ya cargado) y devuelve el resumen de la corrida:
+
+        modo        'completo', 'bloques' (bloques > 0) o 'incremental'
+        salida      ruta escrita (con la extensión de `formato`) o None
+        filas, columnas, escritura (métricas de salida.metricas_escritura o None)
+        df_out      la salida en memoria (sólo en modo completo)
+        incremental resumen de cambios del modo incremental
+        validador   hallazgos de calidad (validacion.Validador), guardados en `validacion` si se da una ruta
+        cubo        cubo de resultados si se pidió (`cubo`=True o ruta del .cubo.parquet), ruta_cubo su archivo
+
+    Con output=None no se escribe nada (sólo modo completo). `espec` es una Transformacion ya compilada o la
+    ruta de la especificación (por defecto especificacion.json). `motor` es 'pandas' o 'polars' (motor_polars.py,
+    sólo en modo completo). Cada paso se registra en `medidor`. Como el merge histórico, un participante cuyo ID
+    se repite en el maestro sale una vez por cada fila del maestro; con `deduplicar_maestro` se cruza sólo con la
+    primera (si `master` ya es un IndiceMaestro se respeta su propio `deduplicar`)."""
+    if not Path(survey).exists():
+        raise FileNotFoundError(f"No se encuentra {survey}")
+    if not isinstance(master, IndiceMaestro) and not Path(master).exists():
+        raise FileNotFoundError(f"No se encuentra {master}")
+    modo = 'incremental' if incremental else 'bloques' if bloques > 0 else 'completo'
+    if output is None and modo != 'completo':
+        raise ValueError(f"El modo {modo} necesita una ruta de salida")
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido '{motor}' (opciones: {MOTORES})")
+    if motor != 'pandas' and modo != 'completo':
+        raise ValueError(f"El motor {motor} sólo procesa el modo completo, no el modo {modo}")
+    if output is not None and not Path(output).resolve().parent.is_dir():
+        raise FileNotFoundError(f"No existe la carpeta de la salida {Path(output).parent}")
+    output = ruta_para_formato(output, formato) if output is not None else None
+
+    if not isinstance(espec, Transformacion):
+        with medidor.etapa('especificacion'):
+            espec = cargar_especificacion(espec or ESPECIFICACION)
+    if cubo and espec.cubo is None:
+        raise ValueError("La especificación no define la sección 'cubo'")
+    validador = Validador(espec)
+    acumulado = Cubo(espec.cubo) if cubo else None
+
+    if isinstance(master, IndiceMaestro):
+        indice = master
+    else:
+        with medidor.etapa('maestro') as etapa:
+            indice = cargar_indice(master, deduplicar=deduplicar_maestro)
+            etapa.filas_salida = len(indice)
+        if avisos:
+            avisar_calidad(indice)
+
+    resultado = {'modo': modo, 'salida': output, 'formato': formato, 'columnas': len(espec.columnas),
+                 'escritura': None, 'df_out': None, 'incremental': None, 'validador': validador,
+                 'cubo': acumulado, 'ruta_cubo': None}
+    if modo == 'incremental':
+        from incremental import procesar_incremental
+        with medidor.etapa('incremental') as etapa:
+            resumen = procesar_incremental(survey, indice, output, formato, espec, validador, acumulado,
+                                           avisos=avisos)
+            etapa.filas_salida = resumen['filas']
+        resultado.update(filas=resumen['filas'], escritura=resumen['escritura'], incremental=resumen)
+    elif modo == 'bloques':
+        t0 = time.perf_counter()
+        with medidor.etapa('bloques') as etapa:
+            filas = procesar_por_bloques(survey, indice, output, bloques, formato, espec, validador, acumulado,
+                                         avisos=avisos)
+            etapa.filas_salida = filas
+        # en streaming la escritura se intercala con la lectura: el throughput es del proceso completo
+        resultado.update(filas=filas, escritura=metricas_escritura(formato, output, filas, time.perf_counter() - t0))
+    else:
+        df_out = construir_salida(survey, indice, medidor=medidor, espec=espec, validador=validador, avisos=avisos,
+                                  motor=motor)
+        if acumulado is not None:
+            with medidor.etapa('cubo', len(df_out)):
+                acumulado.sumar(Cubo.desde_salida(df_out, acumulado.definicion))
+        if output is not None:
+            with medidor.etapa('escritura', len(df_out)) as etapa:
+                resultado['escritura'] = escribir_salida(df_out, output, formato)
+                etapa.filas_salida = len(df_out)
+        resultado.update(filas=len(df_out), columnas=len(df_out.columns), df_out=df_out)
+
+    if validacion:
+        validador.guardar(validacion)
+    if acumulado is not None and (output is not None or cubo is not True):
+        ruta = ruta_cubo(output) if cubo is True else Path(cubo)
+        with medidor.etapa('cubo_escritura') as etapa:
+            acumulado.guardar(ruta)
+            etapa.filas_salida = len(acumulado)
+        resultado['ruta_cubo'] = ruta
+    return resultado
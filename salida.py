@@ -0,0 +1,281 @@
+"""Etapa de salida intercambiable: Excel (openpyxl o xlsxwriter), Parquet, Feather y CSV.
+
+Todos los escritores comparten la misma interfaz (escribir(df) por bloques + cerrar()), así que sirven
+tanto para el modo normal como para el modo streaming de creadordf.py. Cada escritura reporta su
+rendimiento en filas/s para poder comparar backends.
+"""
+import math
+import time
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+from formatos import EXTENSIONES, FORMATOS, ruta_para_formato  # noqa: F401 (se siguen importando desde salida)
+
+
+def _celda(valor):
+    if valor is None or valor is pd.NA or valor is pd.NaT:
+        return None
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+def _filas(df: pd.DataFrame, columnas):
+    for fila in df[columnas].itertuples(index=False, name=None):
+        yield [_celda(v) for v in fila]
+
+
+class Escritor:
+    """Interfaz común. Uso: with abrir_escritor(...) as e: e.escribir(df_bloque)."""
+
+    def __init__(self, path, columnas):
+        self.path = Path(path)
+        self.columnas = list(columnas)
+        self.filas = 0
+
+    def escribir(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, *_):
+        if tipo is None:
+            self.cerrar()
+
+
+class EscritorExcelBloques(Escritor):
+    """openpyxl en modo write-only: memoria constante, mismo estilo de encabezado que to_excel."""
+
+    _LADO = Side(style='thin')
+    _FUENTE = Font(bold=True)
+    _BORDE = Border(left=_LADO, right=_LADO, top=_LADO, bottom=_LADO)
+    _ALINEACION = Alignment(horizontal='center', vertical='top')
+
+    def __init__(self, path, columnas, hoja: str = 'Sheet1'):
+        super().__init__(path, columnas)
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(hoja)
+        self._ws.append([self._encabezado(c) for c in self.columnas])
+
+    def _encabezado(self, nombre):
+        celda = WriteOnlyCell(self._ws, value=nombre)
+        celda.font = self._FUENTE
+        celda.border = self._BORDE
+        celda.alignment = self._ALINEACION
+        return celda
+
+    def escribir(self, df: pd.DataFrame):
+        for fila in _filas(df, self.columnas):
+            self._ws.append(fila)
+        self.filas += len(df)
+
+    def cerrar(self):
+        self._wb.save(self.path)
+
+
+class EscritorXlsxWriter(Escritor):
+    """xlsxwriter con constant_memory: escribe cada fila al disco y no la retiene."""
+
+    def __init__(self, path, columnas, hoja: str = 'Sheet1'):
+        import xlsxwriter
+
+        super().__init__(path, columnas)
+        self._wb = xlsxwriter.Workbook(str(self.path), {
+            'constant_memory': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        })
+        self._ws = self._wb.add_worksheet(hoja)
+        formato = self._wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self._ws.write_row(0, 0, self.columnas, formato)
+
+    def escribir(self, df: pd.DataFrame):
+        for fila in _filas(df, self.columnas):
+            self.filas += 1
+            self._ws.write_row(self.filas, 0, fila)
+
+    def cerrar(self):
+        self._wb.close()
+
+
+def _mixto(valores) -> bool:
+    return pd.api.types.infer_dtype(valores, skipna=True) not in (
+        'string', 'empty', 'integer', 'floating', 'boolean', 'datetime', 'date')
+
+
+def _como_texto(serie: pd.Series) -> pd.Series:
+    return serie.map(lambda v: None if _celda(v) is None else str(v)).astype(object)
+
+
+def _tabla_arrow(df: pd.DataFrame):
+    """Convierte a Arrow; las columnas object con tipos mezclados (p.ej. 2 y '3 o más') se guardan como texto.
+    Las categóricas (esquema de la salida) quedan como diccionario; si sus categorías mezclan tipos o la
+    columna no tiene valores, de texto (una categórica vacía de pandas tiene categorías float64)."""
+    import pyarrow as pa
+
+    df = df.copy()
+    vacias = []
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            if not serie.notna().any():
+                vacias.append(col)
+            elif _mixto(serie.cat.categories):
+                df[col] = _como_texto(serie.astype(object)).astype('category')
+        elif serie.dtype == object and _mixto(serie):
+            df[col] = _como_texto(serie)
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    for col in vacias:
+        i = tabla.schema.get_field_index(col)
+        tabla = tabla.set_column(i, col, _columna_arrow(df[col], _diccionario_texto(pa.int8())))
+    return tabla
+
+
+def _diccionario_texto(indices):
+    import pyarrow as pa
+    return pa.dictionary(indices, pa.string())
+
+
+def _tipo_arrow(candidatos, diccionarios: bool):
+    """Tipo Arrow del primer tipo candidato de una columna del esquema de la salida (esquema.py); texto si la
+    columna no declara tipos (y para las categóricas si no se admiten `diccionarios`)."""
+    import pyarrow as pa
+
+    tipo = candidatos[0] if candidatos else None
+    if tipo in ('Int8', 'Int16', 'Int32', 'Int64'):
+        return pa.from_numpy_dtype(tipo.lower())
+    if tipo == 'category' and diccionarios:
+        return _diccionario_texto(pa.int32())
+    return pa.string()
+
+
+def esquema_arrow(columnas, esquema: dict, diccionarios: bool = True):
+    """Esquema Arrow fijo para escribir la salida por bloques, desde los tipos declarados en la especificación."""
+    import pyarrow as pa
+    return pa.schema([(c, _tipo_arrow(esquema.get(c), diccionarios)) for c in columnas])
+
+
+def _columna_arrow(serie: pd.Series, tipo):
+    """`serie` como arreglo Arrow de `tipo`. Los diccionarios y el texto guardan str(valor); los enteros se
+    convierten sin pérdida (4.0 -> 4) y fallan si hay valores que no lo son."""
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(tipo) or pa.types.is_string(tipo):
+        arreglo = pa.array(_como_texto(serie.astype(object)).to_numpy(), type=pa.string(), from_pandas=True)
+        return arreglo.dictionary_encode().cast(tipo) if pa.types.is_dictionary(tipo) else arreglo
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype(object)
+    if serie.dtype == object:
+        serie = serie.where(serie.notna(), None)
+    try:
+        return pa.array(serie, from_pandas=True).cast(tipo)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"La columna '{serie.name}' tiene valores que no caben en el tipo {tipo} del esquema de "
+                         f"la salida; escríbala sin --bloques o en csv ({e})") from None
+
+
+def _tabla_esquema(df: pd.DataFrame, schema):
+    import pyarrow as pa
+    return pa.Table.from_arrays([_columna_arrow(df[c], schema.field(c).type) for c in schema.names], schema=schema)
+
+
+class _EscritorArrow(Escritor):
+    """Base Parquet/Feather. Con un único bloque se conservan los tipos inferidos. En streaming todos los
+    bloques se convierten al esquema fijo que se arma con los tipos declarados (`esquema` de la
+    especificación: enteros, diccionarios de texto y texto); sin esquema, todas las columnas son texto."""
+
+    # cada bloque trae su propio diccionario; el formato de archivo Arrow IPC admite uno solo por columna
+    DICCIONARIOS = True
+
+    def __init__(self, path, columnas, streaming: bool = False, esquema: dict = None):
+        super().__init__(path, columnas)
+        self.streaming = streaming
+        self._schema = esquema_arrow(self.columnas, esquema or {}, self.DICCIONARIOS) if streaming else None
+        self._writer = None
+
+    def _abrir(self, schema):
+        raise NotImplementedError
+
+    def escribir(self, df: pd.DataFrame):
+        df = df[self.columnas]
+        tabla = _tabla_esquema(df, self._schema) if self.streaming else _tabla_arrow(df)
+        if self._writer is None:
+            self._writer = self._abrir(tabla.schema)
+        self._writer.write_table(tabla)
+        self.filas += len(df)
+
+    def cerrar(self):
+        if self._writer is None:
+            self.escribir(pd.DataFrame(columns=self.columnas))
+        self._writer.close()
+
+
+class EscritorParquet(_EscritorArrow):
+    def _abrir(self, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.path, schema)
+
+
+class EscritorFeather(_EscritorArrow):
+    DICCIONARIOS = False
+
+    def _abrir(self, schema):
+        import pyarrow as pa
+        return pa.ipc.new_file(str(self.path), schema)
+
+
+class EscritorCSV(Escritor):
+    def __init__(self, path, columnas):
+        super().__init__(path, columnas)
+        pd.DataFrame(columns=self.columnas).to_csv(self.path, index=False)
+
+    def escribir(self, df: pd.DataFrame):
+        df[self.columnas].to_csv(self.path, mode='a', header=False, index=False)
+        self.filas += len(df)
+
+
+ESCRITORES = {
+    'xlsx': EscritorExcelBloques,
+    'xlsxwriter': EscritorXlsxWriter,
+    'parquet': EscritorParquet,
+    'feather': EscritorFeather,
+    'csv': EscritorCSV,
+}
+
+
+def abrir_escritor(formato: str, path, columnas, streaming: bool = False, esquema: dict = None) -> Escritor:
+    """`esquema` (tipos candidatos por columna, esquema.py) fija los tipos de Parquet/Feather en streaming."""
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato de salida desconocido: {formato} (opciones: {FORMATOS})")
+    if formato in ('parquet', 'feather'):
+        return ESCRITORES[formato](path, columnas, streaming=streaming, esquema=esquema)
+    return ESCRITORES[formato](path, columnas)
+
+
+def escribir_salida(df: pd.DataFrame, path, formato: str = 'xlsx') -> dict:
+    """Escribe df completo. 'xlsx' usa df.to_excel (salida idéntica a la histórica). Devuelve métricas."""
+    t0 = time.perf_counter()
+    if formato == 'xlsx':
+        df.to_excel(path, index=False)
+    else:
+        with abrir_escritor(formato, path, df.columns) as escritor:
+            escritor.escribir(df)
+    return metricas_escritura(formato, path, len(df), time.perf_counter() - t0)
+
+
+def metricas_escritura(formato: str, path, filas: int, segundos: float) -> dict:
+    return {
+        'formato': formato, 'archivo': str(path), 'filas': filas, 'segundos': round(segundos, 4),
+        'filas_s': round(filas / segundos, 1) if segundos > 0 else None,
+    }
+
+
+def reportar(metricas: dict):
+    print(f"Escritura [{metricas['formato']}] {metricas['archivo']}: {metricas['filas']} filas en "
+          f"{metricas['segundos']:.2f}s ({metricas['filas_s'] or 0:,.0f} filas/s)")
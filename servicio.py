@@ -0,0 +1,273 @@
+"""Servicio de larga duración: vigila una carpeta de entrada y procesa cada encuesta exportada que llega.
+
+Cada corrida de creadordf.py paga de nuevo la importación de pandas, la compilación de la especificación,
+la carga del índice del maestro y la resolución del plan de columnas. Aquí eso se hace una sola vez por
+worker (procesos de un ProcessPoolExecutor, como en lote.py) y queda en memoria:
+
+    - el índice del maestro se revisa antes de cada archivo con mtime/tamaño y, si cambiaron, con el hash;
+      sólo se recarga si el contenido cambió (maestro.cargar_indice, con su caché en disco)
+    - la especificación se compila al iniciar el worker y los planes de columnas quedan en memoria por
+      huella de encabezados (especificacion.Transformacion.resolver)
+
+Un bucle asyncio revisa la carpeta cada --intervalo segundos; un archivo se encola cuando su tamaño y mtime
+no cambiaron entre dos revisiones (así no se toma un libro a medio copiar). La cola es acotada (--cola):
+si los workers no dan abasto, los archivos esperan en la carpeta. Cada archivo procesado se mueve a
+entrada/procesados/ (o entrada/errores/) y su salida queda en --salidas con el mismo nombre.
+
+Por archivo se imprime la latencia (desde que se detectó hasta que la salida quedó escrita), la espera en
+cola y las etapas de build_output; con --registro se agrega además una línea JSON por archivo.
+
+Uso: python servicio.py entrada/ --maestro input2.xlsx --salidas salidas/ [--procesos 2] [--formato parquet]
+     python servicio.py entrada/ --maestro input2.xlsx --una-vez   (procesa lo que haya y termina)
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from formatos import FORMATOS, ruta_para_formato
+
+PROCESADOS = 'procesados'
+ERRORES = 'errores'
+EXTENSIONES_ENTRADA = ('.xlsx', '.xlsm')
+
+# estado de cada worker del pool; lo llena _iniciar_worker
+_ESTADO = {}
+
+
+class MaestroVigente:
+    """Índice del maestro en memoria que se recarga sólo cuando el archivo cambia de contenido."""
+
+    def __init__(self, path):
+        from maestro import cargar_indice
+        self.path = Path(path)
+        self.indice = cargar_indice(self.path)
+        self.recargas = 0
+
+    def actual(self) -> tuple:
+        """(índice, recargado): revisa mtime/tamaño y, si difieren, el hash del archivo."""
+        from ingesta import origen_sin_cambios
+        from maestro import cargar_indice
+        vigente, _ = origen_sin_cambios(self.path, self.indice.meta)
+        if vigente:
+            return self.indice, False
+        self.indice = cargar_indice(self.path)
+        self.recargas += 1
+        return self.indice, True
+
+
+def _iniciar_worker(maestro, espec):
+    from especificacion import ESPECIFICACION, cargar_especificacion
+    _ESTADO['espec'] = cargar_especificacion(espec or ESPECIFICACION)
+    _ESTADO['maestro'] = MaestroVigente(maestro)
+
+
+def calentar() -> dict:
+    """Espera a que un worker termine de cargar el maestro y la especificación."""
+    return {'pid': os.getpid(), 'ids': len(_ESTADO['maestro'].indice)}
+
+
+def procesar_archivo(encuesta: str, salida: str, formato: str, cubo: bool = False) -> dict:
+    """Procesa una encuesta en el worker con el estado ya cargado. Nunca lanza: los errores quedan en el
+    resultado para el reporte."""
+    from instrumentacion import Medidor
+    from proceso import build_output
+
+    t0 = time.perf_counter()
+    resultado = {'archivo': encuesta, 'salida': salida, 'filas': 0, 'error': None, 'avisos': [],
+                 'maestro_recargado': False, 'pid': os.getpid(), 'etapas': []}
+    medidor = Medidor()
+    try:
+        with medidor.etapa('maestro_revision'):
+            indice, resultado['maestro_recargado'] = _ESTADO['maestro'].actual()
+        res = build_output(encuesta, indice, salida, formato, espec=_ESTADO['espec'], cubo=cubo or None,
+                           medidor=medidor, avisos=False)
+        resultado['filas'] = res['filas']
+        resultado['avisos'] = [h.mensaje() for h in res['validador'].hallazgos() if h.severidad == 'aviso']
+    except Exception as e:
+        resultado['error'] = f'{type(e).__name__}: {e}'
+    resultado['segundos'] = time.perf_counter() - t0
+    resultado['etapas'] = medidor.reporte()['etapas']
+    return resultado
+
+
+def candidatos(entrada: Path) -> dict:
+    """Libros de la carpeta de entrada -> (mtime_ns, tamaño). Ignora los temporales de Excel (~$...)."""
+    firmas = {}
+    with os.scandir(entrada) as it:
+        for e in it:
+            if e.is_file() and e.name.lower().endswith(EXTENSIONES_ENTRADA) and not e.name.startswith('~$'):
+                stat = e.stat()
+                firmas[Path(e.path)] = (stat.st_mtime_ns, stat.st_size)
+    return firmas
+
+
+def mover(ruta: Path, carpeta: str) -> Path:
+    destino = ruta.parent / carpeta / ruta.name
+    destino.parent.mkdir(exist_ok=True)
+    os.replace(ruta, destino)
+    return destino
+
+
+def percentil(valores: list, p: float) -> float:
+    valores = sorted(valores)
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+class Servicio:
+    def __init__(self, entrada, maestro, salidas, formato: str = 'xlsx', procesos: int = 1, cola: int = None,
+                 intervalo: float = 1.0, espec=None, cubo: bool = False, registro=None):
+        self.entrada = Path(entrada)
+        self.maestro = Path(maestro)
+        self.salidas = Path(salidas)
+        self.formato = formato
+        self.procesos = max(1, procesos)
+        self.tam_cola = cola or 2 * self.procesos
+        self.intervalo = intervalo
+        self.espec = espec
+        self.cubo = cubo
+        self.registro = Path(registro) if registro else None
+        self.resultados = []
+        self._detener = None
+        self._encolados = set()
+
+    def detener(self):
+        self._detener.set()
+
+    async def vigilar(self, cola: asyncio.Queue, una_vez: bool):
+        """Encola los libros cuyo tamaño y mtime no cambiaron desde la revisión anterior. `put` espera
+        si la cola está llena, así que la carpeta absorbe los picos."""
+        vistos = {}  # ruta -> (firma de la revisión anterior, momento en que se detectó)
+        while not self._detener.is_set():
+            firmas = candidatos(self.entrada)
+            for ruta, firma in sorted(firmas.items(), key=lambda x: x[1]):
+                if ruta in self._encolados:
+                    continue
+                previo = vistos.get(ruta)
+                detectado = previo[1] if previo else time.perf_counter()
+                if una_vez or (previo is not None and previo[0] == firma):
+                    self._encolados.add(ruta)
+                    vistos.pop(ruta, None)
+                    await cola.put((ruta, detectado))
+                else:
+                    vistos[ruta] = (firma, detectado)
+            for ruta in set(vistos) - set(firmas):
+                del vistos[ruta]
+            if una_vez:
+                return
+            try:
+                await asyncio.wait_for(self._detener.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+
+    async def trabajar(self, cola: asyncio.Queue, pool: ProcessPoolExecutor):
+        loop = asyncio.get_running_loop()
+        while True:
+            ruta, detectado = await cola.get()
+            try:
+                inicio = time.perf_counter()
+                salida = ruta_para_formato(self.salidas / ruta.name, self.formato)
+                resultado = await loop.run_in_executor(pool, procesar_archivo, str(ruta), str(salida),
+                                                       self.formato, self.cubo)
+                resultado['espera'] = inicio - detectado
+                resultado['latencia'] = time.perf_counter() - detectado
+                try:
+                    mover(ruta, ERRORES if resultado['error'] else PROCESADOS)
+                except OSError as e:
+                    resultado['error'] = resultado['error'] or f'No se pudo mover {ruta}: {e}'
+                self._encolados.discard(ruta)
+                self.reportar(resultado)
+            finally:
+                cola.task_done()
+
+    def reportar(self, r: dict):
+        self.resultados.append(r)
+        nombre = Path(r['archivo']).name
+        if r['error']:
+            print(f"[ERROR] {nombre}: {r['error']}")
+        else:
+            etapas = ', '.join(f"{e['nombre']} {e['segundos']:.2f}s" for e in r['etapas'] if e['segundos'] >= 0.01)
+            print(f"{nombre}: {r['filas']} filas -> {r['salida']} | latencia {r['latencia']:.2f}s "
+                  f"(espera {r['espera']:.2f}s, proceso {r['segundos']:.2f}s: {etapas})")
+        if r['maestro_recargado']:
+            print(f"[INFO] Maestro {self.maestro} recargado (cambió su contenido) en el worker {r['pid']}")
+        for aviso in r['avisos']:
+            print(f"[AVISO] {nombre}: {aviso}")
+        if self.registro is not None:
+            with open(self.registro, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(r, ensure_ascii=False) + '\n')
+
+    def resumen(self):
+        ok = [r['latencia'] for r in self.resultados if not r['error']]
+        fallidos = len(self.resultados) - len(ok)
+        print(f"{len(self.resultados)} archivo(s) procesados ({fallidos} con error); latencia p50 "
+              f"{percentil(ok, 50):.2f}s, p95 {percentil(ok, 95):.2f}s, máxima {max(ok, default=0):.2f}s")
+
+    async def servir(self, una_vez: bool = False):
+        self._detener = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.detener)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C llega como KeyboardInterrupt
+        self.salidas.mkdir(parents=True, exist_ok=True)
+        cola = asyncio.Queue(maxsize=self.tam_cola)
+        pool = ProcessPoolExecutor(max_workers=self.procesos, initializer=_iniciar_worker,
+                                   initargs=(str(self.maestro), self.espec))
+        trabajadores = []
+        try:
+            t0 = time.perf_counter()
+            listo = await loop.run_in_executor(pool, calentar)
+            print(f"Workers listos en {time.perf_counter() - t0:.2f}s ({self.procesos}, maestro con {listo['ids']} IDs); "
+                  f"vigilando {self.entrada} cada {self.intervalo:g}s")
+            trabajadores = [asyncio.create_task(self.trabajar(cola, pool)) for _ in range(self.procesos)]
+            await self.vigilar(cola, una_vez)
+            await cola.join()
+        finally:
+            for tarea in trabajadores:
+                tarea.cancel()
+            await asyncio.gather(*trabajadores, return_exceptions=True)
+            pool.shutdown(cancel_futures=True)
+            self.resumen()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vigila una carpeta y procesa cada encuesta que llega con el '
+                                                 'maestro y la especificación ya cargados')
+    parser.add_argument('entrada', help='Carpeta donde llegan las encuestas exportadas (.xlsx)')
+    parser.add_argument('--maestro', '--input2', required=True, metavar='RUTA', help='Maestro (INPUT2)')
+    parser.add_argument('--salidas', default='salidas', metavar='DIR', help='Carpeta de las salidas (por defecto salidas)')
+    parser.add_argument('--formato', '--format', choices=FORMATOS, default='xlsx')
+    parser.add_argument('--procesos', type=int, default=1, help='Workers del pool (por defecto 1)')
+    parser.add_argument('--cola', type=int, default=None, help='Archivos en espera como máximo (por defecto 2 por worker)')
+    parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos entre revisiones de la carpeta')
+    parser.add_argument('--espec', metavar='RUTA', help='Especificación de la salida (por defecto especificacion.json)')
+    parser.add_argument('--cubo', action='store_true', help='Guarda también el cubo de resultados de cada salida')
+    parser.add_argument('--registro', metavar='RUTA', help='Agrega una línea JSON por archivo (latencia y etapas)')
+    parser.add_argument('--una-vez', action='store_true', help='Procesa lo que haya en la carpeta y termina')
+    args = parser.parse_args()
+
+    sys.stdout.reconfigure(line_buffering=True)  # el log se sigue con tail aunque la salida sea un archivo
+    for ruta in (args.entrada, args.maestro):
+        if not Path(ruta).exists():
+            sys.exit(f"No se encuentra {ruta}")
+    servicio = Servicio(args.entrada, args.maestro, args.salidas, args.formato, args.procesos, args.cola,
+                        args.intervalo, args.espec, args.cubo, args.registro)
+    try:
+        asyncio.run(servicio.servir(args.una_vez))
+    except KeyboardInterrupt:
+        pass
+    if any(r['error'] for r in servicio.resultados) and args.una_vez:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Fixtures compartidas: encuesta y maestro sintéticos pequeños (benchmarks/generador.py) y su salida."""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(RAIZ / 'benchmarks'))
+
+from generador import escribir_xlsx, generar_encuesta, generar_maestro  # noqa: E402
+
+FILAS = 120
+
+
+@pytest.fixture(scope='session')
+def encuesta():
+    return generar_encuesta(FILAS, seed=7)
+
+
+@pytest.fixture(scope='session')
+def datos(tmp_path_factory, encuesta):
+    """(input1, input2) escritos una vez por sesión."""
+    base = tmp_path_factory.mktemp('datos')
+    escribir_xlsx(generar_maestro(encuesta, seed=7), base / 'input2.xlsx')
+    escribir_xlsx(encuesta, base / 'input1.xlsx')
+    return base / 'input1.xlsx', base / 'input2.xlsx'
+
+
+@pytest.fixture(scope='session')
+def df_out(datos):
+    from proceso import build_output
+
+    return build_output(*datos, avisos=False)['df_out']
+
+
+def assert_cubos_iguales(cubo, esperado):
+    """Mismas combinaciones de dimensiones y mismos estadísticos (sumas en coma flotante: tolerancia relativa)."""
+    dims = list(esperado.definicion.dimensiones)
+    a = cubo.datos.sort_values(dims, ignore_index=True)
+    b = esperado.datos.sort_values(dims, ignore_index=True)
+    pd.testing.assert_frame_equal(a[b.columns], b, check_dtype=False, rtol=1e-9)
@@ -0,0 +1,25 @@
+"""Lectura por bloques (bloques.py): mismas filas que pd.read_excel sobre la primera hoja."""
+import openpyxl
+import pandas as pd
+
+from bloques import leer_bloques
+
+
+def test_lee_la_primera_hoja_aunque_otra_este_activa(tmp_path):
+    ruta = tmp_path / 'libro.xlsx'
+    wb = openpyxl.Workbook()
+    wb.active.append(['ID', 'VALOR'])
+    for fila in ([1, 'a'], [2, None], [3, 'c']):
+        wb.active.append(fila)
+    otra = wb.create_sheet('otra')
+    otra.append(['ID', 'VALOR'])
+    otra.append([99, 'z'])
+    wb.active = 1
+    wb.save(ruta)
+
+    bloques = list(leer_bloques(ruta, tam_bloque=2))
+    assert [len(b) for b in bloques] == [2, 1]
+    leido = pd.concat(bloques, ignore_index=True)
+    esperado = pd.read_excel(ruta)
+    assert leido['ID'].tolist() == esperado['ID'].tolist() == [1, 2, 3]
+    assert leido['VALOR'].tolist()[::2] == esperado['VALOR'].tolist()[::2] == ['a', 'c']
@@ -0,0 +1,34 @@
+"""Cubo de resultados (cubo.py): construcción sobre salidas pequeñas y acumulación por bloques."""
+import pytest
+
+from conftest import assert_cubos_iguales
+from cubo import PARTICIPANTES, Cubo
+from proceso import build_output, especificacion_por_defecto
+
+
+@pytest.fixture(scope='module')
+def definicion():
+    return especificacion_por_defecto().cubo
+
+
+@pytest.mark.parametrize('filas', [1, 2, 3])
+def test_menos_grupos_que_dimensiones(df_out, definicion, filas):
+    parte = df_out.iloc[:filas]
+    cubo = Cubo.desde_salida(parte, definicion)
+    assert len(definicion.dimensiones) > filas
+    assert 1 <= len(cubo) <= filas
+    assert cubo.datos[PARTICIPANTES].sum() == filas
+
+
+def test_suma_de_partes_pequenas_igual_al_completo(df_out, definicion):
+    cubo = Cubo(definicion)
+    for inicio in range(0, len(df_out), 5):
+        cubo.sumar(Cubo.desde_salida(df_out.iloc[inicio:inicio + 5], definicion))
+    assert_cubos_iguales(cubo, Cubo.desde_salida(df_out, definicion))
+
+
+def test_bloques_con_ultimo_bloque_chico(datos, df_out, definicion, tmp_path):
+    # 120 filas en bloques de 58: el último bloque trae 4 filas
+    resultado = build_output(*datos, tmp_path / 'output.csv', formato='csv', bloques=58, cubo=True, avisos=False)
+    assert resultado['filas'] == len(df_out)
+    assert_cubos_iguales(resultado['cubo'], Cubo.desde_salida(df_out, definicion))
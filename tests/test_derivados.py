@@ -0,0 +1,91 @@
+"""Paridad de los campos derivados vectorizados (derivados.py) con las funciones escalares originales de
+creadordf.py, copiadas tal cual en benchmarks/escalares.py como referencia."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from derivados import generacion_serie, limpiar_area_serie, normalizar_id_serie, tipo_nps_serie
+from escalares import calcular_tipo_nps, limpiar_area, map_generacion, normalizar_id
+
+
+PARES = {
+    'normalizar_id': (normalizar_id, normalizar_id_serie),
+    'limpiar_area': (limpiar_area, limpiar_area_serie),
+    'map_generacion': (map_generacion, generacion_serie),
+    'calcular_tipo_nps': (calcular_tipo_nps, tipo_nps_serie),
+}
+
+FALTANTES = [None, np.nan, pd.NA, pd.NaT]
+ANIOS_BORDE = [1945, 1946, 1964, 1965, 1980, 1981, 1996, 1997, 2012, 2013]
+NPS_BORDE = [-1, 0, 6, 7, 8, 9, 10, 11]
+MEZCLA = FALTANTES + [
+    '', '   ', 'abc', True, False, 0, -1, -0.5, 6.99, 7, 8.5, 8.99, 9, 9.0, 10, 1e20, '9', ' 10 ', '9.0', '+7',
+    '-3', '1_0', '٩', '١٩٩٠', '1990', '1990-01-01', 'nacido en 1975', 'año 1945 o 1946', '12345', 1964, 1965.0,
+    pd.Timestamp('1988-05-01'), '1.014.192.236', 'CC 80.428.666', ' secretaría de  hacienda ',
+    'SECRETARIA DE  DESARROLLO  SOCIAL', 'Secretaría  de Salud', 'secretaria de', 'EDUCACIÓN',
+] + ANIOS_BORDE + [str(a) for a in ANIOS_BORDE] + [float(a) for a in ANIOS_BORDE]
+
+SERIES = {
+    'mezcla': pd.Series(MEZCLA, dtype=object),
+    'mezcla repetida': pd.Series(MEZCLA * 3, dtype=object).sample(frac=1, random_state=0),
+    'anios int64': pd.Series(ANIOS_BORDE + [0, 99999], dtype='int64'),
+    'anios Int64 con NA': pd.Series(ANIOS_BORDE + [None], dtype='Int64'),
+    'anios float64 con NaN': pd.Series([float(a) for a in ANIOS_BORDE] + [np.nan]),
+    'anios texto': pd.Series([str(a) for a in ANIOS_BORDE] + [None, 'No responde']),
+    'nps int64': pd.Series(NPS_BORDE, dtype='int64'),
+    'nps Int64 con NA': pd.Series(NPS_BORDE + [None], dtype='Int64'),
+    'nps float64': pd.Series([-0.5, 0.0, 6.99, 7.0, 8.99, 9.0, 10.0, np.nan]),
+    'nps texto': pd.Series([str(v) for v in NPS_BORDE] + [' 9 ', '9.0', '+9', '1_0', None], dtype=object),
+    'booleanos': pd.Series([True, False, None], dtype=object),
+    'categorica': pd.Series(pd.Categorical(['9', '7', None, 'Secretaría de Salud', '1990'])),
+    'vacia': pd.Series([], dtype=object),
+    'solo faltantes': pd.Series(FALTANTES, dtype=object),
+}
+
+
+def _esperado(escalar, serie: pd.Series) -> list:
+    return [escalar(v) for v in serie.astype(object)]
+
+
+def _assert_iguales(obtenido: pd.Series, esperado: list):
+    """Mismo valor y mismo tipo elemento a elemento; pd.NA (no NaN ni None) para los faltantes."""
+    assert len(obtenido) == len(esperado)
+    for i, (a, b) in enumerate(zip(obtenido, esperado)):
+        if b is pd.NA:
+            assert a is pd.NA, (i, a)
+        else:
+            assert type(a) is type(b) and a == b, (i, a, b)
+
+
+@pytest.mark.parametrize('funcion', list(PARES))
+@pytest.mark.parametrize('nombre', list(SERIES))
+def test_vectorizada_igual_a_escalar(funcion, nombre):
+    escalar, vectorizada = PARES[funcion]
+    serie = SERIES[nombre]
+    obtenido = vectorizada(serie)
+    assert obtenido.index.equals(serie.index)
+    assert obtenido.dtype == object
+    _assert_iguales(obtenido, _esperado(escalar, serie))
+
+
+@pytest.mark.parametrize('anio, etiqueta', [
+    (1945, pd.NA), (1946, 'Baby Boomers'), (1964, 'Baby Boomers'), (1965, 'Generación X'), (1980, 'Generación X'),
+    (1981, 'Millennials'), (1996, 'Millennials'), (1997, 'Centennials'), (2012, 'Centennials'), (2013, pd.NA),
+])
+def test_generacion_en_los_limites(anio, etiqueta):
+    _assert_iguales(generacion_serie(pd.Series([anio, str(anio)], dtype=object)), [etiqueta, etiqueta])
+
+
+@pytest.mark.parametrize('valor, etiqueta', [
+    (-1, pd.NA), (0, 'Detractores'), (6, 'Detractores'), (6.99, 'Detractores'), (7, 'Pasivos'), (8.99, 'Pasivos'),
+    (9, 'Entusiastas'), (10, 'Entusiastas'), ('9', 'Entusiastas'), ('9.0', pd.NA), (True, 'Detractores'),
+])
+def test_tipo_nps_en_los_limites(valor, etiqueta):
+    _assert_iguales(tipo_nps_serie(pd.Series([valor], dtype=object)), [etiqueta])
+
+
+def test_tablas_configurables():
+    tabla = ((1990, 1999, 'Noventas'),)
+    _assert_iguales(generacion_serie(pd.Series(['1989', '1990', '1999', '2000']), tabla),
+                    [pd.NA, 'Noventas', 'Noventas', pd.NA])
+    _assert_iguales(tipo_nps_serie(pd.Series([4, 5, 10]), ((5, 'Alto'),)), [pd.NA, 'Alto', 'Alto'])
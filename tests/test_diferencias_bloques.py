@@ -0,0 +1,57 @@
+"""Lectura por bloques del comparador fuera de memoria (diferencias_bloques.py): las celdas se tipan igual que
+con pd.read_excel, sin pasar por el parser interno de pandas."""
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+from bloques import leer_bloques
+from diferencias_bloques import _filas_excel, _parsear, tipo_global
+
+FECHA = dt.datetime(2022, 3, 4, 10, 30)
+COLUMNAS = {
+    'enteros': [1, 2, 3, 4],
+    'enteros con vacio': [1, None, 3, 4],
+    'decimales': [1.5, 2, None, -0.25],
+    'textos numericos': ['09', '1', ' 5 ', '1e3'],
+    'nulos de texto': ['NA', 'null', '#N/A', 7],
+    'booleanos': [True, False, True, False],
+    'booleanos de texto': ['True', 'false', None, 'TRUE'],
+    'booleanos y enteros': [True, 1, 'x', 0],
+    'fechas': [FECHA, None, FECHA, FECHA],
+    'mezcla': ['a', 1, FECHA, 'NA'],
+    'texto': ['a', 'b', None, 'Sí'],
+    'vacia': [None, None, None, None],
+}
+
+
+@pytest.fixture(scope='module')
+def libro(tmp_path_factory):
+    ruta = tmp_path_factory.mktemp('bloques') / 'libro.xlsx'
+    pd.DataFrame(COLUMNAS, dtype=object).to_excel(ruta, index=False)
+    return ruta
+
+
+def test_parsear_igual_a_read_excel(libro):
+    esperado = pd.read_excel(libro)
+    bloque = next(leer_bloques(libro, tam_bloque=100))
+    obtenido = _parsear(_filas_excel(bloque), bloque.columns)
+    pd.testing.assert_frame_equal(obtenido, esperado, check_exact=True)
+    for col in esperado.columns:
+        assert [type(v) for v in obtenido[col]] == [type(v) for v in esperado[col]], col
+
+
+def test_sin_inferir_quedan_object(libro):
+    bloque = next(leer_bloques(libro, tam_bloque=100))
+    obtenido = _parsear(_filas_excel(bloque), bloque.columns, dtype={'textos numericos': object, 'enteros': object})
+    assert obtenido['textos numericos'].tolist() == ['09', '1', ' 5 ', '1e3']
+    assert obtenido['enteros'].dtype == object and obtenido['enteros'].tolist() == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('ejemplos, dtype', [
+    ({'int': 3}, 'int64'), ({'int': 3, ('str', 'nulo'): ''}, 'float64'), ({('str', 'numero'): '09'}, 'int64'),
+    ({'bool': True}, 'bool'), ({'datetime': FECHA}, 'datetime64[us]'), ({('str', 'texto'): 'x', 'int': 1}, 'object'),
+    ({}, 'object'),
+])
+def test_tipo_global(ejemplos, dtype):
+    assert str(tipo_global(ejemplos)) == dtype
@@ -0,0 +1,80 @@
+"""Modo incremental (incremental.py): tras editar pocas filas, la salida y el cubo actualizados deben ser los
+mismos que los de una reconstrucción completa."""
+import pickle
+
+import pandas as pd
+import pytest
+
+from conftest import assert_cubos_iguales
+from cubo import Cubo
+from generador import escribir_xlsx, generar_maestro
+from incremental import COL_CLAVE, ruta_estado
+from proceso import build_output
+
+ORGULLO = 'Me siento orgulloso(a) de la entidad y su entorno de trabajo (pregunta 6)'
+
+
+def _cambiar(encuesta: pd.DataFrame) -> pd.DataFrame:
+    editada = encuesta.copy()
+    editada.loc[[4, 17], ORGULLO] = [5 if v != 5 else 1 for v in editada.loc[[4, 17], ORGULLO]]
+    return editada
+
+
+def _eliminar(encuesta: pd.DataFrame) -> pd.DataFrame:
+    return encuesta.drop(index=[9, 60]).reset_index(drop=True)
+
+
+def _cambiar_y_eliminar(encuesta: pd.DataFrame) -> pd.DataFrame:
+    return _eliminar(_cambiar(encuesta))
+
+
+def _insertar(encuesta: pd.DataFrame) -> pd.DataFrame:
+    """Dos participantes nuevos (TAN nuevos, con cédulas que están en el maestro) en medio de la encuesta."""
+    nuevas = encuesta.loc[[4, 17]].copy()
+    nuevas[COL_CLAVE] = [99000001, 99000002]
+    return pd.concat([encuesta.iloc[:10], nuevas, encuesta.iloc[10:]], ignore_index=True)
+
+
+def _cambiar_maestro(maestro: pd.DataFrame) -> pd.DataFrame:
+    """Cambia el área de una cédula y repite otra (de una fila a dos en el maestro)."""
+    editado = maestro.copy()
+    editado.loc[1, 'VARIABLE 1'] = 'SECRETARÍA DE SALUD'
+    repetida = editado.loc[[2]].assign(**{'VARIABLE 1': 'SECRETARÍA DE  OTRA ÁREA'})
+    return pd.concat([editado, repetida], ignore_index=True)
+
+
+def _sin_cambios(df: pd.DataFrame) -> pd.DataFrame:
+    return df
+
+
+@pytest.mark.parametrize('editar, editar_maestro, esperado', [
+    (_cambiar, _sin_cambios, {'modificadas': 2}),
+    (_eliminar, _sin_cambios, {'eliminadas': 2}),
+    (_cambiar_y_eliminar, _sin_cambios, {'modificadas': 2, 'eliminadas': 2}),
+    (_insertar, _sin_cambios, {'nuevas': 2}),
+    (_sin_cambios, _cambiar_maestro, {'maestro_actualizadas': 2}),
+    (_insertar, _cambiar_maestro, {'nuevas': 2, 'maestro_actualizadas': 2}),
+])
+def test_cubo_incremental_igual_a_reconstruccion(encuesta, tmp_path, editar, editar_maestro, esperado):
+    input1, input2 = tmp_path / 'input1.xlsx', tmp_path / 'input2.xlsx'
+    output = tmp_path / 'output.csv'
+    maestro = generar_maestro(encuesta, seed=7)
+    escribir_xlsx(encuesta, input1)
+    escribir_xlsx(maestro, input2)
+    inicial = build_output(input1, input2, output, formato='csv', incremental=True, cubo=True, avisos=False)
+    assert inicial['incremental']['reconstruccion']
+
+    escribir_xlsx(editar(encuesta), input1)
+    escribir_xlsx(editar_maestro(maestro), input2)
+    resultado = build_output(input1, input2, output, formato='csv', incremental=True, cubo=True, avisos=False)
+    resumen = resultado['incremental']
+    assert not resumen['reconstruccion']
+    cuentas = {c: resumen[c] for c in ('nuevas', 'modificadas', 'eliminadas', 'maestro_actualizadas')}
+    assert cuentas == {'nuevas': 0, 'modificadas': 0, 'eliminadas': 0, 'maestro_actualizadas': 0, **esperado}
+
+    completo = build_output(input1, input2, avisos=False)['df_out']
+    if editar_maestro is _cambiar_maestro:  # la cédula repetida ahora sale dos veces
+        assert (completo['ID'].astype(str) == str(encuesta.loc[2, 'ID'])).sum() == 2
+    with open(ruta_estado(output), 'rb') as f:
+        pd.testing.assert_frame_equal(pickle.load(f)['df_out'], completo)
+    assert_cubos_iguales(resultado['cubo'], Cubo.desde_salida(completo, resultado['cubo'].definicion))
@@ -0,0 +1,58 @@
+"""Cruce de la encuesta con el índice del maestro (maestro.py) contra el merge histórico de creadordf.py."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from maestro import IndiceMaestro
+
+MAESTRO = pd.DataFrame({
+    'CEDULA': ['1.001', '1002', '1003', '1002', '1004', '1003', '1002', None],
+    'VARIABLE 1': ['Secretaría de Hacienda', 'B', 'C', 'B2', 'D', 'C', 'B3', 'X'],
+    'VARIABLE 2': ['a', 'b', 'c', 'b', 'd', 'c', 'b', 'x'],
+    'VARIABLE 3': ['a', 'b', 'c', 'b', 'd', 'c', 'b', 'x'],
+    'EMPRESA': ['E1', 'E2', 'E3', 'E2', None, 'E3', 'E2', 'E9'],
+})
+
+
+@pytest.fixture
+def indice():
+    return IndiceMaestro.desde_dataframe(MAESTRO, 'CEDULA')
+
+
+def _merge(df_in: pd.DataFrame, indice: IndiceMaestro) -> pd.DataFrame:
+    """El cruce de la versión original: merge por el ID ya normalizado contra todas las filas del maestro."""
+    tabla = pd.concat([indice.valores.assign(ID=indice.ids.to_numpy()), indice.repeticiones], ignore_index=True)
+    tabla = tabla.iloc[np.argsort(pd.Index(indice.ids).get_indexer(tabla['ID']), kind='stable')]
+    return df_in.merge(tabla[['ID'] + indice.columnas], on='ID', how='left', suffixes=('', '_MAP'))
+
+
+def test_repeticiones_multiplican_filas_como_merge(indice):
+    df_in = pd.DataFrame({'ID': ['1001', '1002', '9999', '1003', '1002'], 'EMPRESA': ['x', 'y', 'z', 'w', 'v']})
+    obtenido = indice.cruzar(df_in, 'ID')
+    esperado = _merge(df_in, indice)
+    assert len(obtenido) == 1 + 3 + 1 + 2 + 3
+    assert list(obtenido.index) == [0, 1, 1, 1, 2, 3, 3, 4, 4, 4]
+    pd.testing.assert_frame_equal(obtenido.reset_index(drop=True).astype(object), esperado.astype(object))
+    assert obtenido['VARIABLE 1'].tolist()[1:4] == ['B', 'B2', 'B3']
+
+
+def test_deduplicar_usa_la_primera_fila(indice):
+    indice.deduplicar = True
+    df_in = pd.DataFrame({'ID': ['1002', '1003', '1004']})
+    obtenido = indice.cruzar(df_in, 'ID')
+    assert obtenido.index.tolist() == [0, 1, 2]
+    assert obtenido['VARIABLE 1'].tolist() == ['B', 'C', 'D']
+    assert obtenido['EMPRESA'].tolist()[:2] == ['E2', 'E3'] and pd.isna(obtenido['EMPRESA'].iloc[2])
+
+
+@pytest.mark.parametrize('ids', [
+    pd.Series([1001, 1004, 5], dtype='int64'),
+    pd.Series([1001, 1004, None], dtype='Int64'),
+    pd.Series(['1.001', ' 1004 ', 'sin cédula'], dtype=object),
+])
+def test_id_de_la_encuesta_se_normaliza(indice, ids):
+    obtenido = indice.cruzar(pd.DataFrame({'ID': ids}), 'ID')
+    assert obtenido['VARIABLE 1'].iloc[0] == 'HACIENDA'
+    assert obtenido['VARIABLE 1'].iloc[1] == 'D'
+    assert pd.isna(obtenido['VARIABLE 1'].iloc[2])
+    assert obtenido['ID'].tolist()[:2] == ids.tolist()[:2]  # la columna de la encuesta no se modifica
@@ -0,0 +1,92 @@
+"""Escritores Parquet/Feather (salida.py): esquema fijo en streaming y categóricas vacías como texto."""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+from proceso import build_output, especificacion_por_defecto
+from salida import abrir_escritor, escribir_salida
+
+ESQUEMA = {'ID': ('Int64', 'string[pyarrow]'), 'ESCALA': ('Int8', 'category'), 'GENERO': ('category',),
+           'COMENTARIOS': ('string[pyarrow]', 'category')}
+COLUMNAS = list(ESQUEMA) + ['LIBRE']
+
+
+def _bloque(ids, escala, genero, comentarios, libre):
+    return pd.DataFrame({'ID': pd.array(ids, dtype='Int64'), 'ESCALA': escala, 'GENERO': genero,
+                         'COMENTARIOS': comentarios, 'LIBRE': libre})
+
+
+BLOQUES = [
+    _bloque([1, 2], pd.array([1, None], dtype='Int8'), pd.Categorical([None, None]), ['a', None], [1, 'x']),
+    _bloque([3, None], pd.Categorical([4.0, 2.0]), pd.Categorical(['F', 'M']), [None, None], [None, 2.5]),
+]
+
+
+def _leer(formato, ruta):
+    return pq.read_table(ruta) if formato == 'parquet' else feather.read_table(ruta)
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'feather'])
+def test_streaming_usa_el_esquema_declarado(tmp_path, formato):
+    ruta = tmp_path / f'salida.{formato}'
+    with abrir_escritor(formato, ruta, COLUMNAS, streaming=True, esquema=ESQUEMA) as escritor:
+        for bloque in BLOQUES:
+            escritor.escribir(bloque)
+    tabla = _leer(formato, ruta)
+    categoria = pa.dictionary(pa.int32(), pa.string()) if formato == 'parquet' else pa.string()
+    assert tabla.schema == pa.schema([('ID', pa.int64()), ('ESCALA', pa.int8()), ('GENERO', categoria),
+                                      ('COMENTARIOS', pa.string()), ('LIBRE', pa.string())])
+    columnas = tabla.to_pydict()
+    assert columnas['ID'] == [1, 2, 3, None]
+    assert columnas['ESCALA'] == [1, None, 4, 2]
+    assert columnas['GENERO'] == [None, None, 'F', 'M']
+    assert columnas['LIBRE'] == ['1', 'x', None, '2.5']
+
+
+def test_streaming_falla_si_un_valor_no_cabe_en_el_tipo(tmp_path):
+    bloque = BLOQUES[0].assign(ESCALA=pd.Categorical([1.5, None]))
+    with pytest.raises(ValueError, match="'ESCALA'"):
+        with abrir_escritor('parquet', tmp_path / 'salida.parquet', COLUMNAS, streaming=True,
+                            esquema=ESQUEMA) as escritor:
+            escritor.escribir(bloque)
+
+
+def test_categoricas_vacias_como_diccionario_de_texto(df_out, tmp_path):
+    ruta = tmp_path / 'salida.feather'
+    escribir_salida(df_out, ruta, 'feather')
+    tabla = feather.read_table(ruta)
+    vacias = [c for c in df_out.columns if isinstance(df_out[c].dtype, pd.CategoricalDtype) and df_out[c].isna().all()]
+    assert vacias
+    assert {tabla.schema.field(c).type for c in vacias} == {pa.dictionary(pa.int8(), pa.string())}
+
+
+def test_bloques_parquet_mismos_valores_que_completo(datos, df_out, tmp_path):
+    espec = especificacion_por_defecto()
+    build_output(*datos, tmp_path / 'salida.parquet', formato='parquet', bloques=50, avisos=False)
+    tabla = pq.read_table(tmp_path / 'salida.parquet')
+    assert tabla.schema.names == list(espec.columnas)
+    assert {str(tabla.schema.field(c).type) for c in df_out.columns if espec.esquema[c][0] == 'Int8'} == {'int8'}
+    leida = tabla.to_pandas()
+    for col in df_out.columns:
+        assert _textos(leida[col]) == _textos(df_out[col]), col
+
+
+def _textos(serie: pd.Series) -> list:
+    """Valores como texto, con 4.0 y '4.0' iguales a 4 (el esquema fijo guarda enteros y texto)."""
+    def texto(v):
+        if v is None:
+            return None
+        try:
+            numero = float(v)
+        except ValueError:
+            return str(v)
+        return str(int(numero)) if numero.is_integer() else str(v)
+    return [texto(v) for v in serie.astype(object).where(serie.notna(), None)]
+
+
+@pytest.mark.parametrize('modo', [{'bloques': 50}, {'incremental': True}])
+def test_sin_avisos_no_imprime(datos, tmp_path, capsys, modo):
+    build_output(*datos, tmp_path / 'salida.csv', formato='csv', avisos=False, **modo)
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,191 @@
+"""Validación de calidad de datos sobre las columnas que la proyección ya tiene en memoria.
+
+No se vuelve a leer nada: las reglas son chequeos vectorizados sobre la encuesta cruzada (df_in) y la
+salida tipada (df_out) de cada bloque, y se acumulan entre bloques. Reglas:
+
+    id_sin_maestro             IDs sin VARIABLE 1/2/3 en el maestro (el aviso histórico de creadordf.py)
+    id_vacio                   participantes sin ID
+    id_repetido                IDs que aparecen en más de una fila de la salida
+    fuera_de_rango             valores de escala fuera de "rangos" de la especificación o no numéricos
+    derivado_no_interpretable  origen con valor pero campo derivado vacío (p.ej. año de nacimiento sin
+                               4 dígitos -> Generación, satisfacción no entera -> Tipo NPS)
+    fuentes_sin_resolver       fuentes del mapeo sin encabezado en la encuesta
+    encabezados_sin_mapear     encabezados de la encuesta que no llegan a la salida (informativo)
+
+El reporte tiene, por regla y columna, el número de casos y una muestra de IDs (o de encabezados).
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from ingesta import escritura_atomica
+
+VERSION_VALIDACION = 1
+MAX_MUESTRA = 10
+COLS_CRUCE = ['VARIABLE 1', 'VARIABLE 2', 'VARIABLE 3']
+
+_MENSAJES = {
+    'id_sin_maestro': '{casos} ID(s) no encontraron match en INPUT2 (maestro) para VARIABLES 1/2/3.',
+    'id_vacio': '{casos} participante(s) sin ID.',
+    'id_repetido': '{casos} ID(s) repetidos en la encuesta: {muestra}',
+    'fuera_de_rango': "{casos} valor(es) de '{columna}' fuera de rango o no numéricos (IDs {muestra})",
+    'derivado_no_interpretable': "{casos} fila(s) con '{columna}' vacío aunque su origen tiene valor (IDs {muestra})",
+    'fuentes_sin_resolver': '{casos} fuente(s) del mapeo sin encabezado en la encuesta: {muestra}',
+    'encabezados_sin_mapear': '{casos} encabezado(s) de la encuesta no se usan en la salida.',
+}
+_SEVERIDAD = {'encabezados_sin_mapear': 'info'}
+
+
+class Hallazgo:
+    """Casos de una regla en una columna (None si la regla es de la fila completa)."""
+
+    def __init__(self, regla: str, columna=None):
+        self.regla = regla
+        self.columna = columna
+        self.casos = 0
+        self.muestra = []
+
+    @property
+    def severidad(self) -> str:
+        return _SEVERIDAD.get(self.regla, 'aviso')
+
+    def sumar(self, casos: int, muestra=()):
+        self.casos += int(casos)
+        faltan = MAX_MUESTRA - len(self.muestra)
+        if faltan > 0:
+            self.muestra.extend(_json(v) for v in list(muestra)[:faltan])
+
+    def como_dict(self) -> dict:
+        return {'regla': self.regla, 'severidad': self.severidad, 'columna': self.columna,
+                'casos': self.casos, 'muestra': self.muestra}
+
+    def mensaje(self) -> str:
+        return _MENSAJES[self.regla].format(casos=self.casos, columna=self.columna, muestra=self.muestra)
+
+
+def _json(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor if isinstance(valor, (str, int, float, bool)) or valor is None else str(valor)
+
+
+class Validador:
+    """Acumula hallazgos bloque a bloque. Uso: v.validar(df_in, df_out, plan); ...; v.hallazgos()."""
+
+    def __init__(self, espec, id_col: str = 'ID'):
+        self.espec = espec
+        self.id_col = id_col
+        self.filas = 0
+        self._hallazgos = {}
+        self._vistos = set()  # IDs ya vistos en bloques anteriores (id_repetido entre bloques)
+        self._repetidos = set()
+        self._sin_maestro = set()
+
+    def _hallazgo(self, regla: str, columna=None) -> Hallazgo:
+        clave = (regla, columna)
+        if clave not in self._hallazgos:
+            self._hallazgos[clave] = Hallazgo(regla, columna)
+        return self._hallazgos[clave]
+
+    def _muestra(self, ids: pd.Series, mascara) -> list:
+        return ids[np.asarray(mascara)].head(MAX_MUESTRA).tolist()
+
+    def validar(self, df_in, df_out: pd.DataFrame, plan=None, encabezados_in=None):
+        """Chequea un bloque. df_in (encuesta ya cruzada con el maestro) es opcional: sin él no se revisa el
+        cruce. Los encabezados sólo se revisan la primera vez que se pasan."""
+        ids = df_out[self.id_col].reset_index(drop=True) if self.id_col in df_out.columns else pd.Series(
+            pd.NA, index=pd.RangeIndex(len(df_out)))
+        self.filas += len(df_out)
+        if df_in is not None:
+            self._cruce(df_in)
+        self._ids(ids)
+        self._rangos(df_out, ids)
+        self._derivados(df_out, ids)
+        if plan is not None and encabezados_in is not None and ('encabezados_sin_mapear', None) not in self._hallazgos:
+            self._encabezados(plan, encabezados_in)
+
+    def _cruce(self, df_in: pd.DataFrame):
+        if self.id_col not in df_in.columns:
+            return
+        if set(COLS_CRUCE).issubset(df_in.columns):
+            sin_match = df_in[self.id_col].isna() | df_in[COLS_CRUCE].isna().all(axis=1)
+        else:
+            sin_match = df_in[self.id_col].isna()
+        nuevos = [i for i in df_in.loc[sin_match, self.id_col].dropna().unique() if i not in self._sin_maestro]
+        if nuevos:
+            self._sin_maestro.update(nuevos)
+            self._hallazgo('id_sin_maestro').sumar(len(nuevos), nuevos)
+
+    def _ids(self, ids: pd.Series):
+        vacios = ids.isna()
+        if vacios.any():
+            self._hallazgo('id_vacio').sumar(vacios.sum())
+        validos = ids[~vacios]
+        repetidos = set(validos[validos.duplicated()].tolist())
+        if self._vistos:
+            repetidos.update(validos[validos.isin(self._vistos)].tolist())
+        self._vistos.update(validos.tolist())
+        nuevos = [i for i in pd.unique(np.array(list(repetidos), dtype=object)) if i not in self._repetidos]
+        if nuevos:
+            self._repetidos.update(nuevos)
+            self._hallazgo('id_repetido').sumar(len(nuevos), nuevos)
+
+    def _rangos(self, df_out: pd.DataFrame, ids: pd.Series):
+        for col, minimo, maximo in self.espec.rangos:
+            if col not in df_out.columns:
+                continue
+            malos = _fuera_de_rango(df_out[col], minimo, maximo)
+            if malos.any():
+                self._hallazgo('fuera_de_rango', col).sumar(malos.sum(), self._muestra(ids, malos))
+
+    def _derivados(self, df_out: pd.DataFrame, ids: pd.Series):
+        for col, _, desde in self.espec.derivados:
+            if col not in df_out.columns or desde not in df_out.columns:
+                continue
+            vacios = (df_out[desde].notna() & df_out[col].isna()).to_numpy()
+            if vacios.any():
+                self._hallazgo('derivado_no_interpretable', col).sumar(vacios.sum(), self._muestra(ids, vacios))
+
+    def _encabezados(self, plan, encabezados_in):
+        if plan.sin_resolver:
+            self._hallazgo('fuentes_sin_resolver').sumar(len(plan.sin_resolver), plan.sin_resolver)
+        usados = {src for _, src, _ in plan.asignaciones} | {self.id_col, 'Estado de la participación'}
+        usados |= {col for col, _ in self.espec.maestro}
+        sin_mapear = [c for c in encabezados_in if c not in usados and c not in self.espec.mapeo]
+        self._hallazgo('encabezados_sin_mapear').sumar(len(sin_mapear), sin_mapear)
+
+    def hallazgos(self) -> list:
+        return [h for h in self._hallazgos.values() if h.casos]
+
+    def reporte(self) -> dict:
+        return {'version': VERSION_VALIDACION, 'filas': self.filas,
+                'hallazgos': [h.como_dict() for h in self.hallazgos()]}
+
+    def guardar(self, path) -> dict:
+        datos = self.reporte()
+        with escritura_atomica(path) as tmp:
+            tmp.write_text(json.dumps(datos, ensure_ascii=False, indent=2), encoding='utf-8')
+        return datos
+
+    def imprimir(self, info: bool = False):
+        for h in self.hallazgos():
+            if h.severidad == 'aviso' or info:
+                print(f"[{h.severidad.upper()}] {h.mensaje()}")
+
+
+def _fuera_de_rango(serie: pd.Series, minimo, maximo) -> np.ndarray:
+    """Máscara de valores no nulos fuera de [minimo, maximo] o no numéricos. Las categóricas se evalúan
+    sobre sus categorías (pocas) y se expanden por código."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        malas = _fuera_de_rango(pd.Series(serie.cat.categories), minimo, maximo)
+        codigos = serie.cat.codes.to_numpy()
+        return np.append(malas, False)[codigos]  # código -1 (nulo) -> último elemento
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.notna().to_numpy()
+    if pd.api.types.is_numeric_dtype(serie):
+        valores = serie.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        valores = pd.to_numeric(serie.astype(object), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        return serie.notna().to_numpy() & ~((valores >= minimo) & (valores <= maximo))